@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+# Chats gerando resposta ao mesmo tempo; acima disso a API responde 503
+API_MAX_CHATS = 200
+# Threads para o que ainda é síncrono (Chroma, SQLite, etapas da chain)
+API_THREADS = 64
+
+MENSAGEM_ERRO = "Desculpe, ocorreu um erro ao processar sua pergunta. Tente novamente."
+
+logger = logging.getLogger(__name__)
+
+
+class PerguntaChat(BaseModel):
+    pergunta: str
+    session_id: Optional[str] = None
+
+
+def evento_sse(evento, dados):
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+class StreamComVaga(StreamingResponse):
+    """
+    StreamingResponse que devolve a vaga do chat quando a resposta termina. Cobre o
+    caso do cliente que cai antes do gerador começar (aí o finally dele não roda).
+    """
+
+    def __init__(self, *args, liberar, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.liberar = liberar
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.liberar()
+
+
+def criar_app(engine=None, max_chats=API_MAX_CHATS, threads=API_THREADS):
+    """
+    API assíncrona sobre o mesmo engine do app Streamlit.
+    Sem `engine`, usa o rag.getEngine() na subida (testes passam um engine com modelos falsos).
+
+    - POST /chat     pergunta em stream (SSE: sessao, texto..., fim | erro)
+    - GET  /artigos  últimas matérias, sem o corpo
+    - GET  /health   estado e métricas do engine
+    - GET  /metrics  p50/p95/p99 por etapa do chat (formato de texto do Prometheus)
+    """
+    estado = {"engine": engine, "ativos": 0}
+
+    def tomar_vaga():
+        """
+        Reserva uma vaga de chat ou retorna None. Roda no loop, sem await entre a
+        conferência e o incremento: duas requisições juntas não passam do limite.
+        Retorna a função que devolve a vaga (pode ser chamada mais de uma vez).
+        """
+        if estado["ativos"] >= max_chats:
+            return None
+        estado["ativos"] += 1
+        devolvida = False
+
+        def liberar():
+            nonlocal devolvida
+            if not devolvida:
+                devolvida = True
+                estado["ativos"] -= 1
+
+        return liberar
+
+    @asynccontextmanager
+    async def lifespan(app):
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=threads))
+        if estado["engine"] is None:
+            from rag import getEngine
+            estado["engine"] = await asyncio.to_thread(getEngine)
+        yield
+
+    app = FastAPI(title="NEO - NeoFeed", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health():
+        engine = estado["engine"]
+        vetores = None
+        if engine.vectorstore is not None:
+            from rag import contarVetores
+            vetores = await asyncio.to_thread(contarVetores, engine.vectorstore)
+        from storage import tamanho_fila
+        return {
+            "status": "ok",
+            "vetores": vetores,
+            "fila_indexacao": await asyncio.to_thread(tamanho_fila),
+            "chats_ativos": estado["ativos"],
+            "metricas": engine.metricas(),
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        from core.helpers.tracing import coletor
+        sink = coletor.prometheus()
+        if sink is None:
+            raise HTTPException(status_code=404, detail="Sink prometheus desligado (rag.TRACING_SINKS).")
+        return PlainTextResponse(sink.exposicao(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/artigos")
+    async def artigos(limite: int = Query(20, ge=1, le=100), categoria: Optional[str] = None):
+        from storage import listar_artigos
+        return await asyncio.to_thread(listar_artigos, limite, categoria)
+
+    @app.post("/chat")
+    async def chat(corpo: PerguntaChat):
+        if not corpo.pergunta.strip():
+            raise HTTPException(status_code=400, detail="Por favor, faça uma pergunta sobre as matérias disponíveis no Neofeed.")
+        # A vaga é tomada aqui, antes de responder; o gerador (ou a resposta, se o
+        # cliente cair antes do stream começar) a devolve
+        liberar = tomar_vaga()
+        if liberar is None:
+            raise HTTPException(status_code=503, detail="Muitas conversas ao mesmo tempo. Tente novamente em instantes.")
+
+        from core.helpers.sessionStore import SessionStore
+        engine = estado["engine"]
+        session_id = corpo.session_id or SessionStore.novo_session_id()
+
+        async def eventos():
+            try:
+                yield evento_sse("sessao", {"session_id": session_id})
+                async for texto in engine.aresponder(corpo.pergunta, session_id):
+                    yield evento_sse("texto", {"texto": texto})
+                yield evento_sse("fim", {})
+            except Exception as e:
+                logger.exception("Erro no chat (%s): %s", session_id, e)
+                yield evento_sse("erro", {"mensagem": MENSAGEM_ERRO})
+            finally:
+                liberar()
+
+        return StreamComVaga(
+            eventos(),
+            liberar=liberar,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="API do NEO (chat com SSE, matérias e health)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    uvicorn.run(criar_app(), host=args.host, port=args.port)
@@ -1,12 +1,13 @@
 import streamlit as st
 from rag import chatMessage
-from rag import initRag
-
-if "chain" not in st.session_state:
-    st.session_state.chain, st.session_state.get_session_history = initRag()
+from rag import getEngine
 
 st.set_page_config(page_title="Chat RAG - NeoFeed", page_icon="🧠", layout="centered")
 
+# Engine único por processo: só o primeiro visitante espera a inicialização
+with st.spinner("Iniciando o Chat..."):
+    getEngine()
+
 if "messages" not in st.session_state:
     st.session_state.messages = st.session_state.messages = [
         {
@@ -0,0 +1,120 @@
+"""
+Chunking dos artigos: splitter anterior x chunker por parágrafos/frases.
+
+    python benchmarks/bench_chunker.py [--banco artigos.db] [--max-tokens 256]
+
+Anterior: cabeçalho (título, categoria, autor, data, link) + corpo em cada documento,
+RecursiveCharacterTextSplitter(800, 100). O cabeçalho só cai no primeiro chunk, mas
+a sobreposição de 100 caracteres é embedada duas vezes.
+
+Atual: core.helpers.chunker.dividir_documentos; corpo só, título uma vez no
+primeiro chunk, metadados compactos, limite em tokens.
+
+Relata número de chunks, tokens enviados para o embedding, tamanho médio e
+a fração de chunks que terminam no meio de uma frase.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from core.helpers.chunker import dividir_documentos
+from core.helpers.contextBuilder import contar_tokens
+
+FIM_DE_FRASE = re.compile(r"[.!?…][\"”’)]*\s*$")
+
+
+def carregar(banco):
+    conn = sqlite3.connect(banco)
+    linhas = conn.execute(
+        "SELECT doc_id, titulo, autor, categoria, data, link, conteudo FROM artigos"
+    ).fetchall()
+    conn.close()
+    return linhas
+
+
+def chunks_anteriores(linhas):
+    documentos = []
+    for doc_id, titulo, autor, categoria, data, link, conteudo in linhas:
+        cabecalho = (
+            f"Título: {titulo}\nCategoria: {categoria}\nAutor: {autor}\n"
+            f"Data: {data}\nLink: {link}\n\nConteúdo:\n"
+        )
+        documentos.append(Document(page_content=cabecalho + (conteudo or ""), metadata={"doc_id": doc_id}))
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=800,
+        chunk_overlap=100,
+        separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""],
+        add_start_index=True
+    )
+    return splitter.split_documents(documents=documentos)
+
+
+def chunks_atuais(linhas, max_tokens, min_tokens):
+    documentos = [
+        Document(
+            page_content=conteudo or "",
+            metadata={"doc_id": doc_id, "titulo": titulo, "autor": autor,
+                      "categoria": categoria, "data": data, "link": link}
+        )
+        for doc_id, titulo, autor, categoria, data, link, conteudo in linhas
+    ]
+    return dividir_documentos(documentos, max_tokens=max_tokens, min_tokens=min_tokens)
+
+
+def resumo(chunks):
+    tokens = [contar_tokens(chunk.page_content) for chunk in chunks]
+    cortados = sum(1 for chunk in chunks if not FIM_DE_FRASE.search(chunk.page_content))
+    return {
+        "chunks": len(chunks),
+        "tokens": sum(tokens),
+        "media": statistics.mean(tokens) if tokens else 0,
+        "maximo": max(tokens, default=0),
+        "cortados": cortados / len(chunks) if chunks else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", default="artigos.db")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--min-tokens", type=int, default=48)
+    args = parser.parse_args()
+
+    linhas = carregar(args.banco)
+    print(f"{len(linhas)} artigos em {args.banco}\n")
+
+    inicio = time.perf_counter()
+    anterior = resumo(chunks_anteriores(linhas))
+    tempo_anterior = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    atual = resumo(chunks_atuais(linhas, args.max_tokens, args.min_tokens))
+    tempo_atual = time.perf_counter() - inicio
+
+    print(f"  {'':<34} {'chunks':>8} {'tokens':>10} {'média':>7} {'máx.':>6} {'meio de frase':>14} {'tempo':>9}")
+    for nome, r, segundos in (
+        ("anterior (800/100 + cabeçalho)", anterior, tempo_anterior),
+        (f"atual ({args.max_tokens} tokens)", atual, tempo_atual),
+    ):
+        print(
+            f"  {nome:<34} {r['chunks']:8d} {r['tokens']:10d} {r['media']:7.1f} {r['maximo']:6d} "
+            f"{r['cortados']:13.1%} {segundos * 1000:7.0f}ms"
+        )
+
+    if anterior["chunks"] and anterior["tokens"]:
+        print(f"\n  chunks: {1 - atual['chunks'] / anterior['chunks']:.1%} a menos")
+        print(f"  tokens de embedding: {1 - atual['tokens'] / anterior['tokens']:.1%} a menos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Extração de texto do HTML dos posts: paridade com o BeautifulSoup e vazão.
+
+    python benchmarks/bench_html.py [--banco artigos.db] [--repeticoes 3]
+
+O corpus é HTML no formato dos posts do WordPress (parágrafos, intertítulos,
+listas, figuras, links, entidades, scripts, estilos, comentários), montado a partir
+dos artigos do banco, mais casos de borda escritos à mão.
+
+Paridade (só informada aqui; quem falha é tests/test_extrator_html.py):
+- extrair_texto(html) == BeautifulSoup(html, "html.parser").get_text(" ", strip=True)
+- com parágrafos, a saída limpa e achatada é igual à saída anterior
+"""
+import argparse
+import html as html_lib
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from core.helpers.extratorHtml import extrair_texto, _lxml_disponivel
+from getRequests import limpar_caracteres_agressivo
+
+CASOS_DE_BORDA = [
+    "",
+    "texto solto sem tags",
+    "<p>pal<b>avra</b> cortada por tag inline</p>",
+    "<p>um<br>dois<br/>três</p><p>quatro</p>",
+    "<p>&amp;lt; &eacute; &#233; &#xE9; &nbsp; &foo; &foo &amp sem ponto</p>",
+    "<p>&#128; &#150; &#0; &#xD800; &#x110000; &#12abc; &#x1F600;</p>",
+    "<!DOCTYPE html><html><head><title>T</title><meta charset='utf-8'><link rel=x>"
+    "<style>p{color:red}</style></head><body><p>corpo</p></body></html>",
+    "<p>antes<script>var x = '<p>não</p>';</script>depois</p>",
+    "<p>antes<script/>meio<style/>fim</p>",
+    "<p>a<!-- comentário -->b<![CDATA[dados]]>c<?php echo 1; ?>d</p>",
+    "<div><p>aberto<p>sem fechar<div>bloco</span></div>",
+    "<ul><li>um</li><li>dois <a href='#'>link</a></li></ul><h2>Título</h2>",
+    "<p>   espaços   \n\n  e quebras   </p>\n\n\n<p>\t</p>",
+    "<table><tr><td>a</td><td>b</td></tr><tr><td>c</td></tr></table>",
+    "<p>texto<style>sem fechar o estilo",
+]
+
+
+def post_html(titulo, conteudo, rnd):
+    """HTML parecido com o content.rendered do WordPress"""
+    frases = [f for f in re.split(r"(?<=[.!?])\s+", conteudo) if f]
+    partes = []
+    i = 0
+    while i < len(frases):
+        tamanho = rnd.randint(1, 4)
+        texto = html_lib.escape(" ".join(frases[i:i + tamanho]), quote=False)
+        i += tamanho
+
+        palavras = texto.split(" ")
+        if len(palavras) > 6:
+            j = rnd.randrange(len(palavras) - 2)
+            palavras[j] = f"<strong>{palavras[j]}</strong>"
+            k = rnd.randrange(len(palavras) - 1)
+            palavras[k] = f'<a href="https://neofeed.com.br/x/{k}">{palavras[k]}</a>'
+        texto = " ".join(palavras).replace(" - ", " &#8211; ").replace('"', "&#8220;")
+
+        sorteio = rnd.random()
+        if sorteio < 0.1:
+            partes.append(f"<h2>{texto}</h2>")
+        elif sorteio < 0.15:
+            partes.append(f"<ul><li>{texto}</li><li>{html_lib.escape(titulo)}</li></ul>")
+        elif sorteio < 0.2:
+            partes.append(
+                f'<figure class="wp-block-image"><img src="x.jpg" alt=""/>'
+                f"<figcaption>{texto}</figcaption></figure>"
+            )
+        else:
+            partes.append(f"<p>{texto}</p>")
+
+        if rnd.random() < 0.05:
+            partes.append("<script>window.dataLayer = window.dataLayer || []; dataLayer.push({'a': '<p>'});</script>")
+        if rnd.random() < 0.05:
+            partes.append("<!-- wp:paragraph --><style>.x{display:none}</style>")
+        partes.append("\n")
+    return "".join(partes)
+
+
+def corpus(banco, rnd):
+    documentos = list(CASOS_DE_BORDA)
+    if os.path.exists(banco):
+        conn = sqlite3.connect(banco)
+        for titulo, conteudo in conn.execute("SELECT titulo, conteudo FROM artigos"):
+            if conteudo:
+                documentos.append(post_html(titulo or "", conteudo, rnd))
+        conn.close()
+    return documentos
+
+
+def extrair_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup(["script", "style", "meta", "link"]):
+        script.decompose()
+    return soup.get_text(separator=" ", strip=True)
+
+
+def medir(funcao, documentos, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for documento in documentos:
+            funcao(documento)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def paridade(backend, documentos):
+    brutos = limpos = paragrafos = 0
+    for documento in documentos:
+        antes = extrair_bs4(documento)
+        if extrair_texto(documento, backend=backend) != antes:
+            brutos += 1
+        antes_limpo = limpar_caracteres_agressivo(antes)
+        if limpar_caracteres_agressivo(extrair_texto(documento, backend=backend)) != antes_limpo:
+            limpos += 1
+        com_paragrafos = limpar_caracteres_agressivo(
+            extrair_texto(documento, paragrafos=True, backend=backend), preservar_paragrafos=True
+        )
+        if " ".join(com_paragrafos.split()) != antes_limpo:
+            paragrafos += 1
+    return brutos, limpos, paragrafos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", default="artigos.db")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    documentos = corpus(args.banco, random.Random(7))
+    megabytes = sum(len(d.encode("utf-8")) for d in documentos) / 1e6
+    print(f"Corpus: {len(documentos)} documentos HTML, {megabytes:.1f} MB\n")
+
+    backends = ["html.parser"] + (["lxml"] if _lxml_disponivel() else [])
+
+    print("Divergências do BeautifulSoup (texto bruto / limpo / com parágrafos achatado):")
+    for backend in backends:
+        brutos, limpos, paragrafos = paridade(backend, documentos)
+        print(f"  {backend:<12} {brutos:4d} / {limpos:4d} / {paragrafos:4d}")
+
+    exemplo = next((d for d in documentos if "<h2>" in d and len(d) > 2000), documentos[-1])
+    texto = limpar_caracteres_agressivo(extrair_texto(exemplo, paragrafos=True), preservar_paragrafos=True)
+    print(f"\nParágrafos por artigo (exemplo): {texto.count(chr(10) * 2) + 1}")
+
+    print("\nVazão:")
+    resultados = {"BeautifulSoup (anterior)": medir(extrair_bs4, documentos, args.repeticoes)}
+    for backend in backends:
+        resultados[f"{backend}"] = medir(lambda d: extrair_texto(d, backend=backend), documentos, args.repeticoes)
+        resultados[f"{backend} + parágrafos"] = medir(
+            lambda d: extrair_texto(d, paragrafos=True, backend=backend), documentos, args.repeticoes
+        )
+
+    base = resultados["BeautifulSoup (anterior)"]
+    for nome, segundos in resultados.items():
+        print(f"  {nome:<26} {segundos * 1000:8.1f} ms  {megabytes / segundos:7.1f} MB/s  {base / segundos:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Índice vetorial local (core/helpers/indiceLocal.py) x Chroma: recall e latência.
+
+    python benchmarks/bench_indice.py [--banco artigos.db] [--sintetico 0] [--dimensao 1536]
+
+Corpus: os chunks do artigos.db (chunker atual) com o EmbeddingsLocal, ou, com
+--sintetico N, N vetores agrupados em --dimensao dimensões (arquivo de vários anos,
+datas espalhadas em 5 anos). Os mesmos vetores vão para todos os índices; as
+consultas são vetores prontos, então só a busca é medida.
+
+Para cada índice: tempo de construção, tamanho em disco, abertura + primeira
+consulta num processo novo, latência p50/p95 e recall@k contra a busca exata em
+float32, sem filtro e com uma janela de 30 dias.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import numpy as np
+
+from core.helpers.chatHelper import data_para_int
+from core.helpers.embeddingCache import EmbeddingsLocal
+from core.helpers.indiceLocal import IndiceLocal, _normalizar
+
+ABRIR_CHROMA = """
+import sys, time, numpy as np, chromadb
+consulta = np.load(sys.argv[2]).tolist()
+inicio = time.perf_counter()
+colecao = chromadb.PersistentClient(path=sys.argv[1]).get_collection("bench")
+colecao.query(query_embeddings=[consulta], n_results=10)
+print(time.perf_counter() - inicio)
+"""
+
+ABRIR_LOCAL = """
+import sys, time, numpy as np
+sys.path.insert(0, sys.argv[3])
+from core.helpers.indiceLocal import IndiceLocal
+consulta = np.load(sys.argv[2])
+inicio = time.perf_counter()
+IndiceLocal(sys.argv[1], None).buscar_por_vetores([consulta], k=10)
+print(time.perf_counter() - inicio)
+"""
+
+
+def corpus_artigos(banco, consultas, rnd):
+    from langchain_core.documents import Document
+    from core.helpers.chunker import dividir_documentos
+
+    conn = sqlite3.connect(banco)
+    documentos = [
+        Document(page_content=conteudo or "", metadata={"doc_id": doc_id, "titulo": titulo, "data_int": data_para_int(data)})
+        for doc_id, titulo, data, conteudo in conn.execute("SELECT doc_id, titulo, data, conteudo FROM artigos")
+    ]
+    conn.close()
+    chunks = dividir_documentos(documentos)
+
+    embeddings = EmbeddingsLocal()
+    vetores = np.array(embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+    datas = np.array([c.metadata["data_int"] for c in chunks], dtype=np.int32)
+
+    # Consulta = começo de um chunk qualquer (parecido com uma pergunta sobre o trecho)
+    escolhidos = rnd.choice(len(chunks), consultas, replace=False)
+    perguntas = [" ".join(chunks[i].page_content.split()[:12]) for i in escolhidos]
+    return vetores, datas, np.array(embeddings.embed_documents(perguntas), dtype=np.float32)
+
+
+def corpus_sintetico(n, dimensao, consultas, rnd):
+    centros = rnd.normal(size=(max(1, n // 50), dimensao)).astype(np.float32)
+    vetores = centros[rnd.integers(0, len(centros), n)] + rnd.normal(size=(n, dimensao)).astype(np.float32) * 0.8
+    dias = rnd.integers(0, 5 * 365, n)
+    datas = np.array([int((np.datetime64("2021-01-01") + int(d)).astype(str).replace("-", "")) for d in dias], dtype=np.int32)
+    base = vetores[rnd.integers(0, n, consultas)]
+    return vetores, datas, base + rnd.normal(size=base.shape).astype(np.float32) * 0.5
+
+
+def exatos(vetores, datas, consultas, k, janelas):
+    normalizados = _normalizar(vetores)
+    verdade = []
+    for consulta, janela in zip(_normalizar(consultas), janelas):
+        pontos = normalizados @ consulta
+        if janela is not None:
+            pontos[(datas < janela[0]) | (datas > janela[1])] = -np.inf
+        melhores = np.argsort(-pontos)[:k]
+        verdade.append({int(i) for i in melhores if pontos[i] > -np.inf})
+    return verdade
+
+
+def janela_de_30_dias(data_int):
+    dia = np.datetime64(f"{str(data_int)[:4]}-{str(data_int)[4:6]}-{str(data_int)[6:]}")
+    fim = dia + 15
+    inicio = dia - 15
+    return int(str(inicio).replace("-", "")), int(str(fim).replace("-", ""))
+
+
+def filtro_chroma(janela):
+    if janela is None:
+        return None
+    return {"$and": [{"data_int": {"$gte": janela[0]}}, {"data_int": {"$lte": janela[1]}}]}
+
+
+def construir_chroma(diretorio, vetores, datas):
+    import chromadb
+    cliente = chromadb.PersistentClient(path=diretorio)
+    colecao = cliente.create_collection("bench")
+    lote = min(5000, cliente.get_max_batch_size())
+    for inicio in range(0, len(vetores), lote):
+        fim = min(inicio + lote, len(vetores))
+        colecao.add(
+            ids=[str(i) for i in range(inicio, fim)],
+            embeddings=vetores[inicio:fim],
+            metadatas=[{"data_int": int(d)} for d in datas[inicio:fim]],
+        )
+    return lambda consulta, k, janela: [
+        int(i) for i in colecao.query(query_embeddings=[consulta.tolist()], n_results=k,
+                                      where=filtro_chroma(janela))["ids"][0]
+    ]
+
+
+def construir_local(diretorio, vetores, datas, **opcoes):
+    indice = IndiceLocal(diretorio, None, **opcoes)
+    lote = 5000
+    for inicio in range(0, len(vetores), lote):
+        fim = min(inicio + lote, len(vetores))
+        indice._adicionar(
+            vetores[inicio:fim],
+            [""] * (fim - inicio),
+            [{"data_int": int(d)} for d in datas[inicio:fim]],
+            [str(i) for i in range(inicio, fim)],
+        )
+    return lambda consulta, k, janela: [
+        int(doc.id) for doc, _ in indice.buscar_por_vetores([consulta], k, filtro_chroma(janela))[0]
+    ]
+
+
+def tamanho_em_disco(diretorio):
+    return sum(os.path.getsize(os.path.join(raiz, arquivo))
+               for raiz, _, arquivos in os.walk(diretorio) for arquivo in arquivos)
+
+
+def abertura_a_frio(script, diretorio, consulta):
+    caminho = os.path.join(diretorio, "..", os.path.basename(diretorio) + "_consulta.npy")
+    np.save(caminho, consulta)
+    saida = subprocess.run([sys.executable, "-c", script, diretorio, caminho, RAIZ],
+                           capture_output=True, text=True, check=True)
+    return float(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", default="artigos.db")
+    parser.add_argument("--sintetico", type=int, default=0, help="N vetores sintéticos no lugar dos artigos")
+    parser.add_argument("--dimensao", type=int, default=1536)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rnd = np.random.default_rng(0)
+    if args.sintetico:
+        vetores, datas, consultas = corpus_sintetico(args.sintetico, args.dimensao, args.consultas, rnd)
+        print(f"Corpus sintético: {len(vetores)} vetores x {vetores.shape[1]} dimensões")
+    else:
+        vetores, datas, consultas = corpus_artigos(args.banco, args.consultas, rnd)
+        print(f"Corpus: {len(vetores)} chunks de {args.banco} x {vetores.shape[1]} dimensões (EmbeddingsLocal)")
+
+    # Metade das consultas com uma janela de 30 dias em volta de uma data do corpus
+    janelas = [None] * len(consultas)
+    for i in range(0, len(consultas), 2):
+        janelas[i] = janela_de_30_dias(int(datas[rnd.integers(0, len(datas))]))
+    verdade = exatos(vetores, datas, consultas, args.k, janelas)
+
+    limiar_ivf = max(1000, len(vetores) // 10)
+    indices = {
+        "chroma (hnsw)": (construir_chroma, {}, ABRIR_CHROMA),
+        "local float16": (construir_local, {"quantizacao": "float16", "limiar_ivf": 10 ** 12}, ABRIR_LOCAL),
+        "local int8": (construir_local, {"quantizacao": "int8", "limiar_ivf": 10 ** 12}, ABRIR_LOCAL),
+        "local float16 + IVF": (construir_local, {"quantizacao": "float16", "limiar_ivf": limiar_ivf}, ABRIR_LOCAL),
+    }
+
+    temporario = tempfile.mkdtemp(prefix="bench_indice_")
+    try:
+        print(f"\n  {'índice':<22} {'build':>8} {'disco':>9} {'abrir':>8} "
+              f"{'p50':>7} {'p95':>7} {'recall@' + str(args.k):>10} {'c/ filtro':>10}")
+        for nome, (construir, opcoes, abrir) in indices.items():
+            diretorio = os.path.join(temporario, nome.replace(" ", "_").replace("+", "").replace("(", "").replace(")", ""))
+            inicio = time.perf_counter()
+            buscar = construir(diretorio, vetores, datas, **opcoes)
+            construcao = time.perf_counter() - inicio
+            frio = abertura_a_frio(abrir, diretorio, consultas[0])
+
+            buscar(consultas[0], args.k, None)
+            latencias, acertos = [], {False: [], True: []}
+            for consulta, janela, esperado in zip(consultas, janelas, verdade):
+                inicio = time.perf_counter()
+                encontrados = buscar(consulta, args.k, janela)
+                latencias.append(time.perf_counter() - inicio)
+                if esperado:
+                    acertos[janela is not None].append(len(esperado & set(encontrados)) / len(esperado))
+
+            p50, p95 = np.percentile(latencias, [50, 95]) * 1000
+            print(
+                f"  {nome:<22} {construcao:7.2f}s {tamanho_em_disco(diretorio) / 1e6:7.1f}MB {frio * 1000:6.0f}ms "
+                f"{p50:5.2f}ms {p95:5.2f}ms {np.mean(acertos[False]):10.3f} {np.mean(acertos[True]):10.3f}"
+            )
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Limpeza de texto (getRequests.limpar_caracteres_agressivo): paridade e velocidade.
+
+    python benchmarks/bench_limpeza.py [--banco artigos.db] [--repeticoes 3]
+
+O corpus dourado são títulos, autores e corpos do banco, cada um também em versões
+"sujas" (NFD, entidades HTML, caracteres invisíveis, sequências escapadas, surrogates),
+mais casos de borda escritos à mão. A saída precisa ser idêntica byte a byte à da
+implementação anterior (copiada abaixo); o script sai com erro se não for.
+"""
+import argparse
+import html
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from getRequests import limpar_caracteres_agressivo, limpar_em_lote
+
+CASOS_DE_BORDA = [
+    "", " ", "\t\n", "abc", "  várias   linhas\n\n e\t tabs  ",
+    "a\u0301 e\u0300 i\u0303 o\u0302 u\u0301 c\u0327 n\u0303",
+    "A\u0301 maiúscula fica como está, y\u0301 também",
+    "a\u200b\u0301 (invisível no meio do acento)",
+    "\\c\\c\\cc \\\\cc", "\\u0301 \\u0300 \\u03\\c01 \\u030\\u03010",
+    "\\c\u200bx", "&amp;lt; &eacute; &#233; &nbsp;fim&nbsp;",
+    "\x00\x01\x0b\x0c\x1c\x1f\x7f\x85\x9f controle",
+    "\ufeffBOM e \u200bzwsp", "sur\ud800rogate \udfff solto",
+    "a \ud800 b", " \ud800", "linha\u2028separador\u3000ideográfico",
+    "R$ 1.000 – “aspas” — travessão…",
+]
+
+
+def limpar_referencia(texto):
+    """Implementação anterior, sem alterações"""
+    if not texto:
+        return ""
+    try:
+        texto = str(texto)
+        texto = html.unescape(texto)
+        texto = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', '', texto)
+        texto = texto.replace('\u200b', '').replace('\ufeff', '')
+        correcoes = {
+            'a\u0301': 'á', 'e\u0301': 'é', 'i\u0301': 'í', 'o\u0301': 'ó', 'u\u0301': 'ú',
+            'a\u0300': 'à', 'e\u0300': 'è', 'i\u0300': 'ì', 'o\u0300': 'ò', 'u\u0300': 'ù',
+            'a\u0303': 'ã', 'e\u0303': 'ẽ', 'i\u0303': 'ĩ', 'o\u0303': 'õ', 'u\u0303': 'ũ',
+            'a\u0302': 'â', 'e\u0302': 'ê', 'i\u0302': 'î', 'o\u0302': 'ô', 'u\u0302': 'û',
+            'c\u0327': 'ç', 'n\u0303': 'ñ',
+            '\\c': '', '\\c\u200b': '', '\\u0301': '', '\\u0300': ''
+        }
+        for erro, correcao in correcoes.items():
+            texto = texto.replace(erro, correcao)
+        texto = re.sub(r'\s+', ' ', texto)
+        texto = texto.encode('utf-8', 'ignore').decode('utf-8')
+    except Exception as e:
+        print(f"⚠️ Erro na limpeza: {e}")
+        texto = re.sub(r'[^\x20-\x7E\u00C0-\u00FF]', '', texto)
+    return texto.strip()
+
+
+def sujar(texto, rnd):
+    """Versão do texto com os problemas que a limpeza corrige"""
+    texto = unicodedata.normalize("NFD", texto)
+    pedacos = texto.split(" ")
+    ruidos = ["\u200b", "\ufeff", "\x0b", "\x85", "&amp;", "&eacute;", "&nbsp;", "\\c", "\\u0301", "\xa0", "\ud800"]
+    for _ in range(max(1, len(pedacos) // 20)):
+        i = rnd.randrange(len(pedacos))
+        pedacos[i] = pedacos[i] + rnd.choice(ruidos)
+    return "  ".join(pedacos)
+
+
+def corpus_dourado(banco, rnd):
+    textos = list(CASOS_DE_BORDA)
+    if os.path.exists(banco):
+        conn = sqlite3.connect(banco)
+        for titulo, autor, conteudo in conn.execute("SELECT titulo, autor, conteudo FROM artigos"):
+            for texto in (titulo, autor, conteudo):
+                if texto:
+                    textos.append(texto)
+                    textos.append(sujar(texto, rnd))
+        conn.close()
+    return textos
+
+
+def medir(funcao, textos, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(textos)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", default="artigos.db")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    textos = corpus_dourado(args.banco, random.Random(42))
+    megabytes = sum(len(t.encode("utf-8", "surrogatepass")) for t in textos) / 1e6
+
+    diferentes = [t for t in textos if limpar_caracteres_agressivo(t) != limpar_referencia(t)]
+    print(f"Corpus: {len(textos)} textos, {megabytes:.1f} MB")
+    print(f"Saídas diferentes da implementação anterior: {len(diferentes)}")
+    for texto in diferentes[:5]:
+        print(f"  {texto[:80]!r}")
+
+    antes = medir(lambda ts: [limpar_referencia(t) for t in ts], textos, args.repeticoes)
+    depois = medir(limpar_em_lote, textos, args.repeticoes)
+    print(f"\n  anterior  {antes * 1000:8.1f} ms  ({megabytes / antes:6.1f} MB/s)")
+    print(f"  atual     {depois * 1000:8.1f} ms  ({megabytes / depois:6.1f} MB/s)")
+    print(f"  ganho     {antes / depois:8.2f}x")
+
+    sys.exit(1 if diferentes else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Benchmark offline do RAG sobre o artigos.db: velocidade e qualidade da recuperação.
+
+    python benchmarks/bench_rag.py [--banco artigos.db] [--backend chroma] [-k 3]
+                                   [--repeticoes 3] [--saida bench_rag.json]
+                                   [--comparar bench_rag_anterior.json]
+
+Roda numa cópia do banco, num diretório temporário, com o EmbeddingsLocal
+(determinístico, sem rede) e um modelo falso em stream. A data de referência vem
+do arquivo de perguntas (benchmarks/perguntas_rag.json), então "ontem" ou
+"última semana" dão sempre o mesmo período.
+
+Mede:
+- ingestão: storage.save do corpus num banco vazio e chunking + embedding
+- construção do índice (reloadVetorDB) no backend escolhido
+- recuperação (customRetrievel): p50/p95/p99, recall@k, MRR e acerto do filtro
+  de datas, no geral e por tipo de pergunta (temporal / tópico)
+- resposta completa (RagEngine.responder): etapas do rastreamento, primeiro
+  token e tokens do prompt (o modelo falso responde na hora: só o pipeline conta)
+- planos das consultas quentes do SQLite (storage.verificar_planos)
+
+recall@k = relevantes encontrados / min(relevantes, k). O JSON de saída leva o
+commit atual; --comparar mostra a diferença para um resultado anterior.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import rag
+import storage
+from core.helpers.chatHelper import customRetrievel, detectar_filtro_data, limites_do_filtro
+from core.helpers.chunker import dividir_documentos
+from core.helpers.embeddingCache import EmbeddingsLocal
+from core.helpers.streamHelper import percentil
+from core.helpers.tracing import coletor
+
+PERGUNTAS = os.path.join(RAIZ, "benchmarks", "perguntas_rag.json")
+
+RESPOSTA_FALSA = (
+    "Segundo o NeoFeed, a empresa anunciou a operação nesta semana. "
+    "Fonte: https://neofeed.com.br/"
+)
+
+# Métricas comparadas com --comparar: (caminho no JSON, maior é melhor)
+PRINCIPAIS = [
+    (("ingestao", "artigos_por_segundo"), True),
+    (("ingestao", "chunks_por_segundo"), True),
+    (("indice", "segundos"), False),
+    (("recuperacao", "geral", "p50_ms"), False),
+    (("recuperacao", "geral", "p95_ms"), False),
+    (("recuperacao", "geral", "recall"), True),
+    (("recuperacao", "geral", "mrr"), True),
+    (("recuperacao", "geral", "filtro_correto"), True),
+    (("resposta", "primeiro_token_ms", "p50"), False),
+    (("resposta", "tokens_prompt", "p50"), False),
+]
+
+
+class SinkLista:
+    """Guarda os rastros das respostas para o relatório"""
+
+    def __init__(self):
+        self.rastros = []
+
+    def emitir(self, rastro):
+        self.rastros.append(rastro.para_dict())
+
+
+def commit_atual():
+    try:
+        saida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                               capture_output=True, text=True, check=True)
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def distribuicao(valores):
+    return {
+        "n": len(valores),
+        "p50": percentil(valores, 50),
+        "p95": percentil(valores, 95),
+        "p99": percentil(valores, 99),
+        "max": max(valores, default=None),
+    }
+
+
+def medir_ingestao(embeddings):
+    # conectar() migra o schema da cópia (o banco original não é tocado)
+    conn = storage.conectar()
+    posts = [
+        dict(zip(storage.COLUNAS_ARTIGO, linha))
+        for linha in conn.execute(f"SELECT {', '.join(storage.COLUNAS_ARTIGO)} FROM artigos")
+    ]
+    conn.close()
+
+    inicio = time.perf_counter()
+    storage.save(posts, arquivo_db="ingestao.db")
+    gravacao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    chunks = dividir_documentos(rag.load_documents_from_sql(),
+                                max_tokens=rag.CHUNK_MAX_TOKENS, min_tokens=rag.CHUNK_MIN_TOKENS)
+    chunking = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    embeddings.embed_documents([chunk.page_content for chunk in chunks])
+    embedding = time.perf_counter() - inicio
+
+    return {
+        "artigos": len(posts),
+        "chunks": len(chunks),
+        "gravacao_s": gravacao,
+        "chunking_s": chunking,
+        "embedding_s": embedding,
+        "artigos_por_segundo": len(posts) / gravacao if gravacao else None,
+        "chunks_por_segundo": len(chunks) / (chunking + embedding) if chunking + embedding else None,
+    }
+
+
+def avaliar(pergunta, docs, hoje, k):
+    encontrados = [doc.metadata.get("doc_id") for doc in docs]
+    relevantes = set(pergunta["relevantes"])
+    acertos = relevantes & set(encontrados)
+    posicao = next((i for i, doc_id in enumerate(encontrados, 1) if doc_id in relevantes), None)
+
+    filtro = limites_do_filtro(detectar_filtro_data(pergunta["pergunta"], hoje))
+    esperado = tuple(pergunta["filtro"]) if pergunta["filtro"] else (None, None)
+    return {
+        "pergunta": pergunta["pergunta"],
+        "tipo": pergunta["tipo"],
+        "encontrados": encontrados,
+        "recall": len(acertos) / min(len(relevantes), k) if relevantes else None,
+        "rr": 1.0 / posicao if posicao else 0.0,
+        "filtro": list(filtro),
+        "filtro_correto": filtro == esperado,
+    }
+
+
+def resumir(avaliacoes, latencias):
+    if not avaliacoes:
+        return None
+    recalls = [a["recall"] for a in avaliacoes if a["recall"] is not None]
+    return {
+        "perguntas": len(avaliacoes),
+        "p50_ms": percentil(latencias, 50),
+        "p95_ms": percentil(latencias, 95),
+        "p99_ms": percentil(latencias, 99),
+        "recall": sum(recalls) / len(recalls) if recalls else None,
+        "mrr": sum(a["rr"] for a in avaliacoes) / len(avaliacoes),
+        "filtro_correto": sum(a["filtro_correto"] for a in avaliacoes) / len(avaliacoes),
+    }
+
+
+def medir_recuperacao(vectorstore, perguntas, hoje, k, repeticoes):
+    retriever = customRetrievel(vectorstore, k=k, hoje=hoje)
+    # Aquecimento (abertura do índice, caches do SQLite)
+    retriever.invoke(perguntas[0]["pergunta"])
+
+    avaliacoes, latencias = [], {}
+    for pergunta in perguntas:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            docs = retriever.invoke(pergunta["pergunta"])
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        avaliacao = avaliar(pergunta, docs, hoje, k)
+        avaliacao["p50_ms"] = percentil(tempos, 50)
+        avaliacoes.append(avaliacao)
+        latencias[pergunta["pergunta"]] = tempos
+
+    resultado = {"geral": resumir(avaliacoes, [t for tempos in latencias.values() for t in tempos])}
+    for tipo in sorted({a["tipo"] for a in avaliacoes}):
+        do_tipo = [a for a in avaliacoes if a["tipo"] == tipo]
+        resultado[tipo] = resumir(do_tipo, [t for a in do_tipo for t in latencias[a["pergunta"]]])
+    resultado["perguntas"] = avaliacoes
+    return resultado
+
+
+def medir_resposta(perguntas, hoje, embeddings):
+    # Sem cache de respostas: cada pergunta passa pelo pipeline inteiro
+    rag.CACHE_RESPOSTAS = False
+    rag.TRACING_SINKS = ["prometheus"]
+    engine = rag.initRag(llm=FakeListChatModel(responses=[RESPOSTA_FALSA]), embeddings=embeddings)
+    engine.retriever = customRetrievel(engine.vectorstore, k=3, hoje=hoje)
+
+    sink = SinkLista()
+    coletor.adicionar(sink)
+    for i, pergunta in enumerate(perguntas):
+        for _ in engine.responder(pergunta["pergunta"], f"bench-{i}"):
+            pass
+
+    etapas = coletor.prometheus().resumo()["etapas_ms"]
+    tokens = [r["tokens_prompt"] for r in sink.rastros if "tokens_prompt" in r]
+    return {
+        "respostas": len(sink.rastros),
+        "etapas_ms": etapas,
+        "primeiro_token_ms": {chave: etapas.get("primeiro_token", {}).get(chave) for chave in ("p50", "p95", "p99")},
+        "tokens_prompt": distribuicao(tokens),
+    }
+
+
+def obter(resultado, caminho):
+    for chave in caminho:
+        if not isinstance(resultado, dict):
+            return None
+        resultado = resultado.get(chave)
+    return resultado
+
+
+def comparar(atual, anterior):
+    print(f"\nComparação com {anterior.get('commit') or '?'} ({anterior.get('data', '')[:16]}):")
+    for caminho, maior_melhor in PRINCIPAIS:
+        antes, depois = obter(anterior, caminho), obter(atual, caminho)
+        if antes is None or depois is None:
+            continue
+        variacao = (depois - antes) / antes if antes else 0.0
+        piorou = variacao < -0.05 if maior_melhor else variacao > 0.05
+        print(f"  {'.'.join(caminho):<36} {antes:10.3f} -> {depois:10.3f} {variacao:+7.1%}{'  ⚠️' if piorou else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", default="artigos.db")
+    parser.add_argument("--perguntas", default=PERGUNTAS)
+    parser.add_argument("--backend", choices=["chroma", "local"], default=rag.VETOR_BACKEND)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", default="bench_rag.json")
+    parser.add_argument("--comparar", help="resultado JSON anterior")
+    args = parser.parse_args()
+
+    # Chroma avisa a cada busca que o EmbeddingsLocal dá scores fora de [0, 1]
+    warnings.filterwarnings("ignore", message="Relevance scores")
+
+    with open(args.perguntas, encoding="utf-8") as f:
+        rotulado = json.load(f)
+    hoje = datetime.fromisoformat(rotulado["hoje"])
+    perguntas = rotulado["perguntas"]
+
+    banco = os.path.abspath(args.banco)
+    saida = os.path.abspath(args.saida)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    temporario = tempfile.mkdtemp(prefix="bench_rag_")
+    origem = os.getcwd()
+    try:
+        # Tudo o que o rag/storage grava por caminho relativo fica no temporário
+        shutil.copy(banco, os.path.join(temporario, "artigos.db"))
+        shutil.copy(os.path.join(RAIZ, "promptContextual.txt"), temporario)
+        os.chdir(temporario)
+        rag.VETOR_BACKEND = args.backend
+        rag.CHROMA_DIR = os.path.join(temporario, "chroma_db")
+        rag.INDICE_LOCAL_DIR = os.path.join(temporario, "indice_local")
+        rag.INDEXADOR_AUTOMATICO = False
+        embeddings = EmbeddingsLocal()
+
+        resultado = {
+            "commit": commit_atual(),
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "backend": args.backend,
+            "k": args.k,
+            "hoje": rotulado["hoje"],
+        }
+
+        print(f"Ingestão de {args.banco}...")
+        resultado["ingestao"] = medir_ingestao(embeddings)
+
+        print(f"Construção do índice ({args.backend})...")
+        colecao = rag.indiceAtivo()["colecao"]
+        inicio = time.perf_counter()
+        vectorstore = rag.reloadVetorDB(rag.abrirVectorstore(embeddings, colecao), colecao=colecao)
+        resultado["indice"] = {"segundos": time.perf_counter() - inicio, "vetores": rag.contarVetores(vectorstore)}
+
+        print(f"Recuperação ({len(perguntas)} perguntas x {args.repeticoes})...")
+        resultado["recuperacao"] = medir_recuperacao(vectorstore, perguntas, hoje, args.k, args.repeticoes)
+
+        print("Resposta completa (modelo falso)...")
+        resultado["resposta"] = medir_resposta(perguntas, hoje, embeddings)
+
+        resultado["planos_sql"] = [list(problema) for problema in storage.verificar_planos()]
+    finally:
+        os.chdir(origem)
+        shutil.rmtree(temporario, ignore_errors=True)
+
+    ingestao, indice = resultado["ingestao"], resultado["indice"]
+    print(f"\n  ingestão: {ingestao['artigos']} artigos em {ingestao['gravacao_s'] * 1000:.0f}ms "
+          f"({ingestao['artigos_por_segundo']:.0f}/s); {ingestao['chunks']} chunks em "
+          f"{(ingestao['chunking_s'] + ingestao['embedding_s']) * 1000:.0f}ms ({ingestao['chunks_por_segundo']:.0f}/s)")
+    print(f"  índice: {indice['vetores']} vetores em {indice['segundos']:.2f}s")
+
+    print(f"\n  {'recuperação':<12} {'perguntas':>9} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'recall@' + str(args.k):>9} {'MRR':>6} {'filtro':>7}")
+    for nome in ("geral", "temporal", "topico"):
+        r = resultado["recuperacao"].get(nome)
+        if r:
+            print(f"  {nome:<12} {r['perguntas']:9d} {r['p50_ms']:6.1f}ms {r['p95_ms']:6.1f}ms {r['p99_ms']:6.1f}ms "
+                  f"{r['recall']:9.3f} {r['mrr']:6.3f} {r['filtro_correto']:7.1%}")
+
+    falhas = [a for a in resultado["recuperacao"]["perguntas"] if a["rr"] == 0 or not a["filtro_correto"]]
+    if falhas:
+        print("\n  Perguntas sem acerto ou com filtro errado:")
+        for a in falhas:
+            print(f"    - {a['pergunta']} (filtro {a['filtro']}{'' if a['filtro_correto'] else ', esperado outro'})")
+
+    resposta = resultado["resposta"]
+    print(f"\n  resposta: {resposta['respostas']} respostas; primeiro token p50 "
+          f"{resposta['primeiro_token_ms']['p50']:.1f}ms / p95 {resposta['primeiro_token_ms']['p95']:.1f}ms; "
+          f"tokens do prompt p50 {resposta['tokens_prompt']['p50']} / máx. {resposta['tokens_prompt']['max']}")
+    for nome, etapa in sorted(resposta["etapas_ms"].items(), key=lambda item: -(item[1]["p50"] or 0)):
+        print(f"    {nome:<20} p50 {etapa['p50']:8.2f}ms  p95 {etapa['p95']:8.2f}ms")
+
+    print(f"\n  planos SQL: {'ok' if not resultado['planos_sql'] else resultado['planos_sql']}")
+
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\nResultado salvo em {saida}")
+
+    if anterior is not None:
+        comparar(resultado, anterior)
+
+
+if __name__ == "__main__":
+    main()
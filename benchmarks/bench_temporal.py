@@ -0,0 +1,184 @@
+"""
+Custo por consulta do detector de datas (microssegundos).
+
+    python benchmarks/bench_temporal.py [--repeticoes 2000]
+
+Compara a versão anterior (um DetectorTemporalNoticias novo por pergunta,
+como o detectar_filtro_data fazia) com o detector compilado, sem e com o LRU,
+e lista as consultas em que o resultado mudou. Sai com erro se alguma pergunta
+sem data (SEM_FILTRO) ganhar filtro.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.helpers.detectorTemporalNoticias import DetectorTemporalNoticias, _interpretar
+
+HOJE = datetime(2025, 12, 10, 15, 0)
+
+CONSULTAS = [
+    "Quais as novidades de hoje?",
+    "quais as últimas notícias sobre o Banco Central?",
+    "novidades de ontem sobre startups",
+    "o que saiu hoje sobre a Petrobras",
+    "o que aconteceu ontem no mercado",
+    "matérias da última semana sobre IA",
+    "resumo dos últimos 15 dias",
+    "notícias do último mês sobre fusões",
+    "o que foi publicado este mês",
+    "o que saiu no mês passado sobre o agro",
+    "matérias do dia 27 de novembro",
+    "notícias de 23/11",
+    "o que saiu em 01/12/2025",
+    "matéria de 5 de dezembro de 2025",
+    "o que o NeoFeed publicou sobre o Nubank",
+    "fale sobre a entrevista com o CEO da Vale",
+    "quem é o novo presidente da Vivo",
+    "quais empresas renovaram contratos",
+    "resultados do terceiro trimestre",
+    "o que houve em novembro",
+    "notícias de março de 2025",
+]
+
+# Perguntas sem data: nome de mês como palavra comum ou nome próprio.
+# Qualquer filtro aqui é falso positivo (e o benchmark sai com erro)
+SEM_FILTRO = [
+    "o que diz o marco legal das startups?",
+    "Marco Stefanini falou sobre IA",
+    "a criação de um marco regulatório para a IA",
+    "o que a Maio Capital anunciou",
+    "quem é o CEO da Abril",
+]
+
+
+class DetectorReferencia:
+    """Cópia da implementação anterior (sem o caminho 'este mês'/'mês passado', que quebrava)"""
+
+    def __init__(self, hoje):
+        self.hoje = hoje
+        self.indicadores_recencia = {
+            'últimas notícias', 'novidades', 'notícias recentes',
+            'atualidades', 'ultimas', 'recentes', 'agora',
+            'última hora', 'breaking news', 'novo'
+        }
+        self.intervalos_noticias = {
+            'últimas 24 horas': timedelta(days=1),
+            'últimas 48 horas': timedelta(days=2),
+            'última semana': timedelta(weeks=1),
+            'semana passada': timedelta(weeks=1),
+            'últimos 7 dias': timedelta(days=7),
+            'últimos 15 dias': timedelta(days=15),
+            'último mês': timedelta(days=30),
+            'este mês': datetime(self.hoje.year, self.hoje.month, 1),
+            'mês passado': datetime(self.hoje.year, self.hoje.month - 1, 1) if self.hoje.month > 1
+            else datetime(self.hoje.year - 1, 12, 1),
+        }
+
+    def detectar_filtro_temporal(self, consulta):
+        consulta = consulta.lower().strip()
+        if any(indicador in consulta for indicador in self.indicadores_recencia):
+            if "ontem" in consulta and not any(p in consulta for p in ("hoje", "agora", "última hora")):
+                return {"data": (self.hoje - timedelta(days=1)).strftime("%Y-%m-%d")}
+            return {"$gte": self.hoje.strftime("%Y-%m-%d")}
+
+        for palavra, dias in (("hoje", 0), ("ontem", -1), ("amanhã", 1)):
+            if palavra in consulta:
+                return {"data": (self.hoje + timedelta(days=dias)).strftime("%Y-%m-%d")}
+
+        for intervalo, delta in self.intervalos_noticias.items():
+            if intervalo in consulta:
+                inicio = delta if isinstance(delta, datetime) else self.hoje - delta
+                return {"$gte": inicio.strftime("%Y-%m-%d")}
+
+        meses = {
+            'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4,
+            'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8,
+            'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
+        }
+        match = re.search(r"(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?", consulta)
+        if match:
+            dia, mes, ano = match.groups()
+            try:
+                return {"data": datetime(int(ano) if ano else self.hoje.year, int(mes), int(dia)).strftime("%Y-%m-%d")}
+            except ValueError:
+                pass
+        match = re.search(r"dia\s+(\d{1,2})(?:\s+de\s+(\w+))?(?:\s+de\s+(\d{4}))?", consulta)
+        if match:
+            dia, mes_str, ano = match.groups()
+            mes = meses.get(mes_str) if mes_str else self.hoje.month
+            if mes:
+                try:
+                    return {"data": datetime(int(ano) if ano else self.hoje.year, mes, int(dia)).strftime("%Y-%m-%d")}
+                except ValueError:
+                    pass
+        match = re.search(r"(\d{1,2})\s+de\s+(\w+)(?:\s+de\s+(\d{4}))?", consulta)
+        if match:
+            dia, mes_str, ano = match.groups()
+            mes = meses.get(mes_str)
+            if mes:
+                try:
+                    return {"data": datetime(int(ano) if ano else self.hoje.year, mes, int(dia)).strftime("%Y-%m-%d")}
+                except ValueError:
+                    pass
+        return None
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for consulta in CONSULTAS:
+            funcao(consulta)
+    return (time.perf_counter() - inicio) / (repeticoes * len(CONSULTAS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    args = parser.parse_args()
+
+    detector = DetectorTemporalNoticias(HOJE)
+
+    def sem_cache(consulta):
+        _interpretar.cache_clear()
+        return detector.detectar_filtro_temporal(consulta)
+
+    resultados = {
+        "anterior (instância por pergunta)": medir(
+            lambda c: DetectorReferencia(HOJE).detectar_filtro_temporal(c), args.repeticoes),
+        "compilado, sem LRU": medir(sem_cache, args.repeticoes),
+        "compilado, com LRU": medir(detector.detectar_filtro_temporal, args.repeticoes),
+    }
+
+    print(f"{len(CONSULTAS)} consultas x {args.repeticoes} repetições (hoje = {HOJE:%Y-%m-%d})\n")
+    for nome, micros in resultados.items():
+        print(f"  {nome:<36} {micros:8.2f} µs/consulta")
+
+    referencia = DetectorReferencia(HOJE)
+    diferencas = [
+        (consulta, referencia.detectar_filtro_temporal(consulta), detector.detectar_filtro_temporal(consulta))
+        for consulta in CONSULTAS
+        if referencia.detectar_filtro_temporal(consulta) != detector.detectar_filtro_temporal(consulta)
+    ]
+    print(f"\nResultados diferentes da versão anterior: {len(diferencas)}")
+    for consulta, antes, depois in diferencas:
+        print(f"  {consulta!r}: {antes} -> {depois}")
+
+    falsos_positivos = [
+        (consulta, detector.detectar_filtro_temporal(consulta))
+        for consulta in SEM_FILTRO
+        if detector.detectar_filtro_temporal(consulta) is not None
+    ]
+    print(f"\nFalsos positivos em perguntas sem data: {len(falsos_positivos)} de {len(SEM_FILTRO)}")
+    for consulta, filtro in falsos_positivos:
+        print(f"  {consulta!r}: {filtro}")
+    if falsos_positivos:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+Teste de carga do chat do app.py: N usuários simultâneos num mesmo processo.
+
+    python benchmarks/loadtest.py [--usuarios 10,25,50] [--duracao 60] [--rampa 10]
+                                  [--pensar 5,15] [--llm-ttft-ms 400] [--llm-tokens 150]
+                                  [--llm-token-ms 20] [--embed-ms 80] [--saida loadtest.json]
+
+Cada usuário virtual é uma thread, como a de cada sessão do Streamlit, com seu
+próprio session_id. Ele faz perguntas de benchmarks/perguntas_rag.json por
+rag.chatMessage (engine compartilhado, histórico, coalescer, stream) e pensa entre
+uma pergunta e outra. A OpenAI é trocada por um servidor falso, em outro processo,
+compatível com /v1/chat/completions (SSE) e /v1/embeddings, com latências
+configuráveis. O ChatOpenAI e o OpenAIEmbeddings são os de produção, com o pool
+HTTP de rag.clientesHttp; só o tiktoken do OpenAIEmbeddings fica desligado
+(o servidor falso recebe o texto).
+
+Para cada nível de usuários: respostas por segundo, erros, tempo até o primeiro
+pedaço e total (p50/p95/p99), RSS e threads (pico), e as etapas do rastreamento
+(core/helpers/tracing.py). No fim, o crescimento de memória entre os níveis.
+Não inclui o custo do próprio Streamlit (websocket e rerun do script).
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import warnings
+from array import array
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+PERGUNTAS = os.path.join(RAIZ, "benchmarks", "perguntas_rag.json")
+MENSAGEM_ERRO = "Desculpe, ocorreu um erro"
+
+PALAVRAS = (
+    "Segundo o NeoFeed a empresa anunciou nesta semana uma operação que reforça "
+    "sua estratégia no Brasil com foco em crescimento e rentabilidade nos próximos anos"
+).split()
+
+
+# ---------------------
+# Servidor falso da OpenAI (processo separado)
+# ---------------------
+
+class ServidorOpenAIFalso(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, endereco, ttft, tokens, intervalo_token, latencia_embedding):
+        super().__init__(endereco, HandlerOpenAIFalso)
+        self.ttft = ttft
+        self.tokens = tokens
+        self.intervalo_token = intervalo_token
+        self.latencia_embedding = latencia_embedding
+        from core.helpers.embeddingCache import EmbeddingsLocal
+        self.embedder = EmbeddingsLocal()
+
+
+class HandlerOpenAIFalso(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/embeddings"):
+            self._embeddings(corpo)
+        elif self.path.endswith("/chat/completions"):
+            self._chat(corpo)
+        else:
+            self.send_error(404)
+
+    def _json(self, dados):
+        conteudo = json.dumps(dados).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(conteudo)))
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def _embeddings(self, corpo):
+        entradas = corpo["input"]
+        if isinstance(entradas, str) or (entradas and isinstance(entradas[0], int)):
+            entradas = [entradas]
+        # Lista de tokens (tiktoken ligado) vira texto só para gerar um vetor estável
+        textos = [texto if isinstance(texto, str) else " ".join(map(str, texto)) for texto in entradas]
+        time.sleep(self.server.latencia_embedding)
+
+        dados = []
+        for i, vetor in enumerate(self.server.embedder.embed_documents(textos)):
+            if corpo.get("encoding_format") == "base64":
+                vetor = base64.b64encode(array("f", vetor).tobytes()).decode("ascii")
+            dados.append({"object": "embedding", "index": i, "embedding": vetor})
+        self._json({
+            "object": "list", "data": dados, "model": corpo.get("model", "falso"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    def _pedaco(self, dados):
+        conteudo = f"data: {json.dumps(dados)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(conteudo):x}\r\n".encode("ascii") + conteudo + b"\r\n")
+        self.wfile.flush()
+
+    def _chat(self, corpo):
+        modelo = corpo.get("model", "falso")
+        texto = [PALAVRAS[i % len(PALAVRAS)] + " " for i in range(self.server.tokens)]
+        time.sleep(self.server.ttft)
+
+        if not corpo.get("stream"):
+            self._json({
+                "id": "falso", "object": "chat.completion", "created": int(time.time()), "model": modelo,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(texto)},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(texto), "total_tokens": len(texto)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {"id": "falso", "object": "chat.completion.chunk", "created": int(time.time()), "model": modelo}
+        for i, palavra in enumerate(texto):
+            if i:
+                time.sleep(self.server.intervalo_token)
+            delta = {"role": "assistant", "content": palavra} if i == 0 else {"content": palavra}
+            self._pedaco({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        self._pedaco({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (corpo.get("stream_options") or {}).get("include_usage"):
+            self._pedaco({**base, "choices": [], "usage": {
+                "prompt_tokens": 0, "completion_tokens": len(texto), "total_tokens": len(texto)}})
+        fim = b"data: [DONE]\n\n"
+        self.wfile.write(f"{len(fim):x}\r\n".encode("ascii") + fim + b"\r\n0\r\n\r\n")
+        self.wfile.flush()
+
+
+def servir(args):
+    servidor = ServidorOpenAIFalso(("127.0.0.1", args.servir), args.llm_ttft_ms / 1000, args.llm_tokens,
+                                   args.llm_token_ms / 1000, args.embed_ms / 1000)
+    servidor.serve_forever()
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_servidor(args):
+    porta = porta_livre()
+    processo = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), "--servir", str(porta),
+        "--llm-ttft-ms", str(args.llm_ttft_ms), "--llm-tokens", str(args.llm_tokens),
+        "--llm-token-ms", str(args.llm_token_ms), "--embed-ms", str(args.embed_ms),
+    ])
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", porta), timeout=1).close()
+            return processo, f"http://127.0.0.1:{porta}/v1"
+        except OSError:
+            time.sleep(0.1)
+    processo.kill()
+    raise RuntimeError("Servidor falso da OpenAI não subiu")
+
+
+# ---------------------
+# Processo do chat
+# ---------------------
+
+def memoria_e_threads():
+    """(RSS em MB, threads do sistema) do processo atual"""
+    try:
+        with open("/proc/self/status") as f:
+            campos = dict(linha.split(":", 1) for linha in f if ":" in linha)
+        return int(campos["VmRSS"].split()[0]) / 1024, int(campos["Threads"])
+    except (OSError, KeyError, ValueError):
+        # Fora do Linux: pico de RSS e só as threads do Python
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / (1024 * 1024 if sys.platform == "darwin" else 1024), threading.active_count()
+
+
+class Monitor:
+    """Amostra memória e threads em segundo plano enquanto um nível roda"""
+
+    def __init__(self, intervalo=0.25):
+        self.intervalo = intervalo
+        self.amostras = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._rodar, daemon=True)
+
+    def _rodar(self):
+        while True:
+            rss, threads = memoria_e_threads()
+            self.amostras.append((rss, threads, threading.active_count()))
+            if self._parar.wait(self.intervalo):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *erro):
+        self._parar.set()
+        self._thread.join()
+
+    def resumo(self):
+        return {
+            "rss_inicio_mb": self.amostras[0][0],
+            "rss_pico_mb": max(a[0] for a in self.amostras),
+            "rss_fim_mb": self.amostras[-1][0],
+            "threads_pico": max(a[1] for a in self.amostras),
+            "threads_python_pico": max(a[2] for a in self.amostras),
+        }
+
+
+def usuario_virtual(indice, perguntas, fim, pensar, resultados):
+    import rag
+    rnd = random.Random(indice)
+    session_id = f"carga-{indice}-{uuid.uuid4().hex[:8]}"
+    while time.monotonic() < fim:
+        pergunta = rnd.choice(perguntas)
+        inicio = time.perf_counter()
+        primeiro = None
+        caracteres = 0
+        erro = False
+        # Consome como o st.write_stream
+        for texto in rag.chatMessage(pergunta, session_id):
+            if primeiro is None:
+                primeiro = time.perf_counter() - inicio
+            caracteres += len(texto)
+            erro = erro or texto.startswith(MENSAGEM_ERRO)
+        resultados.append({
+            "usuario": indice,
+            "ttft": primeiro,
+            "total": time.perf_counter() - inicio,
+            "caracteres": caracteres,
+            "erro": erro,
+        })
+        espera = rnd.uniform(*pensar)
+        time.sleep(max(0.0, min(espera, fim - time.monotonic())))
+
+
+def rodar_nivel(usuarios, perguntas, duracao, rampa, pensar):
+    from core.helpers.streamHelper import percentil
+    from core.helpers.tracing import coletor, configurar_sinks
+    configurar_sinks(["prometheus"])
+
+    resultados = []
+    inicio = time.monotonic()
+    fim = inicio + duracao
+    with Monitor() as monitor:
+        threads = []
+        for i in range(usuarios):
+            # Entrada escalonada ao longo da rampa
+            atraso = rampa * i / usuarios if usuarios else 0
+            thread = threading.Thread(
+                target=lambda i=i, atraso=atraso: (time.sleep(atraso),
+                                                   usuario_virtual(i, perguntas, fim, pensar, resultados)),
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+    decorrido = time.monotonic() - inicio
+
+    ttfts = [r["ttft"] * 1000 for r in resultados if r["ttft"] is not None and not r["erro"]]
+    totais = [r["total"] * 1000 for r in resultados if not r["erro"]]
+    etapas = coletor.prometheus().resumo()["etapas_ms"]
+    return {
+        "usuarios": usuarios,
+        "segundos": decorrido,
+        "respostas": len(resultados),
+        "erros": sum(r["erro"] for r in resultados),
+        "respostas_por_segundo": len(resultados) / decorrido if decorrido else 0.0,
+        "caracteres_por_segundo": sum(r["caracteres"] for r in resultados) / decorrido if decorrido else 0.0,
+        "ttft_ms": {f"p{q}": percentil(ttfts, q) for q in (50, 95, 99)},
+        "total_ms": {f"p{q}": percentil(totais, q) for q in (50, 95, 99)},
+        "etapas_ms": {nome: {"p50": e["p50"], "p95": e["p95"]} for nome, e in etapas.items()},
+        **monitor.resumo(),
+    }
+
+
+def preparar_engine(url_servidor):
+    import rag
+    from langchain_openai import OpenAIEmbeddings
+    from core.helpers.embeddingCache import CachedEmbeddings
+
+    os.environ["OPENAI_API_KEY"] = "chave-falsa"
+    os.environ["OPENAI_API_BASE"] = url_servidor
+    os.environ["OPENAI_BASE_URL"] = url_servidor
+    rag.INDEXADOR_AUTOMATICO = False
+    rag.TRACING_SINKS = ["prometheus"]
+    rag.CHROMA_DIR = os.path.abspath("chroma_db")
+    rag.INDICE_LOCAL_DIR = os.path.abspath("indice_local")
+
+    embeddings = CachedEmbeddings(
+        OpenAIEmbeddings(api_key=rag.getApiKey(), check_embedding_ctx_length=False, **rag.clientesHttp()),
+        arquivo_db=rag.EMBEDDINGS_CACHE_DB
+    )
+    colecao = rag.indiceAtivo()["colecao"]
+    print("Indexando o corpus no servidor falso...")
+    rag.reloadVetorDB(rag.abrirVectorstore(embeddings, colecao), colecao=colecao)
+
+    # O mesmo engine que getEngine() devolveria, só com os embeddings acima
+    # (o ChatOpenAI é o padrão do initRag, apontado para o servidor falso)
+    rag._engine = rag.initRag(embeddings=embeddings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", default="artigos.db")
+    parser.add_argument("--perguntas", default=PERGUNTAS)
+    parser.add_argument("--usuarios", default="10,25,50", help="níveis de usuários simultâneos, separados por vírgula")
+    parser.add_argument("--duracao", type=float, default=60, help="segundos por nível")
+    parser.add_argument("--rampa", type=float, default=10, help="segundos para todos os usuários entrarem")
+    parser.add_argument("--pensar", default="5,15", help="pausa entre perguntas (mín,máx em segundos)")
+    parser.add_argument("--llm-ttft-ms", type=float, default=400)
+    parser.add_argument("--llm-tokens", type=int, default=150)
+    parser.add_argument("--llm-token-ms", type=float, default=20)
+    parser.add_argument("--embed-ms", type=float, default=80)
+    parser.add_argument("--sem-cache", action="store_true", help="desliga o cache de respostas")
+    parser.add_argument("--saida", default="loadtest.json")
+    parser.add_argument("--servir", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.servir:
+        servir(args)
+        return
+
+    # Chroma avisa a cada busca que os vetores do servidor falso dão scores fora de [0, 1]
+    warnings.filterwarnings("ignore", message="Relevance scores")
+
+    niveis = [int(n) for n in args.usuarios.split(",") if n.strip()]
+    pensar = tuple(float(p) for p in args.pensar.split(","))
+    with open(args.perguntas, encoding="utf-8") as f:
+        perguntas = [p["pergunta"] for p in json.load(f)["perguntas"]]
+
+    banco = os.path.abspath(args.banco)
+    saida = os.path.abspath(args.saida)
+    temporario = tempfile.mkdtemp(prefix="loadtest_")
+    origem = os.getcwd()
+    servidor = None
+    try:
+        shutil.copy(banco, os.path.join(temporario, "artigos.db"))
+        shutil.copy(os.path.join(RAIZ, "promptContextual.txt"), temporario)
+        os.chdir(temporario)
+
+        servidor, url = iniciar_servidor(args)
+        import rag
+        rag.CACHE_RESPOSTAS = not args.sem_cache
+        preparar_engine(url)
+
+        resultado = {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "configuracao": {chave: valor for chave, valor in vars(args).items() if chave != "servir"},
+            "rss_base_mb": memoria_e_threads()[0],
+            "niveis": [],
+        }
+        print(f"\n  {'usuários':>8} {'respostas':>9} {'erros':>6} {'resp/s':>7} {'ttft p50':>9} {'p95':>7} "
+              f"{'p99':>7} {'total p50':>10} {'p95':>7} {'RSS pico':>9} {'threads':>8}")
+        for usuarios in niveis:
+            nivel = rodar_nivel(usuarios, perguntas, args.duracao, args.rampa, pensar)
+            resultado["niveis"].append(nivel)
+            ttft, total = nivel["ttft_ms"], nivel["total_ms"]
+            print(
+                f"  {usuarios:8d} {nivel['respostas']:9d} {nivel['erros']:6d} {nivel['respostas_por_segundo']:7.2f} "
+                f"{ttft['p50'] or 0:7.0f}ms {ttft['p95'] or 0:5.0f}ms {ttft['p99'] or 0:5.0f}ms "
+                f"{total['p50'] or 0:8.0f}ms {total['p95'] or 0:5.0f}ms "
+                f"{nivel['rss_pico_mb']:7.0f}MB {nivel['threads_pico']:8d}"
+            )
+
+        resultado["rss_fim_mb"] = memoria_e_threads()[0]
+        print(f"\n  RSS: {resultado['rss_base_mb']:.0f}MB depois de subir o engine, "
+              f"{resultado['rss_fim_mb']:.0f}MB no fim (+{resultado['rss_fim_mb'] - resultado['rss_base_mb']:.0f}MB)")
+
+        maior = resultado["niveis"][-1] if resultado["niveis"] else None
+        if maior:
+            print(f"\n  Etapas com {maior['usuarios']} usuários (p50 / p95):")
+            for nome, etapa in sorted(maior["etapas_ms"].items(), key=lambda item: -(item[1]["p95"] or 0)):
+                print(f"    {nome:<20} {etapa['p50']:9.1f}ms {etapa['p95']:9.1f}ms")
+    finally:
+        os.chdir(origem)
+        if servidor is not None:
+            servidor.kill()
+            servidor.wait()
+        shutil.rmtree(temporario, ignore_errors=True)
+
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\nResultado salvo em {saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import json
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalizar_pergunta(pergunta):
+    """Minúsculas, sem acentos, sem pontuação e com espaços simples"""
+    texto = unicodedata.normalize("NFKD", (pergunta or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", texto))
+
+
+def _cosseno(a, b):
+    produto = sum(x * y for x, y in zip(a, b))
+    normas = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return produto / normas if normas else 0.0
+
+
+class CacheRespostas:
+    """
+    Respostas já geradas, reaproveitadas quando a mesma pergunta volta.
+
+    - chave: pergunta normalizada + filtro de datas resolvido + doc_ids recuperados
+    - com `embeddings` e `limiar_similaridade`, perguntas parecidas também acertam,
+      desde que tenham o mesmo filtro e recuperem os mesmos artigos
+    - a entrada expira quando algum artigo usado é regravado pelo storage.save
+      (coluna atualizado_em) ou depois de `ttl` segundos sem uso (cada acerto renova)
+    - acima de `max_entradas`, sai a usada há mais tempo (LRU)
+    """
+
+    def __init__(self, embeddings=None, limiar_similaridade=None, ttl=6 * 3600,
+                 max_entradas=5000, arquivo_db="artigos.db"):
+        self.embeddings = embeddings
+        self.limiar_similaridade = limiar_similaridade
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.arquivo_db = arquivo_db
+
+        # (contexto, pergunta normalizada) -> entrada, em ordem de uso
+        self._entradas = OrderedDict()
+        # contexto -> perguntas normalizadas (para a busca por similaridade)
+        self._por_contexto = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.hits_similares = 0
+        self.misses = 0
+        self.expirados = 0
+
+    @staticmethod
+    def _contexto(filtro, doc_ids):
+        filtro_txt = json.dumps(filtro, sort_keys=True) if filtro else ""
+        return filtro_txt + "|" + ",".join(sorted({d for d in doc_ids if d}))
+
+    def _usar_similaridade(self):
+        return self.embeddings is not None and self.limiar_similaridade is not None
+
+    def _vetor(self, pergunta):
+        # Com CachedEmbeddings, a pergunta já embedada pelo retriever sai do cache
+        return self.embeddings.embed_query(pergunta)
+
+    def _remover(self, chave):
+        self._entradas.pop(chave, None)
+        contexto, normalizada = chave
+        perguntas = self._por_contexto.get(contexto)
+        if perguntas is not None:
+            perguntas.discard(normalizada)
+            if not perguntas:
+                del self._por_contexto[contexto]
+
+    def _valida(self, entrada):
+        if self.ttl is not None and time.time() - entrada["usado_em"] > self.ttl:
+            return False
+        from storage import ultima_atualizacao
+        ultima = ultima_atualizacao(entrada["doc_ids"], self.arquivo_db)
+        return ultima is None or ultima <= entrada["criado_em"]
+
+    def buscar(self, pergunta, filtro, doc_ids):
+        """Resposta guardada para a pergunta, ou None"""
+        contexto = self._contexto(filtro, doc_ids)
+        chave = (contexto, normalizar_pergunta(pergunta))
+        similar = False
+
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            candidatas = list(self._por_contexto.get(contexto, ()))
+
+        if entrada is None and candidatas and self._usar_similaridade():
+            vetor = self._vetor(pergunta)
+            melhor = self.limiar_similaridade
+            with self._lock:
+                for normalizada in candidatas:
+                    outra = self._entradas.get((contexto, normalizada))
+                    if outra is None or outra["vetor"] is None:
+                        continue
+                    similaridade = _cosseno(vetor, outra["vetor"])
+                    if similaridade >= melhor:
+                        melhor = similaridade
+                        chave, entrada = (contexto, normalizada), outra
+            similar = entrada is not None
+
+        if entrada is not None and not self._valida(entrada):
+            with self._lock:
+                self._remover(chave)
+                self.expirados += 1
+            entrada = None
+
+        with self._lock:
+            if entrada is None:
+                self.misses += 1
+                return None
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+            entrada["usado_em"] = time.time()
+            self.hits += 1
+            if similar:
+                self.hits_similares += 1
+            return entrada["resposta"]
+
+    def salvar(self, pergunta, filtro, doc_ids, resposta):
+        if not resposta:
+            return
+        contexto = self._contexto(filtro, doc_ids)
+        normalizada = normalizar_pergunta(pergunta)
+        vetor = self._vetor(pergunta) if self._usar_similaridade() else None
+
+        with self._lock:
+            chave = (contexto, normalizada)
+            agora = time.time()
+            self._entradas[chave] = {
+                "resposta": resposta,
+                "vetor": vetor,
+                "doc_ids": [d for d in doc_ids if d],
+                "criado_em": agora,
+                "usado_em": agora,
+            }
+            self._entradas.move_to_end(chave)
+            self._por_contexto.setdefault(contexto, set()).add(normalizada)
+
+            while len(self._entradas) > self.max_entradas:
+                self._remover(next(iter(self._entradas)))
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_contexto.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._entradas),
+            "hits": self.hits,
+            "hits_similares": self.hits_similares,
+            "misses": self.misses,
+            "expirados": self.expirados,
+            "taxa_acerto": self.hits / total if total else 0.0,
+        }
@@ -7,35 +7,182 @@ try:
 except ImportError:
     from langchain.schema.runnable import RunnableLambda
 
-def customRetrievel(vectorstore, k=3):
+import logging
+import re
+from datetime import datetime
+
+from core.helpers.detectorTemporalNoticias import DetectorTemporalNoticias, detector
+from core.helpers.tracing import etapa, marcar
+
+logger = logging.getLogger(__name__)
+
+def data_para_int(data):
+    """'2025-11-20' -> 20251120 (inteiro ordenável, usado nos filtros de data do vectorstore)"""
+    try:
+        return int(str(data)[:10].replace("-", ""))
+    except ValueError:
+        return 0
+
+
+def pontuacao_recencia(data_int, hoje, meia_vida_dias):
+    """1.0 para hoje, cai pela metade a cada `meia_vida_dias`"""
+    try:
+        data = datetime.strptime(str(data_int), "%Y%m%d")
+    except ValueError:
+        return 0.0
+    idade = max((hoje - data).days, 0)
+    return 0.5 ** (idade / meia_vida_dias)
+
+
+def limites_do_filtro(filtro):
+    """Converte o filtro de datas do vectorstore em (data_inicio, data_fim) no formato AAAA-MM-DD"""
+    inicio = fim = None
+    if not filtro:
+        return inicio, fim
+
+    condicoes = filtro.get("$and", [filtro])
+    for condicao in condicoes:
+        for operador, valor in condicao.get("data_int", {}).items():
+            data = f"{str(valor)[:4]}-{str(valor)[4:6]}-{str(valor)[6:8]}"
+            if operador in ("$eq", "$gte"):
+                inicio = data
+            if operador in ("$eq", "$lte"):
+                fim = data
+    return inicio, fim
+
+
+def lexico_decisivo(pergunta, lexicais, limiar=2.0):
+    """
+    A busca lexical basta quando a pergunta cita um nome/ticker e o melhor
+    resultado BM25 se destaca do segundo (evita embedar a pergunta).
+    """
+    if not lexicais:
+        return False
+
+    palavras = pergunta.split()
+    cita_nome = any(p[:1].isupper() for p in palavras[1:]) or re.search(r"\b[A-Z]{4}\d{1,2}\b", pergunta)
+    if not cita_nome:
+        return False
+
+    if len(lexicais) == 1:
+        return True
+    return lexicais[0]["score"] >= limiar * lexicais[1]["score"]
+
+
+def documento_lexico(item, pergunta, janela=800):
+    """Document de um resultado do FTS, recortado em volta da primeira ocorrência dos termos"""
+    from langchain_core.documents import Document
+    from storage import consulta_fts
+
+    conteudo = item["conteudo"] or ""
+    conteudo_lower = conteudo.lower()
+
+    posicoes = []
+    for termo in consulta_fts(pergunta).replace('"', "").split(" OR "):
+        posicao = conteudo_lower.find(termo) if termo else -1
+        if posicao >= 0:
+            posicoes.append(posicao)
+
+    inicio = max(min(posicoes) - janela // 4, 0) if posicoes else 0
+    fim = min(inicio + janela, len(conteudo))
+
+    return Document(
+        page_content=conteudo[inicio:fim],
+        metadata={
+            "titulo": (item["titulo"] or "").replace('$', '\\$'),
+            "autor": item["autor"],
+            "categoria": item["categoria"],
+            "data": item["data"],
+            "data_int": data_para_int(item["data"]),
+            "link": item["link"],
+            "doc_id": item["doc_id"],
+            "doc_type": "artigo",
+            "inicio": inicio,
+            "fim": fim,
+        }
+    )
+
+
+def customRetrievel(vectorstore, k=3, fator_candidatos=4, peso_recencia=0.3, meia_vida_dias=7,
+                    usar_lexico=True, k_rrf=60, arquivo_db="artigos.db", hoje=None):
+    """
+    Busca híbrida com o filtro de datas aplicado direto nos índices.
+
+    - vetorial: ranking por similaridade + recência
+          score = (1 - peso_recencia) * similaridade + peso_recencia * recência
+    - lexical: BM25 no índice FTS5 do artigos.db
+    - os dois rankings são combinados por reciprocal-rank fusion (1 / (k_rrf + posição))
+
+    `hoje` fixa a data de referência do filtro e da recência (benchmarks); None = agora.
+    """
+
+    def busca_vetorial(pergunta, k_candidatos, filtro_data):
+        # Inclui o embedding da pergunta (etapa "embedding_consulta", medida à parte)
+        with etapa("busca_vetorial"):
+            resultados = vectorstore.similarity_search_with_relevance_scores(
+                pergunta,
+                k=k_candidatos,
+                filter=filtro_data
+            )
+
+        referencia = hoje or datetime.now()
+        pontuados = []
+        for doc, similaridade in resultados:
+            recencia = pontuacao_recencia(doc.metadata.get("data_int", 0), referencia, meia_vida_dias)
+            score = (1 - peso_recencia) * similaridade + peso_recencia * recencia
+            pontuados.append((score, doc))
+
+        pontuados.sort(key=lambda item: item[0], reverse=True)
+        return [doc for _, doc in pontuados]
 
     def retriever_com_filtro(pergunta: str):
-        filtro_data = detectar_filtro_data(pergunta)
-        print(f"DEBUG - Filtro aplicado: {filtro_data}")
-        
+        with etapa("filtro_temporal"):
+            filtro_data = detectar_filtro_data(pergunta, hoje)
+        logger.debug("Filtro aplicado: %s", filtro_data)
+
         quer_apenas_um = any(palavra in pergunta.lower() for palavra in 
                             ['uma materia', 'uma notícia', 'uma matéria', 'um artigo'])
         
         k_final = 1 if quer_apenas_um else k
-        
-        sourceDocs = vectorstore.similarity_search(
-            pergunta,
-            k=20,                 
-            filter=filtro_data
-        )
-
-        docs_ordenados = sorted(
-            sourceDocs,
-            key=lambda d: d.metadata.get("data", ""),
-            reverse=True
-        )
-        docs = docs_ordenados[:k_final]
+        k_candidatos = k_final * fator_candidatos
+
+        lexicais = []
+        if usar_lexico:
+            from storage import buscar_fts
+            data_inicio, data_fim = limites_do_filtro(filtro_data)
+            with etapa("busca_lexical"):
+                lexicais = buscar_fts(pergunta, limite=k_candidatos, data_inicio=data_inicio,
+                                      data_fim=data_fim, arquivo_db=arquivo_db)
+
+        vetoriais = []
+        if not lexico_decisivo(pergunta, lexicais):
+            vetoriais = busca_vetorial(pergunta, k_candidatos, filtro_data)
+
+        # Reciprocal-rank fusion por artigo
+        pontuacao = {}
+        docs = {}
+        for ranking in (vetoriais, lexicais):
+            posicao = 0
+            vistos = set()
+            for resultado in ranking:
+                if isinstance(resultado, dict):
+                    doc_id = resultado["doc_id"]
+                else:
+                    doc_id = resultado.metadata.get("doc_id", "")
+                if doc_id in vistos:
+                    continue
+                vistos.add(doc_id)
+                posicao += 1
+
+                pontuacao[doc_id] = pontuacao.get(doc_id, 0.0) + 1.0 / (k_rrf + posicao)
+                if doc_id not in docs:
+                    docs[doc_id] = resultado if not isinstance(resultado, dict) else documento_lexico(resultado, pergunta)
 
         vistos = set()
         docs_unicos = []
-        for doc in docs:
+        for doc_id in sorted(pontuacao, key=pontuacao.get, reverse=True):
+            doc = docs[doc_id]
 
-            doc_id = doc.metadata.get("doc_id", "")
             doc_link = doc.metadata.get("link", "")
             identificador = f"{doc_id}_{doc_link}"
             
@@ -45,16 +192,23 @@ def customRetrievel(vectorstore, k=3):
             if identificador not in vistos:
                 vistos.add(identificador)
                 docs_unicos.append(doc)
+
+            if len(docs_unicos) == k_final:
+                break
         
-        print(f"DEBUG - Documentos encontrados: {len(docs_unicos)}")
+        logger.debug("Documentos encontrados: %d (vetoriais: %d, lexicais: %d)",
+                     len(docs_unicos), len(vetoriais), len(lexicais))
+        marcar(filtro_data=filtro_data is not None, docs=len(docs_unicos),
+               candidatos_vetoriais=len(vetoriais), candidatos_lexicais=len(lexicais))
         return docs_unicos
     
     return RunnableLambda(retriever_com_filtro)
 
+
 def buscar_docs(pergunta, retriever):
     
     filtro_data = detectar_filtro_data(pergunta)
-    print(f"Filtro SQL: {filtro_data}")
+    logger.debug("Filtro SQL: %s", filtro_data)
     
     quer_apenas_um = any(palavra in pergunta.lower() for palavra in 
                         ['uma materia', 'uma notícia', 'uma matéria', 'um artigo'])
@@ -82,21 +236,28 @@ def buscar_docs(pergunta, retriever):
 
     return input_texto
 
-def detectar_filtro_data(consulta: str):
-    consulta_lower = consulta.lower().strip()
-    
-    from core.helpers.detectorTemporalNoticias import DetectorTemporalNoticias
-    detector = DetectorTemporalNoticias()
-    filtro_temporal = detector.detectar_filtro_temporal(consulta_lower)
+def detectar_filtro_data(consulta: str, hoje=None):
+    # Instância compartilhada (padrões compilados + LRU); `hoje` fixa a data de referência
+    detector_consulta = DetectorTemporalNoticias(hoje) if hoje is not None else detector
+    filtro_temporal = detector_consulta.detectar_filtro_temporal(consulta)
     
-    if filtro_temporal and '$gte' in filtro_temporal:
-        return {"data": filtro_temporal['$gte']}  
-    
-    elif filtro_temporal and 'data' in filtro_temporal:
-        return {"data": filtro_temporal['data']} 
-    
-    else:
+    if not filtro_temporal:
+        return None
+
+    # Filtro no formato do Chroma, sobre a data inteira (AAAAMMDD)
+    condicoes = []
+    if 'data' in filtro_temporal:
+        condicoes.append({"data_int": {"$eq": data_para_int(filtro_temporal['data'])}})
+    if '$gte' in filtro_temporal:
+        condicoes.append({"data_int": {"$gte": data_para_int(filtro_temporal['$gte'])}})
+    if '$lte' in filtro_temporal:
+        condicoes.append({"data_int": {"$lte": data_para_int(filtro_temporal['$lte'])}})
+
+    if not condicoes:
         return None
+    if len(condicoes) == 1:
+        return condicoes[0]
+    return {"$and": condicoes}
 
 if __name__ == "__main__":
     resultado = detectar_filtro_data("Novidades")
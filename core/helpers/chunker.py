@@ -0,0 +1,108 @@
+import re
+
+from core.helpers.contextBuilder import contar_tokens, truncar_tokens
+
+# Parágrafos separados por linha em branco (ver limpar_caracteres_agressivo)
+PADRAO_PARAGRAFO = re.compile(r"\S(?:.*?\S)?(?=\s*\n\s*\n|\s*$)", re.S)
+# Fim de frase: pontuação seguida de espaço
+PADRAO_FRASE = re.compile(r"\S.*?(?:[.!?…]+[\"”’)]*(?=\s)|$)", re.S)
+
+
+def _frases(texto, inicio, fim):
+    """Intervalos (inicio, fim) das frases de texto[inicio:fim]"""
+    return [(inicio + m.start(), inicio + m.end()) for m in PADRAO_FRASE.finditer(texto[inicio:fim])]
+
+
+def _partir_frase(texto, inicio, fim, max_tokens, modelo):
+    """Frase maior que o limite: corta em pedaços de max_tokens, no espaço anterior"""
+    pedacos = []
+    while inicio < fim:
+        parte = truncar_tokens(texto[inicio:fim], max_tokens, modelo)
+        corte = inicio + len(parte)
+        if corte < fim:
+            espaco = texto.rfind(" ", inicio + 1, corte)
+            if espaco > inicio:
+                corte = espaco
+        pedacos.append((inicio, corte))
+        inicio = corte
+        while inicio < fim and texto[inicio].isspace():
+            inicio += 1
+    return pedacos
+
+
+def _unidades(texto, max_tokens, modelo):
+    """Parágrafos que cabem no limite; os maiores viram frases (ou pedaços de frase)"""
+    unidades = []
+    for paragrafo in PADRAO_PARAGRAFO.finditer(texto):
+        inicio, fim = paragrafo.span()
+        tokens = contar_tokens(texto[inicio:fim], modelo)
+        if tokens <= max_tokens:
+            unidades.append((inicio, fim, tokens))
+            continue
+
+        for ini_frase, fim_frase in _frases(texto, inicio, fim):
+            tokens = contar_tokens(texto[ini_frase:fim_frase], modelo)
+            if tokens <= max_tokens:
+                unidades.append((ini_frase, fim_frase, tokens))
+            else:
+                for a, b in _partir_frase(texto, ini_frase, fim_frase, max_tokens, modelo):
+                    unidades.append((a, b, contar_tokens(texto[a:b], modelo)))
+    return unidades
+
+
+def dividir_texto(texto, max_tokens=256, min_tokens=48, modelo="gpt-4o-mini"):
+    """
+    Divide o texto em intervalos (inicio, fim) de até max_tokens.
+
+    Junta parágrafos inteiros enquanto couberem; um parágrafo grande demais é
+    dividido nas frases, e só uma frase maior que o limite é cortada no meio.
+    Um resto final com menos de min_tokens é juntado ao chunk anterior.
+    """
+    intervalos = []
+    atual = None
+    tokens_atual = 0
+
+    for inicio, fim, tokens in _unidades(texto, max_tokens, modelo):
+        if atual is not None and tokens_atual + tokens <= max_tokens:
+            atual = (atual[0], fim)
+            tokens_atual += tokens
+            continue
+        if atual is not None:
+            intervalos.append((atual, tokens_atual))
+        atual = (inicio, fim)
+        tokens_atual = tokens
+
+    if atual is not None:
+        if intervalos and tokens_atual < min_tokens and intervalos[-1][1] + tokens_atual <= max_tokens + min_tokens:
+            (inicio, _), tokens = intervalos.pop()
+            atual = (inicio, atual[1])
+            tokens_atual += tokens
+        intervalos.append((atual, tokens_atual))
+
+    return [intervalo for intervalo, _ in intervalos]
+
+
+def dividir_documentos(documentos, max_tokens=256, min_tokens=48, modelo="gpt-4o-mini"):
+    """
+    Chunks dos artigos (page_content = corpo do artigo).
+
+    Título, data, autor etc. ficam só nos metadados; o título entra uma vez no texto,
+    no começo do primeiro chunk. Cada chunk guarda `inicio`/`fim` no corpo do artigo.
+    """
+    from langchain_core.documents import Document
+
+    chunks = []
+    for documento in documentos:
+        conteudo = documento.page_content or ""
+        titulo = documento.metadata.get("titulo", "")
+        intervalos = dividir_texto(conteudo, max_tokens, min_tokens, modelo) or [(0, 0)]
+
+        for ordem, (inicio, fim) in enumerate(intervalos):
+            texto = conteudo[inicio:fim]
+            if ordem == 0 and titulo:
+                texto = f"{titulo}\n\n{texto}" if texto else titulo
+            chunks.append(Document(
+                page_content=texto,
+                metadata={**documento.metadata, "inicio": inicio, "fim": fim}
+            ))
+    return chunks
@@ -0,0 +1,204 @@
+import time
+from collections import deque
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _encoding(modelo):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(modelo)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Sem tiktoken (ou sem acesso ao arquivo BPE): cai na estimativa por caracteres
+        return None
+
+
+def contar_tokens(texto, modelo="gpt-4o-mini"):
+    if not texto:
+        return 0
+    enc = _encoding(modelo)
+    if enc is None:
+        return len(texto) // 4 + 1
+    return len(enc.encode(texto, disallowed_special=()))
+
+
+def truncar_tokens(texto, max_tokens, modelo="gpt-4o-mini"):
+    if max_tokens <= 0:
+        return ""
+    enc = _encoding(modelo)
+    if enc is None:
+        return texto[:max_tokens * 4]
+    tokens = enc.encode(texto, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return texto
+    return enc.decode(tokens[:max_tokens])
+
+
+def _juntar_intervalos(intervalos):
+    juntos = []
+    for inicio, fim in sorted(intervalos):
+        if juntos and inicio <= juntos[-1][1]:
+            juntos[-1] = (juntos[-1][0], max(juntos[-1][1], fim))
+        else:
+            juntos.append((inicio, fim))
+    return juntos
+
+
+class ConstrutorContexto:
+    """
+    Monta o contexto do prompt dentro de um orçamento de tokens.
+
+    1. entra o trecho que casou de cada artigo, na ordem de relevância
+       (chunks do mesmo artigo são agrupados, artigos repetidos descartados)
+    2. com o que sobrar do orçamento, os trechos são expandidos para os
+       chunks vizinhos do mesmo artigo
+    """
+
+    def __init__(self, orcamento_tokens=3000, vizinhos=1, modelo="gpt-4o-mini",
+                 tamanho_chunk=800, minimo_tokens=80, historico=1000):
+        self.orcamento_tokens = orcamento_tokens
+        self.vizinhos = vizinhos
+        self.modelo = modelo
+        self.tamanho_chunk = tamanho_chunk
+        self.minimo_tokens = minimo_tokens
+
+        # Tokens usados pelo contexto de cada resposta
+        self.registros = deque(maxlen=historico)
+
+    def _agrupar(self, docs, conteudos):
+        artigos = {}
+        links = set()
+        for doc in docs:
+            meta = doc.metadata
+            doc_id = meta.get("doc_id", "")
+            link = meta.get("link", "")
+
+            if doc_id not in artigos:
+                if link and link in links:
+                    continue
+                links.add(link)
+                corpo = conteudos.get(doc_id)
+                artigos[doc_id] = {
+                    "meta": meta,
+                    "corpo": corpo if corpo is not None else doc.page_content,
+                    "intervalos": [],
+                    "sem_corpo": corpo is None,
+                }
+
+            artigo = artigos[doc_id]
+            inicio = meta.get("inicio", 0)
+            fim = meta.get("fim", 0)
+            if artigo["sem_corpo"]:
+                continue
+            if fim <= inicio:
+                # Chunk só com o cabeçalho: usa o começo do artigo
+                fim = inicio + self.tamanho_chunk
+            artigo["intervalos"].append((inicio, min(fim, len(artigo["corpo"]))))
+
+        return list(artigos.values())
+
+    def _texto(self, artigo, expansao=0):
+        corpo = artigo["corpo"]
+        if artigo["sem_corpo"]:
+            return corpo
+
+        intervalos = []
+        for inicio, fim in artigo["intervalos"]:
+            inicio = max(0, inicio - expansao)
+            fim = min(len(corpo), fim + expansao)
+            # Não corta palavras no meio
+            if inicio > 0:
+                inicio = corpo.rfind(" ", 0, inicio) + 1
+            if fim < len(corpo):
+                espaco = corpo.find(" ", fim)
+                fim = len(corpo) if espaco == -1 else espaco
+            intervalos.append((inicio, fim))
+
+        juntos = _juntar_intervalos(intervalos)
+        if not juntos:
+            return ""
+
+        texto = " [...] ".join(corpo[inicio:fim].strip() for inicio, fim in juntos)
+        if juntos[0][0] > 0:
+            texto = "[...] " + texto
+        if juntos[-1][1] < len(corpo):
+            texto = texto + " [...]"
+        return texto
+
+    def _bloco(self, artigo, conteudo):
+        meta = artigo["meta"]
+        doc_info = []
+
+        if meta.get("titulo"):
+            doc_info.append(f"Título: {meta['titulo']}")
+
+        doc_info.append(f"Conteúdo: {conteudo}")
+
+        if meta.get("categoria"):
+            doc_info.append(f"Categoria: {meta['categoria']}")
+        if meta.get("link"):
+            doc_info.append(f"Link: {meta['link']}")
+        if meta.get("data"):
+            doc_info.append(f"Data: {meta['data']}")
+        if meta.get("autor"):
+            doc_info.append(f"Autor: {meta['autor']}")
+
+        return "\n".join(doc_info)
+
+    def montar(self, docs, conteudos):
+        """docs na ordem de relevância; conteudos = {doc_id: corpo completo}"""
+        inicio_montagem = time.perf_counter()
+        artigos = self._agrupar(docs, conteudos)
+        separador = contar_tokens("\n\n---\n\n", self.modelo)
+
+        # 1. trecho principal de cada artigo
+        blocos = {}
+        usados = 0
+        for i, artigo in enumerate(artigos):
+            custo_separador = separador if blocos else 0
+            bloco = self._bloco(artigo, self._texto(artigo))
+            tokens = contar_tokens(bloco, self.modelo)
+
+            if usados + custo_separador + tokens > self.orcamento_tokens:
+                vazio = contar_tokens(self._bloco(artigo, " [...]"), self.modelo)
+                restante = self.orcamento_tokens - usados - custo_separador - vazio
+                # Os tokens das partes nem sempre somam os do bloco: corta até caber
+                while restante >= self.minimo_tokens:
+                    bloco = self._bloco(artigo, truncar_tokens(self._texto(artigo), restante, self.modelo) + " [...]")
+                    tokens = contar_tokens(bloco, self.modelo)
+                    excesso = usados + custo_separador + tokens - self.orcamento_tokens
+                    if excesso <= 0:
+                        break
+                    restante -= excesso
+                if restante < self.minimo_tokens:
+                    continue
+
+            blocos[i] = (bloco, tokens)
+            usados += custo_separador + tokens
+
+        # 2. vizinhos do mesmo artigo, enquanto couber
+        for n in range(1, self.vizinhos + 1):
+            for i, artigo in enumerate(artigos):
+                if i not in blocos or artigo["sem_corpo"]:
+                    continue
+                bloco = self._bloco(artigo, self._texto(artigo, expansao=n * self.tamanho_chunk))
+                tokens = contar_tokens(bloco, self.modelo)
+                if usados - blocos[i][1] + tokens <= self.orcamento_tokens:
+                    usados += tokens - blocos[i][1]
+                    blocos[i] = (bloco, tokens)
+
+        self.registros.append({
+            "tokens": usados,
+            "orcamento": self.orcamento_tokens,
+            "artigos": len(blocos),
+            "descartados": len(artigos) - len(blocos),
+            "tempo": time.perf_counter() - inicio_montagem,
+        })
+
+        return "\n\n---\n\n".join(blocos[i][0] for i in sorted(blocos))
+
+    def ultimo_registro(self):
+        return self.registros[-1] if self.registros else None
@@ -1,162 +1,217 @@
-from datetime import datetime, timedelta
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 import re
+import time
 from typing import Dict, Optional, Any
 
-class DetectorTemporalNoticias:
-    def __init__(self):
-        self.hoje = datetime.now()
-        
-        # Palavras-chave que indicam "recência"
-        self.indicadores_recencia = {
-            'últimas notícias', 'novidades', 'notícias recentes', 
-            'atualidades', 'ultimas', 'recentes', 'agora',
-            'última hora', 'breaking news', 'novo'
-        }
-        
-        # Intervalos temporais comuns em notícias
-        self.intervalos_noticias = {
-            'últimas 24 horas': timedelta(days=1),
-            'últimas 48 horas': timedelta(days=2),
-            'última semana': timedelta(weeks=1),
-            'semana passada': timedelta(weeks=1),
-            'últimos 7 dias': timedelta(days=7),
-            'últimos 15 dias': timedelta(days=15),
-            'último mês': timedelta(days=30),
-            'este mês': self._inicio_do_mes(),
-            'mês passado': self._mes_passado(),
-        }
-
-    def detectar_filtro_temporal(self, consulta: str) -> Dict[str, Any]:
-        """
-        Detecta filtros temporais em consultas de notícias
-        Retorna filtros para MongoDB/Elasticsearch
-        """
-        consulta = consulta.lower().strip()
-        
-        # 1. PRIORIDADE: Indicadores de recência (mais comum em notícias)
-        if any(indicador in consulta for indicador in self.indicadores_recencia):
-            return self._filtro_ultimas_noticias(consulta)
-        
-        # 2. Datas relativas específicas
-        filtro_relativo = self._detectar_datas_relativas(consulta)
-        if filtro_relativo:
-            return filtro_relativo
-        
-        # 3. Intervalos temporais
-        filtro_intervalo = self._detectar_intervalos(consulta)
-        if filtro_intervalo:
-            return filtro_intervalo
-        
-        # 4. Datas específicas (DD/MM, DD/MM/AAAA, etc)
-        filtro_data = self._detectar_datas_especificas(consulta)
-        if filtro_data:
-            return filtro_data
-        
-        # 5. Fallback: se não detectou nada, assume notícias recentes
-        return self._filtro_default()
-    
-    def _filtro_ultimas_noticias(self, consulta: str) -> Dict[str, Any]:
-        """Lógica para 'últimas notícias', 'novidades', etc"""
-        if "hoje" in consulta or "agora" in consulta or "última hora" in consulta:
-            return {"$gte": self.hoje.strftime("%Y-%m-%d")}
-        elif "ontem" in consulta:
-            ontem = self.hoje - timedelta(days=1)
-            return {"data": ontem.strftime("%Y-%m-%d")}
-        else:
-            # CORREÇÃO: Para "novidades" genéricas, retorna HOJE, não últimos 3 dias
-            return {"$gte": self.hoje.strftime("%Y-%m-%d")}  # ← Mudei esta linha
-
-    def _detectar_datas_relativas(self, consulta: str) -> Optional[Dict[str, Any]]:
-        """Detecta 'hoje', 'ontem', 'amanhã'"""
-        if "hoje" in consulta:
-            return {"data": self.hoje.strftime("%Y-%m-%d")}
-        elif "ontem" in consulta:
-            ontem = self.hoje - timedelta(days=1)
-            return {"data": ontem.strftime("%Y-%m-%d")}
-        elif "amanhã" in consulta:
-            amanha = self.hoje + timedelta(days=1)
-            return {"data": amanha.strftime("%Y-%m-%d")}
-        return None
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'marco': 3, 'abril': 4,
+    'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8,
+    'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
+}
 
-    def _detectar_intervalos(self, consulta: str) -> Optional[Dict[str, Any]]:
-        """Detecta intervalos como 'última semana', 'mês passado'"""
-        for intervalo, delta in self.intervalos_noticias.items():
-            if intervalo in consulta:
-                if callable(delta):
-                    data_inicio = delta()
-                else:
-                    data_inicio = self.hoje - delta
-                return {"$gte": data_inicio.strftime("%Y-%m-%d")}
-        return None
+# Palavras-chave que indicam "recência"
+INDICADORES_RECENCIA = (
+    'últimas notícias', 'novidades', 'notícias recentes',
+    'atualidades', 'ultimas', 'recentes', 'agora',
+    'última hora', 'breaking news', 'novo'
+)
 
-    def _detectar_datas_especificas(self, consulta: str) -> Optional[Dict[str, Any]]:
-        """Detecta datas no formato DD/MM, DD/MM/AAAA, etc"""
-        
-        # 1. Formato DD/MM ou DD/MM/AAAA
-        match = re.search(r"(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?", consulta)
-        if match:
-            dia, mes, ano = match.groups()
-            ano = int(ano) if ano else self.hoje.year
-            try:
-                data = datetime(ano, int(mes), int(dia))
-                return {"data": data.strftime("%Y-%m-%d")}
-            except:
-                pass
-        
-        # 2. NOVO: Formato "dia 27" ou "dia 27 de novembro"
-        match = re.search(r"dia\s+(\d{1,2})(?:\s+de\s+(\w+))?(?:\s+de\s+(\d{4}))?", consulta)
-        if match:
-            dia, mes_str, ano = match.groups()
-            ano = int(ano) if ano else self.hoje.year
-            
-            # Se não especificou mês, assume mês atual
-            if not mes_str:
-                mes = self.hoje.month
-            else:
-                meses = {
-                    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4,
-                    'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8,
-                    'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
-                }
-                mes = meses.get(mes_str.lower())
-            
-            if mes:
-                try:
-                    data = datetime(ano, mes, int(dia))
-                    return {"data": data.strftime("%Y-%m-%d")}
-                except:
-                    pass
-        
-        # 3. Formato "23 de novembro" ou "23 de novembro de 2024"
-        match = re.search(r"(\d{1,2})\s+de\s+(\w+)(?:\s+de\s+(\d{4}))?", consulta)
-        if match:
-            dia, mes_str, ano = match.groups()
-            meses = {
-                'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4,
-                'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8,
-                'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
-            }
-            mes = meses.get(mes_str.lower())
-            ano = int(ano) if ano else self.hoje.year
-            if mes:
-                try:
-                    data = datetime(ano, mes, int(dia))
-                    return {"data": data.strftime("%Y-%m-%d")}
-                except:
-                    pass
-        
-        return None
+DATAS_RELATIVAS = ('hoje', 'ontem', 'amanhã')
+
+# Intervalos temporais comuns em notícias, em ordem de prioridade
+# (dias para trás a partir de hoje, ou o nome de um intervalo de calendário)
+INTERVALOS_NOTICIAS = (
+    ('últimas 24 horas', 1),
+    ('últimas 48 horas', 2),
+    ('última semana', 7),
+    ('semana passada', 7),
+    ('últimos 7 dias', 7),
+    ('últimos 15 dias', 15),
+    ('último mês', 30),
+    ('este mês', 'este_mes'),
+    ('mês passado', 'mes_passado'),
+)
+
+# Todas as expressões em um único padrão. O lookahead encontra também as que se
+# sobrepõem, então uma passada pela consulta basta (como um Aho–Corasick).
+# Só casam no início de palavra ("renovou" não é "novo"; "novos" é).
+_EXPRESSOES = sorted(
+    set(INDICADORES_RECENCIA) | set(DATAS_RELATIVAS) | {expr for expr, _ in INTERVALOS_NOTICIAS},
+    key=len, reverse=True
+)
+PADRAO_EXPRESSOES = re.compile(r"(?=\b(" + "|".join(re.escape(expr) for expr in _EXPRESSOES) + "))")
+
+# Datas específicas, na ordem em que são tentadas (só rodam se a consulta tem dígitos)
+PADRAO_DATA_NUMERICA = re.compile(r"(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?")
+PADRAO_DIA = re.compile(r"dia\s+(\d{1,2})(?:\s+de\s+(\w+))?(?:\s+de\s+(\d{4}))?")
+PADRAO_DIA_DE_MES = re.compile(r"(\d{1,2})\s+de\s+(\w+)(?:\s+de\s+(\d{4}))?")
+PADRAO_DIGITO = re.compile(r"\d")
+
+# Mês sem dia ("em novembro", "novembro de 2024"): o mês inteiro. Só com uma
+# preposição antes ou o ano depois, e sem o "marco" sem acento: "o marco legal" e
+# "Marco Stefanini" não são datas
+_MESES_SOLTOS = "|".join(mes for mes in MESES if mes != 'marco')
+PADRAO_MES = re.compile(
+    r"\b(?:em|de|desde|durante|até)\s+(" + _MESES_SOLTOS + r")\b(?:\s+de\s+(\d{4}))?"
+    r"|\b(" + _MESES_SOLTOS + r")\s+de\s+(\d{4})"
+)
 
-    def _filtro_default(self) -> Dict[str, Any]:
-        """Fallback para quando não detecta filtro temporal"""
-        # Retorna notícias da última semana como default
+IntervaloTemporal = namedtuple("IntervaloTemporal", ["inicio", "fim", "expressao"])
+IntervaloTemporal.__doc__ = "Datas (date) inclusivas; None = sem limite daquele lado"
+
+
+def _ultimo_dia_do_mes(ano, mes):
+    if mes == 12:
+        return date(ano, 12, 31)
+    return date(ano, mes + 1, 1) - timedelta(days=1)
+
+
+def _data(ano, mes, dia):
+    try:
+        return date(ano, mes, dia)
+    except (TypeError, ValueError):
         return None
 
-    def _inicio_do_mes(self):
-        return datetime(self.hoje.year, self.hoje.month, 1)
 
-    def _mes_passado(self):
-        if self.hoje.month == 1:
-            return datetime(self.hoje.year - 1, 12, 1)
+def _datas_especificas(consulta, hoje):
+    """Datas no formato DD/MM, DD/MM/AAAA, 'dia 27 (de novembro)', '23 de novembro (de 2024)'"""
+    match = PADRAO_DATA_NUMERICA.search(consulta)
+    if match:
+        dia, mes, ano = match.groups()
+        ano = int(ano) if ano else hoje.year
+        if ano < 100:
+            ano += 2000
+        data = _data(ano, int(mes), int(dia))
+        if data:
+            return IntervaloTemporal(data, data, match.group(0))
+
+    match = PADRAO_DIA.search(consulta)
+    if match:
+        dia, mes_str, ano = match.groups()
+        # Se não especificou mês, assume mês atual
+        mes = MESES.get(mes_str) if mes_str else hoje.month
+        data = _data(int(ano) if ano else hoje.year, mes, int(dia)) if mes else None
+        if data:
+            return IntervaloTemporal(data, data, match.group(0))
+
+    match = PADRAO_DIA_DE_MES.search(consulta)
+    if match:
+        dia, mes_str, ano = match.groups()
+        mes = MESES.get(mes_str)
+        data = _data(int(ano) if ano else hoje.year, mes, int(dia)) if mes else None
+        if data:
+            return IntervaloTemporal(data, data, match.group(0))
+
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _interpretar(consulta, dia_ordinal):
+    """Consulta já em minúsculas; o dia entra na chave para o cache não envelhecer"""
+    hoje = date.fromordinal(dia_ordinal)
+    encontradas = {match.group(1) for match in PADRAO_EXPRESSOES.finditer(consulta)}
+
+    # 1. PRIORIDADE: Indicadores de recência (mais comum em notícias)
+    recencia = [expr for expr in INDICADORES_RECENCIA if expr in encontradas]
+    if recencia:
+        if encontradas & {'hoje', 'agora', 'última hora'}:
+            return IntervaloTemporal(hoje, None, recencia[0])
+        if 'ontem' in encontradas:
+            ontem = hoje - timedelta(days=1)
+            return IntervaloTemporal(ontem, ontem, 'ontem')
+        # Para "novidades" genéricas: a partir de hoje
+        return IntervaloTemporal(hoje, None, recencia[0])
+
+    # 2. Datas relativas
+    for expr, dias in (('hoje', 0), ('ontem', -1), ('amanhã', 1)):
+        if expr in encontradas:
+            data = hoje + timedelta(days=dias)
+            return IntervaloTemporal(data, data, expr)
+
+    # 3. Intervalos
+    for expr, delta in INTERVALOS_NOTICIAS:
+        if expr not in encontradas:
+            continue
+        if delta == 'este_mes':
+            return IntervaloTemporal(hoje.replace(day=1), None, expr)
+        if delta == 'mes_passado':
+            fim = hoje.replace(day=1) - timedelta(days=1)
+            return IntervaloTemporal(fim.replace(day=1), fim, expr)
+        return IntervaloTemporal(hoje - timedelta(days=delta), None, expr)
+
+    # 4. Datas específicas
+    if PADRAO_DIGITO.search(consulta):
+        intervalo = _datas_especificas(consulta, hoje)
+        if intervalo:
+            return intervalo
+
+    # 5. Mês inteiro (sem ano, o mais recente que já começou)
+    match = PADRAO_MES.search(consulta)
+    if match:
+        nome_mes = match.group(1) or match.group(3)
+        ano_explicito = match.group(2) or match.group(4)
+        mes = MESES[nome_mes]
+        if ano_explicito:
+            ano = int(ano_explicito)
         else:
-            return datetime(self.hoje.year, self.hoje.month - 1, 1)
\ No newline at end of file
+            ano = hoje.year if mes <= hoje.month else hoje.year - 1
+        return IntervaloTemporal(date(ano, mes, 1), _ultimo_dia_do_mes(ano, mes), match.group(0))
+
+    # Nada detectado: sem filtro
+    return None
+
+
+class DetectorTemporalNoticias:
+    """
+    Interpreta expressões de tempo das perguntas ("novidades", "ontem", "mês passado",
+    "23 de novembro", "em outubro"...) como um intervalo de datas.
+
+    Use a instância do módulo (`detector`): os padrões são compilados uma vez, "hoje"
+    é atualizado só na virada do dia e os resultados ficam num LRU.
+    Passe `hoje` para fixar a data de referência (testes, benchmarks).
+    """
+
+    def __init__(self, hoje=None):
+        self._fixo = hoje is not None
+        self.hoje = hoje if hoje is not None else datetime.now()
+        self._proxima_virada = self._calcular_virada()
+
+    def _calcular_virada(self):
+        if self._fixo:
+            return float("inf")
+        amanha = datetime(self.hoje.year, self.hoje.month, self.hoje.day) + timedelta(days=1)
+        return amanha.timestamp()
+
+    def _dia(self):
+        if time.time() >= self._proxima_virada:
+            self.hoje = datetime.now()
+            self._proxima_virada = self._calcular_virada()
+        return self.hoje.toordinal()
+
+    def detectar_intervalo(self, consulta: str) -> Optional[IntervaloTemporal]:
+        """Intervalo (inicio, fim, expressao) ou None se a consulta não fala de tempo"""
+        return _interpretar(consulta.lower().strip(), self._dia())
+
+    def detectar_filtro_temporal(self, consulta: str) -> Optional[Dict[str, Any]]:
+        """
+        Mesmo intervalo no formato de filtro:
+        {"data": dia} para um único dia, senão {"$gte": inicio, "$lte": fim}
+        """
+        intervalo = self.detectar_intervalo(consulta)
+        if intervalo is None:
+            return None
+
+        if intervalo.inicio is not None and intervalo.inicio == intervalo.fim:
+            return {"data": intervalo.inicio.strftime("%Y-%m-%d")}
+
+        filtro = {}
+        if intervalo.inicio is not None:
+            filtro["$gte"] = intervalo.inicio.strftime("%Y-%m-%d")
+        if intervalo.fim is not None:
+            filtro["$lte"] = intervalo.fim.strftime("%Y-%m-%d")
+        return filtro
+
+
+detector = DetectorTemporalNoticias()
@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from core.helpers.tracing import contar, etapa
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envolve um embedder (ex: OpenAIEmbeddings) com um cache em SQLite.
+
+    - chave: nome do modelo + hash do texto
+    - despejo LRU quando passa de max_entradas (contadas no banco, que o indexador
+      também grava); os acessos ficam na memória e vão para o banco junto da próxima
+      escrita, sem commit no caminho da leitura
+    - faltas do cache vão para a API em lotes grandes, com concorrência limitada
+    """
+
+    def __init__(self, embedder, arquivo_db="embeddings_cache.db", modelo=None,
+                 max_entradas=200_000, lote=512, max_workers=4, max_acessos_pendentes=1000):
+        self.embedder = embedder
+        self.modelo = modelo or getattr(embedder, "model", None) or type(embedder).__name__
+        self.max_entradas = max_entradas
+        self.lote = lote
+        self.max_workers = max_workers
+        self.max_acessos_pendentes = max_acessos_pendentes
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(arquivo_db, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                chave TEXT PRIMARY KEY,
+                vetor BLOB NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_acesso ON embeddings(ultimo_acesso)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        # chave -> último acesso ainda não gravado
+        self._acessos = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.chamadas_api = 0
+        self.tempo_api = 0.0
+
+    def _chave(self, texto, tipo):
+        return hashlib.sha256(f"{self.modelo}\0{tipo}\0{texto}".encode("utf-8")).hexdigest()
+
+    def _buscar(self, chaves):
+        encontrados = {}
+        with self._lock:
+            for i in range(0, len(chaves), 500):
+                parte = chaves[i:i + 500]
+                marcadores = ",".join("?" * len(parte))
+                rows = self._conn.execute(
+                    f"SELECT chave, vetor FROM embeddings WHERE chave IN ({marcadores})", parte
+                ).fetchall()
+                for chave, blob in rows:
+                    encontrados[chave] = array("f", blob).tolist()
+
+            if encontrados:
+                agora = time.time()
+                self._acessos.update(dict.fromkeys(encontrados, agora))
+                # Limita a memória: muitos acertos seguidos sem nenhuma falta
+                if len(self._acessos) >= self.max_acessos_pendentes:
+                    self._gravar_acessos()
+                    self._conn.commit()
+        return encontrados
+
+    def _gravar_acessos(self):
+        """Grava os acessos pendentes na transação aberta (chamado com o lock)"""
+        if self._acessos:
+            self._conn.executemany(
+                "UPDATE embeddings SET ultimo_acesso = ? WHERE chave = ?",
+                [(agora, chave) for chave, agora in self._acessos.items()]
+            )
+            self._acessos = {}
+
+    def _salvar(self, novos):
+        agora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (chave, vetor, ultimo_acesso) VALUES (?, ?, ?)",
+                [(chave, array("f", vetor).tobytes(), agora) for chave, vetor in novos.items()]
+            )
+            self._gravar_acessos()
+
+            # Contado na mesma transação: outro processo (indexador) pode ter gravado
+            self._total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            excesso = self._total - self.max_entradas
+            if excesso > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE chave IN "
+                    "(SELECT chave FROM embeddings ORDER BY ultimo_acesso LIMIT ?)",
+                    (excesso,)
+                )
+                self._total -= excesso
+            self._conn.commit()
+
+    def _embedar_lote(self, textos):
+        inicio = time.perf_counter()
+        vetores = self.embedder.embed_documents(textos)
+        with self._lock:
+            self.chamadas_api += 1
+            self.tempo_api += time.perf_counter() - inicio
+        return vetores
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        chaves = [self._chave(texto, "doc") for texto in texts]
+        encontrados = self._buscar(list(set(chaves)))
+
+        # Textos repetidos no mesmo pedido vão uma única vez para a API
+        faltando = {}
+        for chave, texto in zip(chaves, texts):
+            if chave not in encontrados:
+                faltando.setdefault(chave, texto)
+
+        with self._lock:
+            self.hits += len(texts) - len(faltando)
+            self.misses += len(faltando)
+
+        if faltando:
+            itens = list(faltando.items())
+            lotes = [itens[i:i + self.lote] for i in range(0, len(itens), self.lote)]
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                resultados = executor.map(lambda parte: self._embedar_lote([t for _, t in parte]), lotes)
+
+                novos = {}
+                for parte, vetores in zip(lotes, resultados):
+                    for (chave, _), vetor in zip(parte, vetores):
+                        # Arredonda para float32, igual ao que volta do cache
+                        novos[chave] = array("f", vetor).tolist()
+
+            self._salvar(novos)
+            encontrados.update(novos)
+
+        return [encontrados[chave] for chave in chaves]
+
+    def embed_query(self, text):
+        with etapa("embedding_consulta"):
+            chave = self._chave(text, "query")
+            encontrado = self._buscar([chave])
+            if chave in encontrado:
+                with self._lock:
+                    self.hits += 1
+                contar("embedding_cache_acertos")
+                return encontrado[chave]
+
+            inicio = time.perf_counter()
+            vetor = array("f", self.embedder.embed_query(text)).tolist()
+            with self._lock:
+                self.misses += 1
+                self.chamadas_api += 1
+                self.tempo_api += time.perf_counter() - inicio
+            contar("embedding_cache_faltas")
+
+            self._salvar({chave: vetor})
+            return vetor
+
+    async def aembed_query(self, text):
+        # Cache consultado/gravado em thread; a falta vai pelo cliente assíncrono do embedder
+        with etapa("embedding_consulta"):
+            chave = self._chave(text, "query")
+            encontrado = await asyncio.to_thread(self._buscar, [chave])
+            if chave in encontrado:
+                with self._lock:
+                    self.hits += 1
+                contar("embedding_cache_acertos")
+                return encontrado[chave]
+
+            inicio = time.perf_counter()
+            vetor = array("f", await self.embedder.aembed_query(text)).tolist()
+            with self._lock:
+                self.misses += 1
+                self.chamadas_api += 1
+                self.tempo_api += time.perf_counter() - inicio
+            contar("embedding_cache_faltas")
+
+            await asyncio.to_thread(self._salvar, {chave: vetor})
+            return vetor
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "modelo": self.modelo,
+            "entradas": self._total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": self.hits / total if total else 0.0,
+            "chamadas_api": self.chamadas_api,
+            "tempo_api_total": self.tempo_api,
+            "tempo_api_medio": self.tempo_api / self.chamadas_api if self.chamadas_api else 0.0,
+        }
+
+
+class EmbeddingsLocal(Embeddings):
+    """
+    Embedder determinístico e offline (hashing de palavras), para testes e benchmarks.
+    Textos com as mesmas palavras ficam próximos, o que basta para exercitar a busca.
+    """
+
+    model = "local-hash"
+
+    def __init__(self, dimensao=256):
+        self.dimensao = dimensao
+
+    def _vetor(self, texto):
+        texto = unicodedata.normalize("NFKD", texto.lower())
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+
+        vetor = [0.0] * self.dimensao
+        for palavra in re.findall(r"\w+", texto):
+            h = int.from_bytes(hashlib.md5(palavra.encode("utf-8")).digest()[:8], "little")
+            vetor[h % self.dimensao] += 1.0 if (h >> 32) & 1 else -1.0
+
+        norma = math.sqrt(sum(v * v for v in vetor)) or 1.0
+        return [v / norma for v in vetor]
+
+    def embed_documents(self, texts):
+        return [self._vetor(texto) for texto in texts]
+
+    def embed_query(self, text):
+        return self._vetor(text)
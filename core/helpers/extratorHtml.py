@@ -0,0 +1,222 @@
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Tags removidas junto com o conteúdo
+TAGS_IGNORADAS = {"script", "style", "meta", "link"}
+
+# Tags que separam parágrafos (viram "\n\n" no modo com parágrafos)
+TAGS_BLOCO = {
+    "p", "div", "section", "article", "main", "header", "footer", "aside", "nav",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "figure", "figcaption",
+    "ul", "ol", "li", "dl", "dt", "dd", "table", "thead", "tbody", "tfoot", "tr",
+    "caption", "hr", "form", "fieldset", "address", "details", "summary",
+}
+
+# Mesma tabela de entidades do BeautifulSoup (nomes do HTML5, sem o ";")
+ENTIDADES = {}
+for _nome, _caractere in html5.items():
+    ENTIDADES.setdefault(_nome.rstrip(";"), _caractere)
+
+_REFERENCIA_DECIMAL = re.compile(r"^([0-9]+)(.*)")
+_REFERENCIA_HEX = re.compile(r"^([0-9a-f]+)(.*)")
+
+
+def _caractere_numerico(nome):
+    """&#NNN; / &#xHH; como o BeautifulSoup resolve: (caractere, texto que sobrou)"""
+    base, padrao = 10, _REFERENCIA_DECIMAL
+    if nome[:1] in ("x", "X"):
+        nome, base, padrao = nome[1:], 16, _REFERENCIA_HEX
+
+    resto = ""
+    try:
+        numero = int(nome, base)
+    except ValueError:
+        match = padrao.search(nome)
+        if match is None:
+            return "", nome
+        numero, resto = int(match.group(1), base), match.group(2)
+
+    if numero == 0 or numero > 0x10FFFF or 0xD800 <= numero <= 0xDFFF:
+        return "\ufffd", resto
+    if 0x80 <= numero <= 0x9F:
+        # Referências escritas em Windows-1252 no lugar do Unicode
+        try:
+            return bytes([numero]).decode("cp1252"), resto
+        except UnicodeDecodeError:
+            pass
+    return chr(numero), resto
+
+
+class _Coletor:
+    """Junta os trechos de texto: um trecho por texto entre tags, parágrafos nas tags de bloco"""
+
+    def __init__(self):
+        self.paragrafos = []
+        self.trechos = []
+        self.texto = []
+        self.ignorando = 0
+
+    def fechar_trecho(self):
+        if self.texto:
+            trecho = "".join(self.texto).strip()
+            self.texto = []
+            if trecho:
+                self.trechos.append(trecho)
+
+    def fechar_paragrafo(self):
+        self.fechar_trecho()
+        if self.trechos:
+            self.paragrafos.append(self.trechos)
+            self.trechos = []
+
+    def abrir(self, tag):
+        if tag in TAGS_IGNORADAS:
+            self.fechar_trecho()
+            if tag in ("script", "style"):
+                self.ignorando += 1
+        elif tag in TAGS_BLOCO:
+            self.fechar_paragrafo()
+        else:
+            self.fechar_trecho()
+
+    def fechar(self, tag):
+        if tag in TAGS_IGNORADAS:
+            if tag in ("script", "style") and self.ignorando:
+                self.ignorando -= 1
+            self.fechar_trecho()
+        elif tag in TAGS_BLOCO:
+            self.fechar_paragrafo()
+        else:
+            self.fechar_trecho()
+
+    def dados(self, texto):
+        if not self.ignorando:
+            self.texto.append(texto)
+
+    def resultado(self, paragrafos):
+        self.fechar_paragrafo()
+        if paragrafos:
+            return "\n\n".join(" ".join(trechos) for trechos in self.paragrafos)
+        return " ".join(trecho for trechos in self.paragrafos for trecho in trechos)
+
+
+class _ParserStreaming(HTMLParser):
+    """Tokenizador da stdlib; nada de árvore, o texto é coletado enquanto o HTML é lido"""
+
+    def __init__(self):
+        # Entidades resolvidas aqui, do mesmo jeito que o BeautifulSoup (html.parser)
+        super().__init__(convert_charrefs=False)
+        self.coletor = _Coletor()
+
+    def handle_starttag(self, tag, attrs):
+        self.coletor.abrir(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.coletor.abrir(tag)
+        if tag in ("script", "style"):
+            self.coletor.fechar(tag)
+
+    def handle_endtag(self, tag):
+        self.coletor.fechar(tag)
+
+    def handle_data(self, data):
+        self.coletor.dados(data)
+
+    def handle_entityref(self, name):
+        caractere = ENTIDADES.get(name)
+        self.coletor.dados(caractere if caractere is not None else "&%s" % name)
+
+    def handle_charref(self, name):
+        caractere, resto = _caractere_numerico(name)
+        if caractere:
+            self.coletor.dados(caractere)
+        if resto:
+            self.coletor.dados(resto)
+
+    def unknown_decl(self, data):
+        self.coletor.fechar_trecho()
+        if data.upper().startswith("CDATA["):
+            self.coletor.dados(data[len("CDATA["):])
+            self.coletor.fechar_trecho()
+
+    # Comentários, doctype e processing instructions não entram no texto
+    def handle_comment(self, data):
+        self.coletor.fechar_trecho()
+
+    def handle_decl(self, decl):
+        self.coletor.fechar_trecho()
+
+    def handle_pi(self, data):
+        self.coletor.fechar_trecho()
+
+
+def _extrair_html_parser(html, paragrafos):
+    parser = _ParserStreaming()
+    parser.feed(html)
+    parser.close()
+    return parser.coletor.resultado(paragrafos)
+
+
+class _AlvoLxml:
+    """Alvo do parser do lxml (libxml2): recebe os eventos direto, sem montar a árvore"""
+
+    def __init__(self):
+        self.coletor = _Coletor()
+
+    def start(self, tag, attrib):
+        self.coletor.abrir(tag)
+
+    def end(self, tag):
+        self.coletor.fechar(tag)
+
+    def data(self, data):
+        self.coletor.dados(data)
+
+    def comment(self, text):
+        self.coletor.fechar_trecho()
+
+    def pi(self, target, data=None):
+        self.coletor.fechar_trecho()
+
+    def close(self):
+        return self.coletor
+
+
+def _extrair_lxml(html, paragrafos):
+    from lxml import etree
+    parser = etree.HTMLParser(target=_AlvoLxml(), no_network=True)
+    parser.feed(html)
+    return parser.close().resultado(paragrafos)
+
+
+def _lxml_disponivel():
+    try:
+        import lxml.etree  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+BACKENDS = {
+    "html.parser": _extrair_html_parser,
+    "lxml": _extrair_lxml,
+}
+
+
+def extrair_texto(html, paragrafos=False, backend="html.parser"):
+    """
+    Texto visível do HTML, sem script/style/meta/link.
+
+    - paragrafos=False: trechos unidos por " " (mesma saída do
+      BeautifulSoup(html, "html.parser").get_text(" ", strip=True))
+    - paragrafos=True: parágrafos (p, h2, li, ...) separados por "\\n\\n"
+    - backend: "html.parser" (stdlib, paridade com a versão anterior),
+      "lxml" (mais rápido; o libxml2 trata HTML malformado do seu jeito)
+      ou "auto" (lxml se estiver instalado)
+    """
+    if not html:
+        return ""
+    if backend == "auto":
+        backend = "lxml" if _lxml_disponivel() else "html.parser"
+    return BACKENDS[backend](html, paragrafos)
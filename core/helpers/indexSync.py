@@ -0,0 +1,146 @@
+import hashlib
+import json
+
+
+def criar_tabela_chunks(conn):
+    """Tabela com o hash de cada chunk já indexado (doc_id + ordem do chunk)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS artigos_chunks (
+            colecao TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            ordem INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            PRIMARY KEY (colecao, doc_id, ordem)
+        )
+    """)
+
+
+def tem_hashes(colecao, arquivo_db="artigos.db"):
+    """Se a coleção já foi sincronizada por hash (há algum chunk salvo em artigos_chunks)"""
+    from storage import conectar
+    conn = conectar(arquivo_db)
+    try:
+        criar_tabela_chunks(conn)
+        return conn.execute("SELECT 1 FROM artigos_chunks WHERE colecao = ? LIMIT 1", (colecao,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def ids_da_colecao(vectorstore):
+    """Todos os ids de chunk da coleção (IndiceLocal ou Chroma)"""
+    if hasattr(vectorstore, "ids"):
+        return vectorstore.ids()
+    return vectorstore.get(include=[])["ids"]
+
+
+def chunk_id(doc_id, ordem):
+    return f"{doc_id}#{ordem}"
+
+
+def hash_chunk(chunk):
+    """Hash do texto + metadados: qualquer mudança em um dos dois reindexa o chunk"""
+    conteudo = json.dumps(
+        {"texto": chunk.page_content, "metadata": chunk.metadata},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def sincronizar_chunks(vectorstore, chunks, colecao="artigos_demo", arquivo_db="artigos.db",
+                       doc_ids=None, reset=False, lote=500):
+    """
+    Sincroniza os chunks com o vectorstore, embedando apenas o que mudou.
+
+    - doc_ids: limita a sincronização a esses artigos (None = corpus inteiro,
+      e aí artigos que sumiram do banco também são removidos da coleção)
+    - reset: apaga o que houver na coleção e os hashes salvos, e indexa tudo de novo
+      (coleção vazia, ou de antes dos hashes: ids UUID e metadados sem data_int).
+      Deve vir com doc_ids=None, senão a coleção fica só com esses artigos
+
+    Retorna as contagens de chunks adicionados, atualizados, removidos e inalterados.
+    """
+    atuais = {}
+    docs_por_chave = {}
+    ordens = {}
+    for chunk in chunks:
+        doc_id = chunk.metadata.get("doc_id", "")
+        ordem = ordens.get(doc_id, 0)
+        ordens[doc_id] = ordem + 1
+
+        chave = (doc_id, ordem)
+        atuais[chave] = hash_chunk(chunk)
+        docs_por_chave[chave] = chunk
+
+    from storage import conectar
+    conn = conectar(arquivo_db)
+    try:
+        criar_tabela_chunks(conn)
+
+        antigos = []
+        if reset:
+            antigos = ids_da_colecao(vectorstore)
+            for i in range(0, len(antigos), lote):
+                vectorstore.delete(ids=antigos[i:i + lote])
+            conn.execute("DELETE FROM artigos_chunks WHERE colecao = ?", (colecao,))
+            conn.commit()
+
+        existentes = {}
+        if doc_ids is None:
+            rows = conn.execute(
+                "SELECT doc_id, ordem, hash FROM artigos_chunks WHERE colecao = ?",
+                (colecao,)
+            )
+            existentes = {(doc_id, ordem): h for doc_id, ordem, h in rows}
+        else:
+            doc_ids = list(doc_ids)
+            for i in range(0, len(doc_ids), lote):
+                parte = doc_ids[i:i + lote]
+                marcadores = ",".join("?" * len(parte))
+                rows = conn.execute(
+                    f"SELECT doc_id, ordem, hash FROM artigos_chunks "
+                    f"WHERE colecao = ? AND doc_id IN ({marcadores})",
+                    (colecao, *parte)
+                )
+                existentes.update({(doc_id, ordem): h for doc_id, ordem, h in rows})
+
+        novos = [chave for chave in atuais if chave not in existentes]
+        alterados = [chave for chave in atuais if chave in existentes and existentes[chave] != atuais[chave]]
+        removidos = [chave for chave in existentes if chave not in atuais]
+        inalterados = len(atuais) - len(novos) - len(alterados)
+
+        # Remove primeiro os chunks que sumiram ou mudaram
+        apagar = alterados + removidos
+        for i in range(0, len(apagar), lote):
+            parte = apagar[i:i + lote]
+            vectorstore.delete(ids=[chunk_id(doc_id, ordem) for doc_id, ordem in parte])
+            conn.executemany(
+                "DELETE FROM artigos_chunks WHERE colecao = ? AND doc_id = ? AND ordem = ?",
+                [(colecao, doc_id, ordem) for doc_id, ordem in parte]
+            )
+            conn.commit()
+
+        # Embeda só os novos/alterados, salvando o hash a cada lote
+        # (uma execução interrompida não refaz o que já foi indexado)
+        embedar = novos + alterados
+        for i in range(0, len(embedar), lote):
+            parte = embedar[i:i + lote]
+            vectorstore.add_documents(
+                [docs_por_chave[chave] for chave in parte],
+                ids=[chunk_id(doc_id, ordem) for doc_id, ordem in parte]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO artigos_chunks (colecao, doc_id, ordem, hash) VALUES (?, ?, ?, ?)",
+                [(colecao, doc_id, ordem, atuais[(doc_id, ordem)]) for doc_id, ordem in parte]
+            )
+            conn.commit()
+    finally:
+        conn.close()
+
+    return {
+        "adicionados": len(novos),
+        "atualizados": len(alterados),
+        "removidos": len(removidos) + len(antigos),
+        "inalterados": inalterados,
+    }
@@ -0,0 +1,633 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import uuid
+from urllib.parse import quote
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+QUANTIZACOES = {"float16": np.float16, "int8": np.int8}
+
+# Floats por bloco na busca exata (~64 MB em float32, qualquer que seja a dimensão)
+FLOATS_POR_BLOCO = 1 << 24
+
+DATA_MINIMA = int(np.iinfo(np.int32).min)
+DATA_MAXIMA = int(np.iinfo(np.int32).max)
+
+
+def intervalo_do_filtro(filtro):
+    """
+    Filtro no formato do Chroma sobre data_int (o que detectar_filtro_data gera)
+    -> (minimo, maximo) inclusivos, ou None sem filtro.
+    """
+    if not filtro:
+        return None
+
+    minimo, maximo = DATA_MINIMA, DATA_MAXIMA
+    for condicao in filtro.get("$and", [filtro]):
+        for campo, regra in condicao.items():
+            if campo != "data_int":
+                raise ValueError(f"Filtro não suportado pelo índice local: {campo}")
+            if not isinstance(regra, dict):
+                regra = {"$eq": regra}
+            for operador, valor in regra.items():
+                valor = int(valor)
+                if operador == "$eq":
+                    minimo, maximo = max(minimo, valor), min(maximo, valor)
+                elif operador == "$gte":
+                    minimo = max(minimo, valor)
+                elif operador == "$gt":
+                    minimo = max(minimo, valor + 1)
+                elif operador == "$lte":
+                    maximo = min(maximo, valor)
+                elif operador == "$lt":
+                    maximo = min(maximo, valor - 1)
+                else:
+                    raise ValueError(f"Operador não suportado pelo índice local: {operador}")
+    return minimo, maximo
+
+
+# 2^112: leva o expoente do float16 (viés 15), deslocado para o float32, ao viés 127
+_AJUSTE_EXPOENTE = np.float32(2.0 ** 112)
+
+
+def _para_float32(bloco):
+    """
+    Linhas quantizadas -> float32. No float16 a conversão é feita nos bits
+    (exata para valores finitos, ~2x mais rápida que o astype sem F16C).
+    """
+    bloco = np.asarray(bloco)
+    if bloco.dtype != np.float16:
+        return bloco.astype(np.float32)
+    bits = bloco.view(np.uint16).astype(np.uint32)
+    bits <<= 13
+    sinal = bits & np.uint32(0x8000 << 13)
+    bits ^= sinal
+    sinal <<= 3
+    bits |= sinal
+    numeros = bits.view(np.float32)
+    numeros *= _AJUSTE_EXPOENTE
+    return numeros
+
+
+def _normalizar(vetores):
+    vetores = np.asarray(vetores, dtype=np.float32)
+    normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return vetores / normas
+
+
+def kmeans_esferico(amostra, listas, iteracoes=10, semente=0):
+    """Centróides (normalizados) que particionam a amostra por similaridade de cosseno"""
+    rnd = np.random.default_rng(semente)
+    centroides = amostra[rnd.choice(len(amostra), listas, replace=False)].copy()
+
+    for _ in range(iteracoes):
+        atribuicao = np.argmax(amostra @ centroides.T, axis=1)
+        ordem = np.argsort(atribuicao, kind="stable")
+        contagem = np.bincount(atribuicao, minlength=listas)
+        ocupadas = np.flatnonzero(contagem)
+        inicios = np.concatenate(([0], np.cumsum(contagem[ocupadas])[:-1]))
+        centroides[ocupadas] = np.add.reduceat(amostra[ordem], inicios, axis=0)
+
+        # Lista vazia recomeça num ponto qualquer da amostra
+        vazias = np.flatnonzero(contagem == 0)
+        if len(vazias):
+            centroides[vazias] = amostra[rnd.choice(len(amostra), len(vazias), replace=False)]
+        centroides = _normalizar(centroides)
+    return centroides
+
+
+class _Geracao:
+    """
+    Estado de uma geração do índice (indice.json e arquivos mapeados). Cada recarga
+    monta um objeto novo e troca a referência de uma vez: a busca pega a geração no
+    início e lê vetores, listas IVF e documentos sempre da mesma.
+    """
+
+    def __init__(self, estado, assinatura):
+        self.estado = estado
+        self.assinatura = assinatura
+        self.dtype = QUANTIZACOES[estado["quantizacao"]]
+        self.linhas_por_bloco = max(1024, FLOATS_POR_BLOCO // max(estado["dimensao"] or 0, 1))
+        self.vetores = self.escalas = self.datas = self.vivos = None
+        self.ordem_datas = self.datas_ordenadas = None
+        self.centroides = self.listas = None
+        # (ordem, limites) das listas IVF, calculado na primeira busca
+        self.invertidas = None
+
+
+class IndiceLocal(VectorStore):
+    """
+    Índice vetorial local, alternativa ao Chroma com a mesma interface de VectorStore.
+
+    Os embeddings são normalizados e quantizados (float16, ou int8 com escala por
+    linha) em arquivos binários lidos com np.memmap; texto e metadados ficam num
+    SQLite ao lado. Abrir o índice não lê os vetores, e processos diferentes
+    (workers da API, Streamlit) compartilham as mesmas páginas do cache do sistema.
+
+    Arquivos em `diretorio` (N = geração, trocada a cada compactação):
+    - indice.json: dimensão, quantização, linhas, geração, listas IVF (troca atômica)
+    - vetores.N.bin, escalas.N.bin: vetores quantizados (escala só no int8)
+    - datas.N.bin, vivos.N.bin: data_int e 1/0 (apagado) por linha
+    - datas_ordem.N.bin, datas_ordenadas.N.bin: linhas ordenadas por data (pré-filtro)
+    - centroides.N.bin, listas.N.bin: partição IVF e a lista de cada linha
+    - documentos.N.db: id, texto e metadados por linha
+
+    Busca: produto matricial em blocos sobre todas as linhas (ou só as do intervalo
+    de datas); com limiar_ivf linhas ou mais, só as `sondas` listas IVF mais próximas
+    da consulta são varridas. Escrita: um processo por vez (as linhas são acrescentadas
+    e o indice.json é trocado no fim, então os leitores nunca veem escrita pela metade).
+    """
+
+    def __init__(self, diretorio, embedding_function, quantizacao="float16",
+                 limiar_ivf=20000, sondas=16, max_mortos=0.25):
+        if quantizacao not in QUANTIZACOES:
+            raise ValueError(f"Quantização inválida: {quantizacao} (use {', '.join(QUANTIZACOES)})")
+        self.diretorio = diretorio
+        self.embedding_function = embedding_function
+        self.quantizacao = quantizacao
+        self.limiar_ivf = limiar_ivf
+        self.sondas = sondas
+        self.max_mortos = max_mortos
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._g = None
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._carregar()
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, *, ids=None, diretorio="./indice_local", **kwargs):
+        indice = cls(diretorio, embedding, **kwargs)
+        indice.add_texts(texts, metadatas, ids=ids)
+        return indice
+
+    # --- Arquivos ---
+
+    def _caminho(self, nome, geracao=None, extensao="bin"):
+        geracao = self._g.estado["geracao"] if geracao is None else geracao
+        return os.path.join(self.diretorio, f"{nome}.{geracao}.{extensao}")
+
+    def _caminho_estado(self):
+        return os.path.join(self.diretorio, "indice.json")
+
+    def _ler_estado(self):
+        try:
+            with open(self._caminho_estado(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {
+                "dimensao": None, "quantizacao": self.quantizacao, "linhas": 0,
+                "mortos": 0, "geracao": 0, "listas_ivf": 0,
+            }
+
+    def _salvar_estado(self, estado):
+        temporario = self._caminho_estado() + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(estado, f)
+        os.replace(temporario, self._caminho_estado())
+
+    def _mapear(self, nome, dtype, forma, geracao=None):
+        """Arquivo mapeado em modo leitura (só as primeiras forma[0] linhas valem)"""
+        caminho = self._caminho(nome, geracao)
+        tamanho = int(np.prod(forma)) * np.dtype(dtype).itemsize
+        if tamanho == 0:
+            return np.zeros(forma, dtype=dtype)
+        if not os.path.exists(caminho) or os.path.getsize(caminho) < tamanho:
+            raise RuntimeError(f"Índice local incompleto: {caminho}")
+        return np.memmap(caminho, dtype=dtype, mode="r", shape=forma)
+
+    def _carregar(self):
+        # Assinatura antes do estado: se mudar no meio, a próxima busca recarrega
+        assinatura = self._ler_assinatura()
+        estado = self._ler_estado()
+        # A quantização salva vale mais que a do construtor
+        self.quantizacao = estado["quantizacao"]
+        g = _Geracao(estado, assinatura)
+        geracao = estado["geracao"]
+
+        linhas, dimensao = estado["linhas"], estado["dimensao"] or 0
+        g.vetores = self._mapear("vetores", g.dtype, (linhas, dimensao), geracao)
+        g.escalas = self._mapear("escalas", np.float32, (linhas,), geracao) if estado["quantizacao"] == "int8" else None
+        g.datas = self._mapear("datas", np.int32, (linhas,), geracao)
+        g.vivos = self._mapear("vivos", np.uint8, (linhas,), geracao)
+
+        # Ordem por data: gravada a cada escrita; se estiver defasada (escrita em
+        # andamento em outro processo), calcula na memória
+        if linhas == 0 or all(
+            os.path.exists(self._caminho(nome, geracao)) and os.path.getsize(self._caminho(nome, geracao)) == linhas * 4
+            for nome in ("datas_ordem", "datas_ordenadas")
+        ):
+            g.ordem_datas = self._mapear("datas_ordem", np.int32, (linhas,), geracao)
+            g.datas_ordenadas = self._mapear("datas_ordenadas", np.int32, (linhas,), geracao)
+        else:
+            g.ordem_datas = np.argsort(g.datas, kind="stable").astype(np.int32)
+            g.datas_ordenadas = g.datas[g.ordem_datas]
+
+        listas = estado["listas_ivf"]
+        g.centroides = self._mapear("centroides", np.float32, (listas, dimensao), geracao) if listas else None
+        g.listas = self._mapear("listas", np.int32, (linhas,), geracao) if listas else None
+
+        self._g = g
+
+    def _ler_assinatura(self):
+        try:
+            info = os.stat(self._caminho_estado())
+            return info.st_ino, info.st_mtime_ns, info.st_size
+        except FileNotFoundError:
+            return None
+
+    def _atualizar(self):
+        """Recarrega se outro processo (ou thread) gravou no índice"""
+        if self._ler_assinatura() != self._g.assinatura:
+            self._carregar()
+
+    def _geracao(self):
+        """Geração atual (recarregada se mudou), para a busca usar do começo ao fim"""
+        self._atualizar()
+        return self._g
+
+    def _conexao(self, g=None):
+        """
+        Uma conexão por thread com o documentos.db da geração `g` (None = atual).
+        None se `g` já foi substituída e a compactação apagou o banco dela.
+        """
+        g = g or self._g
+        caminho = self._caminho("documentos", g.estado["geracao"], "db")
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None or self._local.caminho != caminho:
+            uri = "file:" + quote(os.path.abspath(caminho))
+            try:
+                nova = sqlite3.connect(uri + "?mode=rw", uri=True, timeout=30)
+            except sqlite3.OperationalError:
+                # Só a geração atual cria o banco (o de uma antiga foi apagado)
+                if g is not self._g:
+                    return None
+                nova = sqlite3.connect(uri + "?mode=rwc", uri=True, timeout=30)
+            if conexao is not None:
+                conexao.close()
+            conexao = nova
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    pos INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL UNIQUE,
+                    texto TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+            """)
+            self._local.conexao = conexao
+            self._local.caminho = caminho
+        return conexao
+
+    def _acrescentar(self, nome, dados, tamanho_atual):
+        """Acrescenta linhas ao arquivo (descartando o que sobrou de uma escrita interrompida)"""
+        with open(self._caminho(nome), "ab") as f:
+            f.truncate(tamanho_atual)
+            f.write(np.ascontiguousarray(dados).tobytes())
+
+    def _gravar(self, nome, dados, geracao=None):
+        caminho = self._caminho(nome, geracao)
+        temporario = caminho + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(np.ascontiguousarray(dados).tobytes())
+        os.replace(temporario, caminho)
+
+    def _gravar_ordem_datas(self, datas, geracao=None):
+        ordem = np.argsort(datas, kind="stable").astype(np.int32)
+        self._gravar("datas_ordem", ordem, geracao)
+        self._gravar("datas_ordenadas", np.asarray(datas)[ordem], geracao)
+
+    # --- Escrita ---
+
+    def _quantizar(self, vetores):
+        if self.quantizacao == "int8":
+            escalas = np.abs(vetores).max(axis=1) / 127.0
+            escalas[escalas == 0] = 1.0
+            quantizados = np.clip(np.rint(vetores / escalas[:, None]), -127, 127).astype(np.int8)
+            return quantizados, escalas.astype(np.float32)
+        return vetores.astype(np.float16), None
+
+    def _apagar(self, ids):
+        """Tira os ids do SQLite e marca as linhas como mortas; retorna quantas eram vivas"""
+        conexao = self._conexao()
+        posicoes = []
+        ids = list(ids)
+        for i in range(0, len(ids), 500):
+            parte = ids[i:i + 500]
+            marcadores = ",".join("?" * len(parte))
+            posicoes += [pos for (pos,) in conexao.execute(
+                f"SELECT pos FROM chunks WHERE id IN ({marcadores})", parte
+            )]
+            conexao.execute(f"DELETE FROM chunks WHERE id IN ({marcadores})", parte)
+        conexao.commit()
+
+        if not posicoes:
+            return 0
+        vivos = np.memmap(self._caminho("vivos"), dtype=np.uint8, mode="r+", shape=(self._g.estado["linhas"],))
+        mortos = int(vivos[posicoes].sum())
+        vivos[posicoes] = 0
+        vivos.flush()
+        del vivos
+        return mortos
+
+    def add_texts(self, texts, metadatas=None, *, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vetores = self.embedding_function.embed_documents(texts)
+        self._adicionar(vetores, texts, metadatas, ids)
+        return ids
+
+    def _adicionar(self, vetores, textos, metadatas, ids):
+        vetores = _normalizar(vetores)
+        with self._lock:
+            self._atualizar()
+            estado = dict(self._g.estado)
+            if estado["dimensao"] is None:
+                estado["dimensao"] = int(vetores.shape[1])
+            elif vetores.shape[1] != estado["dimensao"]:
+                raise ValueError(f"Dimensão {vetores.shape[1]} diferente da do índice ({estado['dimensao']})")
+
+            # Id repetido = atualização: a linha antiga morre, a nova vai no fim
+            estado["mortos"] += self._apagar(ids)
+
+            linhas = estado["linhas"]
+            dimensao = estado["dimensao"]
+            quantizados, escalas = self._quantizar(vetores)
+            datas = np.array([int(m.get("data_int") or 0) for m in metadatas], dtype=np.int32)
+
+            self._acrescentar("vetores", quantizados, linhas * dimensao * quantizados.itemsize)
+            if escalas is not None:
+                self._acrescentar("escalas", escalas, linhas * 4)
+            self._acrescentar("datas", datas, linhas * 4)
+            self._acrescentar("vivos", np.ones(len(ids), dtype=np.uint8), linhas)
+            if estado["listas_ivf"]:
+                listas = np.argmax(vetores @ np.asarray(self._g.centroides).T, axis=1).astype(np.int32)
+                self._acrescentar("listas", listas, linhas * 4)
+
+            conexao = self._conexao()
+            conexao.executemany(
+                "INSERT INTO chunks (pos, id, texto, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (linhas + i, id_, texto, json.dumps(metadata, ensure_ascii=False, default=str))
+                    for i, (id_, texto, metadata) in enumerate(zip(ids, textos, metadatas))
+                ]
+            )
+            conexao.commit()
+
+            estado["linhas"] = linhas + len(ids)
+            todas_datas = np.fromfile(self._caminho("datas"), dtype=np.int32, count=estado["linhas"])
+            self._gravar_ordem_datas(todas_datas)
+            self._salvar_estado(estado)
+            self._carregar()
+
+            if not estado["listas_ivf"] and self.count() >= self.limiar_ivf:
+                self._treinar_ivf()
+
+        estado = self._g.estado
+        if estado["mortos"] > self.max_mortos * max(estado["linhas"], 1):
+            self.compactar()
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return False
+        with self._lock:
+            self._atualizar()
+            mortos = self._apagar(ids)
+            if mortos:
+                estado = dict(self._g.estado)
+                estado["mortos"] += mortos
+                self._salvar_estado(estado)
+                self._carregar()
+        return True
+
+    def _dequantizar(self, g, posicoes):
+        vetores = _para_float32(g.vetores[posicoes])
+        if g.escalas is not None:
+            vetores *= g.escalas[posicoes][:, None]
+        return vetores
+
+    def _treinar_ivf(self, amostra_max=50000, semente=0):
+        """Particiona as linhas vivas em ~sqrt(n) listas (k-means esférico numa amostra)"""
+        g = self._g
+        vivas = np.flatnonzero(g.vivos)
+        listas = max(1, int(math.sqrt(len(vivas))))
+        rnd = np.random.default_rng(semente)
+        amostra = np.sort(rnd.choice(vivas, min(len(vivas), amostra_max), replace=False))
+        centroides = kmeans_esferico(_normalizar(self._dequantizar(g, amostra)), listas, semente=semente)
+
+        linhas = g.estado["linhas"]
+        atribuicao = np.empty(linhas, dtype=np.int32)
+        for inicio in range(0, linhas, g.linhas_por_bloco):
+            faixa = slice(inicio, min(inicio + g.linhas_por_bloco, linhas))
+            atribuicao[faixa] = np.argmax(self._dequantizar(g, faixa) @ centroides.T, axis=1)
+
+        self._gravar("centroides", centroides.astype(np.float32))
+        self._gravar("listas", atribuicao)
+        estado = dict(g.estado)
+        estado["listas_ivf"] = listas
+        self._salvar_estado(estado)
+        self._carregar()
+
+    def compactar(self):
+        """
+        Reescreve o índice sem as linhas apagadas, numa geração nova (e retreina o IVF).
+        Leitores com a geração anterior aberta continuam funcionando até recarregar.
+        """
+        with self._lock:
+            g = self._geracao()
+            antigo = dict(g.estado)
+            geracao = antigo["geracao"] + 1
+
+            conexao = self._conexao()
+            no_banco = np.fromiter((pos for (pos,) in conexao.execute("SELECT pos FROM chunks")), dtype=np.int64)
+            vivas = np.intersect1d(np.flatnonzero(g.vivos), no_banco)
+
+            for nome, dados in (("vetores", g.vetores), ("escalas", g.escalas), ("datas", g.datas)):
+                if dados is None:
+                    continue
+                with open(self._caminho(nome, geracao), "wb") as f:
+                    for inicio in range(0, len(vivas), g.linhas_por_bloco):
+                        f.write(np.ascontiguousarray(dados[vivas[inicio:inicio + g.linhas_por_bloco]]).tobytes())
+            self._gravar("vivos", np.ones(len(vivas), dtype=np.uint8), geracao)
+            self._gravar_ordem_datas(np.asarray(g.datas[vivas]), geracao)
+
+            caminho_db = self._caminho("documentos", geracao, "db")
+            if os.path.exists(caminho_db):
+                os.remove(caminho_db)
+            conexao.execute("ATTACH DATABASE ? AS novo", (caminho_db,))
+            conexao.execute("CREATE TABLE novo.chunks (pos INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, "
+                            "texto TEXT NOT NULL, metadata TEXT NOT NULL)")
+            conexao.execute("CREATE TEMP TABLE mapa (antigo INTEGER PRIMARY KEY, novo INTEGER)")
+            conexao.executemany("INSERT INTO mapa VALUES (?, ?)", zip(vivas.tolist(), range(len(vivas))))
+            conexao.execute("INSERT INTO novo.chunks SELECT mapa.novo, c.id, c.texto, c.metadata "
+                            "FROM chunks c JOIN mapa ON mapa.antigo = c.pos")
+            conexao.commit()
+            conexao.execute("DROP TABLE mapa")
+            conexao.execute("DETACH DATABASE novo")
+
+            self._salvar_estado({**antigo, "linhas": int(len(vivas)), "mortos": 0,
+                                 "geracao": geracao, "listas_ivf": 0})
+            self._carregar()
+            if len(vivas) >= self.limiar_ivf:
+                self._treinar_ivf()
+
+            # Arquivos da geração anterior (mapeamentos abertos continuam válidos)
+            for arquivo in os.listdir(self.diretorio):
+                partes = arquivo.split(".")
+                if len(partes) >= 3 and partes[1] == str(antigo["geracao"]):
+                    try:
+                        os.remove(os.path.join(self.diretorio, arquivo))
+                    except OSError:
+                        pass
+
+    # --- Busca ---
+
+    def count(self):
+        estado = self._geracao().estado
+        return estado["linhas"] - estado["mortos"]
+
+    def ids(self):
+        """Ids de todos os chunks vivos"""
+        self._atualizar()
+        return [id_ for (id_,) in self._conexao().execute("SELECT id FROM chunks ORDER BY pos")]
+
+    def _listas_invertidas(self, g):
+        """Linhas agrupadas por lista IVF (calculado na primeira busca de cada geração)"""
+        if g.invertidas is None:
+            listas = np.asarray(g.listas)
+            ordem = np.argsort(listas, kind="stable").astype(np.int32)
+            limites = np.concatenate(([0], np.cumsum(np.bincount(listas, minlength=len(g.centroides)))))
+            g.invertidas = (ordem, limites)
+        return g.invertidas
+
+    def _varrer(self, g, consultas, k, posicoes=None):
+        """Busca exata em blocos sobre `posicoes` (None = todas as linhas): [(pos, cosseno)] por consulta"""
+        total = g.estado["linhas"] if posicoes is None else len(posicoes)
+        m = len(consultas)
+        melhores_pontos = np.empty((m, 0), dtype=np.float32)
+        melhores_pos = np.empty((m, 0), dtype=np.int64)
+
+        for inicio in range(0, total, g.linhas_por_bloco):
+            fim = min(inicio + g.linhas_por_bloco, total)
+            if posicoes is None:
+                faixa, pos = slice(inicio, fim), np.arange(inicio, fim)
+            else:
+                faixa = pos = posicoes[inicio:fim]
+
+            pontos = consultas @ _para_float32(g.vetores[faixa]).T
+            if g.escalas is not None:
+                pontos *= g.escalas[faixa]
+            pontos[:, np.asarray(g.vivos[faixa]) == 0] = -np.inf
+
+            pontos = np.concatenate((melhores_pontos, pontos), axis=1)
+            todas_pos = np.concatenate((melhores_pos, np.broadcast_to(pos, (m, len(pos)))), axis=1)
+            if pontos.shape[1] > k:
+                escolhidos = np.argpartition(-pontos, k - 1, axis=1)[:, :k]
+                pontos = np.take_along_axis(pontos, escolhidos, axis=1)
+                todas_pos = np.take_along_axis(todas_pos, escolhidos, axis=1)
+            melhores_pontos, melhores_pos = pontos, todas_pos
+
+        resultados = []
+        for pontos, pos in zip(melhores_pontos, melhores_pos):
+            ordem = np.argsort(-pontos)
+            resultados.append([(int(pos[i]), float(pontos[i])) for i in ordem if pontos[i] > -np.inf])
+        return resultados
+
+    def _buscar(self, g, consultas, k, filtro=None):
+        consultas = _normalizar(np.atleast_2d(consultas))
+        if g.estado["linhas"] == 0 or k <= 0:
+            return [[] for _ in consultas]
+
+        # Pré-filtro por data: fatia contígua do array ordenado
+        intervalo = intervalo_do_filtro(filtro)
+        candidatos = None
+        if intervalo is not None:
+            inicio = np.searchsorted(g.datas_ordenadas, intervalo[0], side="left")
+            fim = np.searchsorted(g.datas_ordenadas, intervalo[1], side="right")
+            candidatos = np.sort(g.ordem_datas[inicio:fim])
+            if len(candidatos) == 0:
+                return [[] for _ in consultas]
+
+        total = g.estado["linhas"] if candidatos is None else len(candidatos)
+        if g.centroides is None or total < self.limiar_ivf:
+            return self._varrer(g, consultas, k, candidatos)
+
+        # IVF: só as listas mais próximas de cada consulta
+        ordem, limites = self._listas_invertidas(g)
+        centroides = np.asarray(g.centroides)
+        sondas = min(self.sondas, len(centroides))
+        resultados = []
+        for consulta in consultas:
+            proximas = np.argpartition(-(centroides @ consulta), sondas - 1)[:sondas]
+            posicoes = np.sort(np.concatenate([ordem[limites[lista]:limites[lista + 1]] for lista in proximas]))
+            if intervalo is not None:
+                datas = g.datas[posicoes]
+                posicoes = posicoes[(datas >= intervalo[0]) & (datas <= intervalo[1])]
+            resultados += self._varrer(g, consulta[None, :], k, posicoes)
+        return resultados
+
+    def _documentos(self, g, posicoes):
+        """Documentos das posições da geração `g` (None se ela já foi apagada)"""
+        conexao = self._conexao(g)
+        if conexao is None:
+            return None
+        documentos = {}
+        try:
+            for i in range(0, len(posicoes), 500):
+                parte = posicoes[i:i + 500]
+                marcadores = ",".join("?" * len(parte))
+                for pos, id_, texto, metadata in conexao.execute(
+                    f"SELECT pos, id, texto, metadata FROM chunks WHERE pos IN ({marcadores})", parte
+                ):
+                    documentos[pos] = Document(id=id_, page_content=texto, metadata=json.loads(metadata))
+        except sqlite3.OperationalError:
+            # Banco apagado com a conexão aberta (o -wal/-shm some junto)
+            if g is self._g:
+                raise
+            return None
+        return documentos
+
+    def buscar_por_vetores(self, vetores, k=4, filter=None):
+        """Várias consultas de uma vez (um produto matricial por bloco): [[(Document, cosseno)]]"""
+        documentos = None
+        while documentos is None:
+            # Geração compactada (e apagada) no meio da busca: as posições mudaram,
+            # então busca de novo na atual
+            g = self._geracao()
+            resultados = self._buscar(g, vetores, k, filter)
+            documentos = self._documentos(g, sorted({pos for resultado in resultados for pos, _ in resultado}))
+        # Linha sem documento = apagada por outro processo no meio da busca
+        return [
+            [(documentos[pos], cosseno) for pos, cosseno in resultado if pos in documentos]
+            for resultado in resultados
+        ]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        """Mesma escala do Chroma: distância L2 ao quadrado entre vetores normalizados"""
+        vetor = self.embedding_function.embed_query(query)
+        return [(doc, 2.0 - 2.0 * cosseno) for doc, cosseno in self.buscar_por_vetores([vetor], k, filter)[0]]
+
+    def _select_relevance_score_fn(self):
+        # Mesma relevância do Chroma (l2), para o peso de recência do customRetrievel
+        return self._euclidean_relevance_score_fn
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.buscar_por_vetores([embedding], k, filter)[0]]
@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, messages_from_dict, message_to_dict, trim_messages
+
+from core.helpers.contextBuilder import contar_tokens
+
+
+class HistoricoSessao(BaseChatMessageHistory):
+    """Histórico de uma sessão; grava cada mensagem no SQLite quando a persistência está ligada"""
+
+    def __init__(self, session_id, store, mensagens=None):
+        self.session_id = session_id
+        self.store = store
+        self._mensagens = list(mensagens or [])
+
+    @property
+    def messages(self):
+        return list(self._mensagens)
+
+    def add_messages(self, messages):
+        messages = list(messages)
+        self._mensagens.extend(messages)
+        # Em memória fica só o final da conversa (o resto continua no SQLite)
+        excesso = len(self._mensagens) - self.store.max_mensagens
+        if excesso > 0:
+            del self._mensagens[:excesso]
+        self.store._persistir(self.session_id, messages)
+
+    def clear(self):
+        self._mensagens = []
+        self.store._apagar(self.session_id)
+
+
+class SessionStore:
+    """
+    Históricos de chat com limite de memória:
+
+    - ids de sessão sem colisão (uuid4)
+    - sessões ociosas há mais de `ttl_ocioso` segundos saem da memória
+    - acima de `max_sessoes`, sai a usada há mais tempo (LRU)
+    - com `arquivo_db`, as mensagens são persistidas e a sessão é recarregada do SQLite
+    """
+
+    def __init__(self, ttl_ocioso=3600, max_sessoes=1000, max_mensagens=200,
+                 arquivo_db=None, mensagem_inicial=None):
+        self.ttl_ocioso = ttl_ocioso
+        self.max_sessoes = max_sessoes
+        self.max_mensagens = max_mensagens
+        self.mensagem_inicial = mensagem_inicial
+
+        self._sessoes = OrderedDict()
+        self._acessos = {}
+        self._lock = threading.RLock()
+
+        self._conn = None
+        if arquivo_db:
+            self._conn = sqlite3.connect(arquivo_db, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_historico (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    mensagem TEXT NOT NULL,
+                    criado_em REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_historico_sessao ON chat_historico(session_id, id)")
+            self._conn.commit()
+
+    @staticmethod
+    def novo_session_id():
+        return f"session_{uuid.uuid4().hex}"
+
+    def get(self, session_id):
+        agora = time.monotonic()
+        with self._lock:
+            self._despejar(agora)
+
+            historico = self._sessoes.get(session_id)
+            if historico is None:
+                historico = self._carregar(session_id)
+                self._sessoes[session_id] = historico
+                if len(self._sessoes) > self.max_sessoes:
+                    antigo, _ = self._sessoes.popitem(last=False)
+                    self._acessos.pop(antigo, None)
+            else:
+                self._sessoes.move_to_end(session_id)
+
+            self._acessos[session_id] = agora
+            return historico
+
+    def __len__(self):
+        return len(self._sessoes)
+
+    def _despejar(self, agora):
+        # OrderedDict em ordem de acesso: as ociosas estão sempre no começo
+        while self._sessoes:
+            session_id = next(iter(self._sessoes))
+            if agora - self._acessos.get(session_id, agora) <= self.ttl_ocioso:
+                break
+            self._sessoes.popitem(last=False)
+            self._acessos.pop(session_id, None)
+
+    def _carregar(self, session_id):
+        mensagens = []
+        if self._conn is not None:
+            rows = self._conn.execute(
+                "SELECT mensagem FROM ("
+                "  SELECT id, mensagem FROM chat_historico WHERE session_id = ? ORDER BY id DESC LIMIT ?"
+                ") ORDER BY id",
+                (session_id, self.max_mensagens)
+            ).fetchall()
+            mensagens = messages_from_dict([json.loads(row[0]) for row in rows])
+
+        if not mensagens and self.mensagem_inicial:
+            # A saudação não é persistida: volta sozinha quando a sessão é recarregada
+            mensagens = [AIMessage(content=self.mensagem_inicial)]
+        return HistoricoSessao(session_id, self, mensagens)
+
+    def _persistir(self, session_id, mensagens):
+        if self._conn is None or not mensagens:
+            return
+        agora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO chat_historico (session_id, mensagem, criado_em) VALUES (?, ?, ?)",
+                [(session_id, json.dumps(message_to_dict(m), ensure_ascii=False), agora) for m in mensagens]
+            )
+            self._conn.commit()
+
+    def _apagar(self, session_id):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_historico WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def limpar_persistidos(self, dias=30):
+        """Apaga do SQLite as conversas sem mensagens novas há mais de `dias` dias"""
+        if self._conn is None:
+            return 0
+        limite = time.time() - dias * 86400
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM chat_historico WHERE session_id IN ("
+                "  SELECT session_id FROM chat_historico GROUP BY session_id HAVING MAX(criado_em) < ?"
+                ")",
+                (limite,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+
+def janela_historico(mensagens, max_tokens=1500, modelo="gpt-4o-mini"):
+    """Últimas mensagens que cabem em `max_tokens`, começando sempre numa pergunta do usuário"""
+    if not mensagens:
+        return []
+    return trim_messages(
+        mensagens,
+        max_tokens=max_tokens,
+        token_counter=lambda ms: sum(contar_tokens(m.content, modelo) + 4 for m in ms),
+        strategy="last",
+        start_on="human",
+    )
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from collections import deque
+
+_FIM = object()
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+class MetricasStream:
+    """Tempo até o primeiro token e duração total de cada resposta em stream"""
+
+    def __init__(self, historico=1000):
+        self.registros = deque(maxlen=historico)
+        self._lock = threading.Lock()
+
+    def registrar(self, ttft, duracao, caracteres, envios):
+        with self._lock:
+            self.registros.append({
+                "ttft": ttft,
+                "duracao": duracao,
+                "caracteres": caracteres,
+                "envios": envios,
+            })
+
+    def resumo(self):
+        with self._lock:
+            registros = list(self.registros)
+        ttfts = [r["ttft"] for r in registros if r["ttft"] is not None]
+        duracoes = [r["duracao"] for r in registros]
+        return {
+            "respostas": len(registros),
+            "ttft_p50": percentil(ttfts, 50),
+            "ttft_p95": percentil(ttfts, 95),
+            "duracao_p50": percentil(duracoes, 50),
+            "duracao_p95": percentil(duracoes, 95),
+        }
+
+
+def _produzir(pedacos, fila, parar):
+    try:
+        for pedaco in pedacos:
+            if parar.is_set():
+                break
+            fila.put(pedaco)
+    except Exception as e:
+        fila.put(e)
+    finally:
+        fila.put(_FIM)
+
+
+def coalescer(pedacos, intervalo_ms=0, max_chars=0, metricas=None):
+    """
+    Repassa o texto do stream assim que ele chega.
+
+    Com intervalo_ms/max_chars > 0, os pedaços são agrupados e enviados a cada
+    intervalo_ms ou a cada max_chars caracteres. O primeiro pedaço sai na hora
+    e nada fica no buffer por mais de intervalo_ms, mesmo se o modelo pausar
+    (o stream é lido numa thread à parte).
+    """
+    inicio = time.perf_counter()
+    ttft = None
+    caracteres = 0
+    envios = 0
+    parar = threading.Event()
+
+    try:
+        if intervalo_ms <= 0 and max_chars <= 0:
+            for texto in pedacos:
+                if not texto:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - inicio
+                caracteres += len(texto)
+                envios += 1
+                yield texto
+            return
+
+        fila = queue.Queue()
+        threading.Thread(target=_produzir, args=(pedacos, fila, parar), daemon=True).start()
+
+        intervalo = intervalo_ms / 1000 if intervalo_ms > 0 else None
+        buffer = []
+        tamanho = 0
+        ultimo_envio = time.perf_counter()
+
+        while True:
+            espera = None
+            if buffer and intervalo is not None:
+                espera = max(0.0, intervalo - (time.perf_counter() - ultimo_envio))
+
+            try:
+                item = fila.get(timeout=espera)
+            except queue.Empty:
+                item = None
+
+            if item is _FIM:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            if item:
+                buffer.append(item)
+                tamanho += len(item)
+
+            agora = time.perf_counter()
+            primeiro = ttft is None and buffer
+            venceu = intervalo is not None and agora - ultimo_envio >= intervalo
+            cheio = max_chars > 0 and tamanho >= max_chars
+
+            if buffer and (primeiro or venceu or cheio):
+                if ttft is None:
+                    ttft = agora - inicio
+                texto = "".join(buffer)
+                buffer = []
+                tamanho = 0
+                ultimo_envio = agora
+                caracteres += len(texto)
+                envios += 1
+                yield texto
+
+        if buffer:
+            texto = "".join(buffer)
+            if ttft is None:
+                ttft = time.perf_counter() - inicio
+            caracteres += len(texto)
+            envios += 1
+            yield texto
+    finally:
+        # Quem consome parou antes do fim (ex: sessão fechada): solta o stream do modelo
+        parar.set()
+        if metricas is not None:
+            metricas.registrar(ttft, time.perf_counter() - inicio, caracteres, envios)
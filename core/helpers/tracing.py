@@ -0,0 +1,305 @@
+"""
+Rastreamento por requisição do chat.
+
+Cada resposta ganha um Rastro com a duração de cada etapa (filtro de datas,
+embedding da pergunta, buscas, montagem do contexto e do prompt, primeiro token,
+stream inteiro) e atributos (tokens, acertos de cache). Ao terminar, o rastro vai
+para os sinks registrados: linhas JSON no log e/ou agregação p50/p95/p99 no
+formato de texto do Prometheus.
+
+As etapas são medidas com `etapa(nome)` onde o trabalho acontece; sem rastro
+ativo (scripts, indexador) não custa nada além de um ContextVar.get.
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.helpers.streamHelper import percentil
+
+logger = logging.getLogger(__name__)
+
+_rastro_atual = contextvars.ContextVar("rastro_atual", default=None)
+
+QUANTIS = (50, 95, 99)
+
+
+class Rastro:
+    """Uma resposta do chat: etapas (nome -> segundos) e atributos"""
+
+    def __init__(self, nome="chat", **atributos):
+        self.nome = nome
+        self.id = uuid.uuid4().hex[:12]
+        self.momento = time.time()
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+        self.atributos = dict(atributos)
+        self.duracao = None
+        self._lock = threading.Lock()
+
+    def registrar_etapa(self, nome, segundos):
+        # A mesma etapa mais de uma vez na requisição (ex: duas buscas) soma
+        with self._lock:
+            self.etapas[nome] = self.etapas.get(nome, 0.0) + segundos
+
+    def marcar(self, **atributos):
+        with self._lock:
+            self.atributos.update(atributos)
+
+    def contar(self, nome, quantidade=1):
+        with self._lock:
+            self.atributos[nome] = self.atributos.get(nome, 0) + quantidade
+
+    def desde_inicio(self):
+        return time.perf_counter() - self.inicio
+
+    @contextmanager
+    def ativo(self):
+        """Torna este o rastro atual dentro do bloco (sem atravessar yields)"""
+        token = _rastro_atual.set(self)
+        try:
+            yield self
+        finally:
+            _rastro_atual.reset(token)
+
+    def acompanhar(self, iteravel):
+        """
+        Itera com o rastro ativo só durante cada next(): as etapas que rodam
+        dentro do stream (contexto, prompt) entram no rastro, e o ContextVar não
+        fica preso em quem consome o gerador entre um pedaço e outro.
+        """
+        iterador = iter(iteravel)
+        while True:
+            token = _rastro_atual.set(self)
+            try:
+                item = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                _rastro_atual.reset(token)
+            yield item
+
+    async def aacompanhar(self, iteravel):
+        """Versão assíncrona de acompanhar"""
+        iterador = iteravel.__aiter__()
+        while True:
+            token = _rastro_atual.set(self)
+            try:
+                item = await iterador.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _rastro_atual.reset(token)
+            yield item
+
+    def finalizar(self):
+        if self.duracao is not None:
+            return
+        self.duracao = self.desde_inicio()
+        coletor.emitir(self)
+
+    def para_dict(self):
+        with self._lock:
+            return {
+                "rastro": self.id,
+                "nome": self.nome,
+                "momento": round(self.momento, 3),
+                "duracao_ms": _ms(self.duracao),
+                "etapas_ms": {nome: _ms(segundos) for nome, segundos in self.etapas.items()},
+                **self.atributos,
+            }
+
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 2)
+
+
+def rastro_atual():
+    return _rastro_atual.get()
+
+
+@contextmanager
+def etapa(nome):
+    """Mede o bloco como etapa `nome` do rastro atual (se houver)"""
+    rastro = _rastro_atual.get()
+    if rastro is None:
+        yield None
+        return
+    inicio = time.perf_counter()
+    try:
+        yield rastro
+    finally:
+        rastro.registrar_etapa(nome, time.perf_counter() - inicio)
+
+
+def marcar(**atributos):
+    rastro = _rastro_atual.get()
+    if rastro is not None:
+        rastro.marcar(**atributos)
+
+
+def contar(nome, quantidade=1):
+    rastro = _rastro_atual.get()
+    if rastro is not None:
+        rastro.contar(nome, quantidade)
+
+
+# ---------------------
+# Sinks
+# ---------------------
+
+class SinkLogJson:
+    """Uma linha JSON por rastro no logger `neo.rastros` (nível INFO)"""
+
+    def __init__(self, nome_logger="neo.rastros"):
+        self.logger = logging.getLogger(nome_logger)
+
+    def emitir(self, rastro):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(json.dumps(rastro.para_dict(), ensure_ascii=False, default=str))
+
+
+class SinkPrometheus:
+    """
+    Guarda as últimas `historico` durações de cada etapa e expõe p50/p95/p99
+    (resumo) e o texto no formato de exposição do Prometheus (exposicao).
+    """
+
+    def __init__(self, historico=2000, prefixo="neo_chat"):
+        self.historico = historico
+        self.prefixo = prefixo
+        self.etapas = {}
+        self.contadores = {}
+        self.rastros = 0
+        self._lock = threading.Lock()
+
+    def _observar(self, nome, valor):
+        serie = self.etapas.get(nome)
+        if serie is None:
+            serie = self.etapas[nome] = deque(maxlen=self.historico)
+        serie.append(valor)
+
+    def emitir(self, rastro):
+        with self._lock:
+            self.rastros += 1
+            for nome, segundos in rastro.etapas.items():
+                self._observar(nome, segundos)
+            if rastro.duracao is not None:
+                self._observar("total", rastro.duracao)
+            for nome, valor in rastro.atributos.items():
+                # Atributos numéricos (tokens, acertos) viram contadores; booleanos contam os True
+                if isinstance(valor, bool):
+                    valor = int(valor)
+                if isinstance(valor, (int, float)):
+                    self.contadores[nome] = self.contadores.get(nome, 0) + valor
+
+    def resumo(self):
+        with self._lock:
+            etapas = {nome: list(serie) for nome, serie in self.etapas.items()}
+            contadores = dict(self.contadores)
+            rastros = self.rastros
+        return {
+            "rastros": rastros,
+            "etapas_ms": {
+                nome: {"n": len(valores), **{f"p{q}": _ms(percentil(valores, q)) for q in QUANTIS}}
+                for nome, valores in etapas.items()
+            },
+            "contadores": contadores,
+        }
+
+    def exposicao(self):
+        with self._lock:
+            etapas = {nome: list(serie) for nome, serie in self.etapas.items()}
+            contadores = dict(self.contadores)
+            rastros = self.rastros
+
+        linhas = [
+            f"# HELP {self.prefixo}_etapa_segundos Duração das etapas do chat (últimas {self.historico} por etapa)",
+            f"# TYPE {self.prefixo}_etapa_segundos summary",
+        ]
+        for nome in sorted(etapas):
+            valores = etapas[nome]
+            for q in QUANTIS:
+                linhas.append(f'{self.prefixo}_etapa_segundos{{etapa="{nome}",quantile="{q / 100}"}} {percentil(valores, q):.6f}')
+            linhas.append(f'{self.prefixo}_etapa_segundos_sum{{etapa="{nome}"}} {sum(valores):.6f}')
+            linhas.append(f'{self.prefixo}_etapa_segundos_count{{etapa="{nome}"}} {len(valores)}')
+
+        linhas.append(f"# TYPE {self.prefixo}_respostas_total counter")
+        linhas.append(f"{self.prefixo}_respostas_total {rastros}")
+        for nome in sorted(contadores):
+            linhas.append(f"# TYPE {self.prefixo}_{nome}_total counter")
+            linhas.append(f"{self.prefixo}_{nome}_total {contadores[nome]}")
+        return "\n".join(linhas) + "\n"
+
+
+class Coletor:
+    """Repassa cada rastro finalizado para os sinks registrados"""
+
+    def __init__(self):
+        self.sinks = []
+
+    def configurar(self, sinks):
+        self.sinks = list(sinks)
+
+    def adicionar(self, sink):
+        self.sinks.append(sink)
+
+    def emitir(self, rastro):
+        for sink in self.sinks:
+            try:
+                sink.emitir(rastro)
+            except Exception:
+                logger.exception("Falha no sink de rastreamento %s", type(sink).__name__)
+
+    def prometheus(self):
+        return next((sink for sink in self.sinks if isinstance(sink, SinkPrometheus)), None)
+
+
+coletor = Coletor()
+
+
+def configurar_sinks(nomes, historico=2000):
+    """nomes: "json" e/ou "prometheus" (ex: rag.TRACING_SINKS)"""
+    sinks = []
+    for nome in nomes:
+        if nome == "json":
+            sinks.append(SinkLogJson())
+        elif nome == "prometheus":
+            sinks.append(SinkPrometheus(historico=historico))
+        else:
+            raise ValueError(f"Sink de rastreamento desconhecido: {nome}")
+    coletor.configurar(sinks)
+    return sinks
+
+
+def servir_metricas(porta, host="127.0.0.1"):
+    """
+    Endpoint /metrics local numa thread (para o app Streamlit, que não tem a
+    rota da API). Retorna o servidor; shutdown() encerra.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            sink = coletor.prometheus()
+            if self.path.split("?")[0] != "/metrics" or sink is None:
+                self.send_error(404)
+                return
+            corpo = sink.exposicao().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            logger.debug("metrics: " + formato, *args)
+
+    servidor = ThreadingHTTPServer((host, porta), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    logger.info("Métricas em http://%s:%d/metrics", host, porta)
+    return servidor
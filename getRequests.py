@@ -1,42 +1,70 @@
-from storage import save
+from storage import save, get_estado, set_estado, load_modificados
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core.helpers.extratorHtml import extrair_texto
 import html
 import re
+import unicodedata
 from urllib.parse import urlparse
 
-def limpar_caracteres_agressivo(texto):
-    """Limpeza mais robusta para conteúdo da web"""
+# Caracteres de controle (0x00-0x1F, 0x7F-0x9F) exceto tab, newline, return,
+# zero-width spaces e BOM
+PADRAO_INVISIVEIS = re.compile('[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F\u200b\ufeff]')
+
+# Caracteres acentuados mal formatados: letra + acento combinante -> letra acentuada,
+# agrupados pelo acento (só os grupos cujo acento aparece no texto são aplicados)
+CORRECOES_POR_ACENTO = {}
+for _letras, _acento in (('aeiou', '\u0301'), ('aeiou', '\u0300'), ('aeioun', '\u0303'),
+                         ('aeiou', '\u0302'), ('c', '\u0327')):
+    CORRECOES_POR_ACENTO[_acento] = tuple(
+        (letra + _acento, unicodedata.normalize('NFC', letra + _acento)) for letra in _letras
+    )
+
+# Sequências escapadas que sobram do HTML; removidas em ordem, como antes
+# (remover uma pode formar a seguinte)
+SEQUENCIAS_REMOVIDAS = ('\\c', '\\c\u200b', '\\u0301', '\\u0300')
+
+PADRAO_PARAGRAFOS = re.compile(r'\n\s*\n')
+
+
+def limpar_caracteres_agressivo(texto, preservar_paragrafos=False):
+    """
+    Limpeza mais robusta para conteúdo da web.
+    Cada etapa é um padrão pré-compilado e só roda quando o texto tem o que ela corrige.
+
+    preservar_paragrafos: limpa cada parágrafo (separados por linha em branco)
+    e mantém "\\n\\n" entre eles, em vez de juntar tudo numa linha
+    """
     if not texto:
         return ""
+
+    if preservar_paragrafos:
+        paragrafos = (limpar_caracteres_agressivo(p) for p in PADRAO_PARAGRAFOS.split(str(texto)))
+        return "\n\n".join(p for p in paragrafos if p)
     
     try:
        
-        texto = str(texto)
-        texto = html.unescape(texto)
-        
-        # Remove caracteres de controle (0x00-0x1F, 0x7F-0x9F) exceto tab, newline, return
-        texto = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', '', texto)
+        texto = html.unescape(str(texto))
         
-        # Remove zero-width spaces e outros caracteres invisíveis
-        texto = texto.replace('\u200b', '').replace('\ufeff', '')
+        texto = PADRAO_INVISIVEIS.sub('', texto)
         
-        # Corrige caracteres acentuados mal formatados
-        correcoes = {
-            'á': 'á', 'é': 'é', 'í': 'í', 'ó': 'ó', 'ú': 'ú',
-            'à': 'à', 'è': 'è', 'ì': 'ì', 'ò': 'ò', 'ù': 'ù', 
-            'ã': 'ã', 'ẽ': 'ẽ', 'ĩ': 'ĩ', 'õ': 'õ', 'ũ': 'ũ',
-            'â': 'â', 'ê': 'ê', 'î': 'î', 'ô': 'ô', 'û': 'û',
-            'ç': 'ç', 'ñ': 'ñ',
-            '\\c': '', '\\c​': '', '\\u0301': '', '\\u0300': ''
-        }
+        for acento, correcoes in CORRECOES_POR_ACENTO.items():
+            if acento in texto:
+                for erro, correcao in correcoes:
+                    texto = texto.replace(erro, correcao)
         
-        for erro, correcao in correcoes.items():
-            texto = texto.replace(erro, correcao)
+        if '\\' in texto:
+            for sequencia in SEQUENCIAS_REMOVIDAS:
+                texto = texto.replace(sequencia, '')
     
-        texto = re.sub(r'\s+', ' ', texto)
-        texto = texto.encode('utf-8', 'ignore').decode('utf-8')
+        # Mesmo resultado de re.sub(r'\s+', ' ', ...) seguido do strip final
+        texto = ' '.join(texto.split())
+        if not texto.isascii():
+            # Descarta surrogates soltos
+            texto = texto.encode('utf-8', 'ignore').decode('utf-8')
         
     except Exception as e:
         print(f"⚠️ Erro na limpeza: {e}")
@@ -45,16 +73,79 @@ def limpar_caracteres_agressivo(texto):
     return texto.strip()
 
 
-def atualizar_db_com_wp(url="https://neofeed.com.br/wp-json/wp/v2/posts", page="1"):
-    print(f"📡 Buscando posts em: {url}")
+def limpar_em_lote(textos, preservar_paragrafos=False):
+    """limpar_caracteres_agressivo aplicado a vários textos (ex: títulos, autores e corpos de um lote de posts)"""
+    limpar = limpar_caracteres_agressivo
+    return [limpar(texto, preservar_paragrafos) for texto in textos]
+
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Charset": "utf-8",
+    "Referer": "https://neofeed.com.br/",
+}
+
+WP_URL = "https://neofeed.com.br/wp-json/wp/v2/posts"
+WP_FIELDS = "id,date,modified,modified_gmt,title,content,link,yoast_head_json"
+
+# Extração do texto do HTML: "html.parser" (stdlib), "lxml" ou "auto"
+EXTRATOR_HTML = "html.parser"
+# Mantém os parágrafos do post ("\n\n"), usados pelo splitter na indexação
+PRESERVAR_PARAGRAFOS = True
+
+
+def processar_post(p):
+    """Converte um post da API do WordPress no formato da tabela artigos (None se inválido)"""
+    post_id = p.get("id")
+    if not post_id:
+        return None
+
+    data_publicacao = p.get("date", "")[:10]
+    conteudo_html = p.get("content", {}).get("rendered", "")
+
+    # Texto sem script/style/meta/link, lido em streaming (sem montar a árvore)
+    conteudo_bruto = extrair_texto(conteudo_html, paragrafos=PRESERVAR_PARAGRAFOS, backend=EXTRATOR_HTML)
+    conteudo_limpo = limpar_caracteres_agressivo(conteudo_bruto, preservar_paragrafos=PRESERVAR_PARAGRAFOS)
+    
+    titulo_html = p.get("title", {}).get("rendered", "")
+    titulo_limpo = limpar_caracteres_agressivo(titulo_html)
+
+    link = p.get("link", "").strip()
+
+    parsed = urlparse(link)
+    path_parts = parsed.path.strip("/").split("/")
+    post_category = path_parts[0]
+
+    categoria = post_category
+
+    autor = p.get("yoast_head_json", {}).get("author", "")
+    autor_limpo = limpar_caracteres_agressivo(autor)
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-        "Accept": "application/json, text/plain, */*",
-        "Accept-Charset": "utf-8",
-        "Referer": "https://neofeed.com.br/",
+    return {
+        "doc_id": f"artigo-{post_id}",
+        "titulo": titulo_limpo,
+        "conteudo": conteudo_limpo,
+        "categoria": categoria,
+        "autor": autor_limpo,
+        "data": data_publicacao,
+        "link": link,
+        "modified_gmt": p.get("modified_gmt") or None,
     }
 
+
+def filtrar_alterados(posts, arquivo_db="artigos.db"):
+    """Descarta posts cujo modified_gmt é igual ao que já está salvo"""
+    salvos = load_modificados([f"artigo-{p.get('id')}" for p in posts], arquivo_db=arquivo_db)
+    return [
+        p for p in posts
+        if not p.get("modified_gmt") or salvos.get(f"artigo-{p.get('id')}") != p.get("modified_gmt")
+    ]
+
+
+def atualizar_db_com_wp(url=WP_URL, page="1"):
+    print(f"📡 Buscando posts em: {url}")
+
     try:
         resp = requests.get(
             url,
@@ -63,7 +154,7 @@ def atualizar_db_com_wp(url="https://neofeed.com.br/wp-json/wp/v2/posts", page="
                 "page": page,
                 "_fields": "id,date,title,content,link,yoast_head_json"
             },
-            headers=headers,
+            headers=HEADERS,
             timeout=30
         )
         
@@ -85,57 +176,251 @@ def atualizar_db_com_wp(url="https://neofeed.com.br/wp-json/wp/v2/posts", page="
 
     novos = []
     for p in posts:
-        post_id = p.get("id")
-        if not post_id:
-            continue
+        post = processar_post(p)
+        if post:
+            print(post["data"])
+            novos.append(post)
 
-        
-        data_publicacao = p.get("date", "")[:10]
-        conteudo_html = p.get("content", {}).get("rendered", "")
+    if not novos:
+        print("Nenhum post válido encontrado após limpeza.")
+        return
+    try:
+        save(novos)
+        print(f"{len(novos)} posts SALVOS COM SUCESSO (limpos e validados)!")
+            
+    except Exception as e:
+        print(f"Erro ao salvar no banco: {e}")
 
-        print(data_publicacao)
 
-        soup = BeautifulSoup(conteudo_html, "html.parser")
-        
-        for script in soup(["script", "style", "meta", "link"]):
-            script.decompose()
-            
-        conteudo_bruto = soup.get_text(separator=" ", strip=True)
-        conteudo_limpo = limpar_caracteres_agressivo(conteudo_bruto)
-        
-        titulo_html = p.get("title", {}).get("rendered", "")
-        titulo_limpo = limpar_caracteres_agressivo(titulo_html)
+def criar_sessao(conexoes=16, tentativas=5, backoff=0.5):
+    """Session com pool de conexões e retry com backoff exponencial"""
+    retry = Retry(
+        total=tentativas,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True
+    )
+    adapter = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes, max_retries=retry)
 
-        link = p.get("link", "").strip()
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
 
-        parsed = urlparse(link)
-        path_parts = parsed.path.strip("/").split("/")
-        post_category = path_parts[0]
 
-        categoria = post_category
+def buscar_pagina(session, url, page, per_page=100, modified_after=None, timeout=30, extra_params=None):
+    """Retorna (posts, total_de_paginas) de uma página da API"""
+    params = {
+        "per_page": per_page,
+        "page": page,
+        "orderby": "id",
+        "order": "asc",
+        "_fields": WP_FIELDS
+    }
+    if modified_after:
+        params["modified_after"] = modified_after
+    if extra_params:
+        params.update(extra_params)
 
-        autor = p.get("yoast_head_json", {}).get("author", "")
-        autor_limpo = limpar_caracteres_agressivo(autor)
+    resp = session.get(url, params=params, timeout=timeout)
+    resp.encoding = 'utf-8'
 
-        novos.append({
-            "doc_id": f"artigo-{post_id}",
-            "titulo": titulo_limpo,
-            "conteudo": conteudo_limpo,
-            "categoria": categoria,
-            "autor": autor_limpo,
-            "data": data_publicacao,
-            "link": link,
-        })
+    # Página além do fim (o total mudou durante a execução)
+    if resp.status_code == 400 and "rest_post_invalid_page_number" in resp.text:
+        return [], page - 1
+    resp.raise_for_status()
 
-    if not novos:
-        print("Nenhum post válido encontrado após limpeza.")
+    total_paginas = int(resp.headers.get("X-WP-TotalPages", page))
+    return resp.json(), total_paginas
+
+
+def atualizar_db_completo(url=WP_URL, per_page=100, max_workers=8, processos=None,
+                          arquivo_db="artigos.db", session=None, recomecar=False):
+    """
+    Ingestão do arquivo inteiro do WordPress.
+
+    - páginas buscadas em paralelo (Session com pool + retry/backoff)
+    - limpeza do HTML num pool de processos
+    - checkpoint da última página concluída e do watermark `modified_after`
+      na tabela `estado`: uma execução interrompida continua de onde parou,
+      e a próxima execução completa só busca o que mudou desde a anterior
+    """
+    estado = {} if recomecar else get_estado("ingestao_wp", {}, arquivo_db=arquivo_db)
+
+    if estado.get("em_andamento"):
+        modified_after = estado.get("modified_after")
+        pagina_inicial = estado.get("pagina", 0) + 1
+        print(f"↩️ Retomando ingestão a partir da página {pagina_inicial}")
+    else:
+        modified_after = estado.get("watermark")
+        pagina_inicial = 1
+
+    watermark = estado.get("watermark_parcial") or modified_after
+    session = session or criar_sessao(conexoes=max_workers)
+
+    def checkpoint(pagina, em_andamento=True):
+        set_estado("ingestao_wp", {
+            "em_andamento": em_andamento,
+            "pagina": pagina,
+            "modified_after": modified_after,
+            "watermark": watermark if not em_andamento else estado.get("watermark"),
+            "watermark_parcial": watermark,
+        }, arquivo_db=arquivo_db)
+
+    try:
+        primeira, total_paginas = buscar_pagina(session, url, pagina_inicial, per_page, modified_after)
+    except requests.RequestException as e:
+        print(f"Erro na requisição: {e}")
         return
+
+    print(f"📡 {total_paginas} páginas de {per_page} posts (a partir da página {pagina_inicial})")
+
+    total_salvos = 0
+    concluidas = set()
+    ultima_contigua = pagina_inicial - 1
+
+    with ProcessPoolExecutor(max_workers=processos) as pool_limpeza, \
+            ThreadPoolExecutor(max_workers=max_workers) as pool_http:
+
+        futuros = {}
+        for pagina in range(pagina_inicial + 1, total_paginas + 1):
+            futuros[pool_http.submit(buscar_pagina, session, url, pagina, per_page, modified_after)] = pagina
+
+        def concluir(pagina, posts):
+            nonlocal total_salvos, ultima_contigua, watermark
+
+            # Posts que não mudaram não passam pela limpeza nem pelo banco
+            alterados = filtrar_alterados(posts, arquivo_db=arquivo_db)
+            novos = [post for post in pool_limpeza.map(processar_post, alterados, chunksize=8) if post]
+            if novos:
+                save(novos, arquivo_db=arquivo_db)
+                total_salvos += len(novos)
+
+            # `modified_after` compara com `modified` (horário do site), não com o GMT
+            modificados = [p.get("modified") for p in posts if p.get("modified")]
+            if modificados:
+                watermark = max([watermark or ""] + modificados)
+
+            # O checkpoint só avança pelas páginas concluídas em sequência
+            concluidas.add(pagina)
+            while ultima_contigua + 1 in concluidas:
+                ultima_contigua += 1
+            checkpoint(ultima_contigua)
+
+        concluir(pagina_inicial, primeira)
+
+        erros = 0
+        for futuro in as_completed(futuros):
+            pagina = futuros[futuro]
+            try:
+                posts, _ = futuro.result()
+            except requests.RequestException as e:
+                erros += 1
+                print(f"Erro na página {pagina}: {e}")
+                continue
+            concluir(pagina, posts)
+
+    if erros:
+        print(f"⚠️ {erros} páginas falharam; rode novamente para retomar a partir da página {ultima_contigua + 1}.")
+    else:
+        checkpoint(ultima_contigua, em_andamento=False)
+
+    print(f"{total_salvos} posts SALVOS COM SUCESSO (limpos e validados)!")
+    return total_salvos
+
+
+def sincronizar_delta(url=WP_URL, per_page=100, arquivo_db="artigos.db", session=None, reindexar=None):
+    """
+    Sincronização incremental, barata o bastante para rodar a cada poucos minutos.
+
+    1. lista só id/modified dos posts alterados desde o último watermark,
+       com requisição condicional (ETag / Last-Modified): 304 = nada mudou
+    2. compara o modified_gmt com o salvo e baixa o conteúdo completo só
+       dos posts que realmente mudaram (parâmetro `include`)
+    3. limpa, salva e devolve os doc_ids que o save() de fato alterou
+       (e chama `reindexar(doc_ids)`, se passado)
+
+    Os validadores (ETag / Last-Modified) são guardados com os parâmetros exatos da
+    listagem a que pertencem e só são enviados numa listagem com os mesmos
+    parâmetros: com outro watermark a URL é outra, e um 304 seria falso. Só são
+    guardados quando a listagem coube numa página (o validador cobre a página 1).
+    """
+    estado = get_estado("delta_wp", {}, arquivo_db=arquivo_db)
+    session = session or criar_sessao()
+
+    params = {
+        "per_page": per_page,
+        "orderby": "modified",
+        "order": "asc",
+        "_fields": "id,modified,modified_gmt"
+    }
+    if estado.get("watermark"):
+        params["modified_after"] = estado["watermark"]
+
+    params["page"] = 1
+
+    condicionais = {}
+    validadores = estado.get("validadores") or {}
+    if validadores.get("params") == params:
+        if validadores.get("etag"):
+            condicionais["If-None-Match"] = validadores["etag"]
+        if validadores.get("last_modified"):
+            condicionais["If-Modified-Since"] = validadores["last_modified"]
+
     try:
-        save(novos)
-        print(f"{len(novos)} posts SALVOS COM SUCESSO (limpos e validados)!")
-            
-    except Exception as e:
-        print(f"Erro ao salvar no banco: {e}")
+        resp = session.get(url, params=params, headers=condicionais, timeout=30)
+        if resp.status_code == 304:
+            print("Nenhuma alteração desde a última sincronização (304).")
+            return []
+        resp.raise_for_status()
+
+        listagem = resp.json()
+        total_paginas = int(resp.headers.get("X-WP-TotalPages", 1))
+        for pagina in range(2, total_paginas + 1):
+            extra = session.get(url, params={**params, "page": pagina}, timeout=30)
+            extra.raise_for_status()
+            listagem.extend(extra.json())
+    except requests.RequestException as e:
+        print(f"Erro na requisição: {e}")
+        return []
+
+    alterados = filtrar_alterados(listagem, arquivo_db=arquivo_db)
+    print(f"📡 {len(listagem)} posts listados, {len(alterados)} alterados.")
+
+    doc_ids = []
+    for i in range(0, len(alterados), per_page):
+        ids = [str(p["id"]) for p in alterados[i:i + per_page]]
+        try:
+            posts, _ = buscar_pagina(session, url, 1, per_page, extra_params={"include": ",".join(ids)})
+        except requests.RequestException as e:
+            # Watermark não avança: a próxima execução tenta de novo
+            print(f"Erro ao baixar posts alterados: {e}")
+            return doc_ids
+
+        novos = [post for post in map(processar_post, posts) if post]
+        if novos:
+            # Só o que o save() regravou: conteúdo idêntico não vai para a reindexação
+            doc_ids.extend(save(novos, arquivo_db=arquivo_db))
+
+    modificados = [p.get("modified") for p in listagem if p.get("modified")]
+    validadores = None
+    if total_paginas <= 1 and (resp.headers.get("ETag") or resp.headers.get("Last-Modified")):
+        validadores = {
+            "params": params,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+    set_estado("delta_wp", {
+        "watermark": max(modificados + [estado.get("watermark") or ""]) or None,
+        "validadores": validadores,
+    }, arquivo_db=arquivo_db)
+
+    if doc_ids and reindexar:
+        reindexar(doc_ids)
+    return doc_ids
+
 
 if __name__ == "__main__":
-    atualizar_db_com_wp()
\ No newline at end of file
+    atualizar_db_com_wp()
@@ -1,37 +1,21 @@
 import streamlit as st
-from langchain_core.documents import Document
-
-def load_documents_from_sql():
-    import sqlite3
-    conn = sqlite3.connect('artigos.db')
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT titulo, autor, categoria, data, link, conteudo, doc_id FROM artigos ORDER BY data DESC LIMIT 100")
-    rows = cursor.fetchall()
-    
-    documents = []
-    for row in rows:
-        titulo, autor, categoria, data, link, conteudo, doc_id = row
-
-        titulo = (titulo or "").replace('$', '\\$')
-        conteudo = (conteudo or "").replace('$', '\\$')
-
-        doc = Document(
-            page_content=conteudo,
-            metadata={
-                "titulo": titulo,
-                "autor": autor or "",
-                "categoria" : categoria or "", 
-                "data": data or "",
-                "link": link or "",
-                "doc_id": doc_id or "",
-                "doc_type": "artigo"
-            }
-        )
-        documents.append(doc)
-    
-    conn.close()
-    return documents
+
+import storage
+
+ARQUIVO_DB = "artigos.db"
+TAMANHOS_PAGINA = [20, 50, 100]
+
+
+# Caches chaveados pela versão dos dados: storage.save incrementa a versão,
+# então uma gravação invalida as páginas sem esperar TTL
+@st.cache_data(max_entries=256, show_spinner=False)
+def carregar_pagina(versao, limite, categoria, autor, apos):
+    return storage.listar_pagina(limite, categoria=categoria, autor=autor, apos=apos, arquivo_db=ARQUIVO_DB)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def carregar_filtros(versao):
+    return storage.listar_filtros(ARQUIVO_DB)
 
 
 # ---------------------
@@ -40,11 +24,37 @@ def load_documents_from_sql():
 
 st.title("Lista de Matérias")
 
-docs = load_documents_from_sql()
+versao = storage.versao_artigos(ARQUIVO_DB)
+filtros = carregar_filtros(versao)
+
+coluna_categoria, coluna_autor, coluna_tamanho = st.columns([2, 2, 1])
+categoria = coluna_categoria.selectbox("Categoria", [""] + filtros["categorias"], format_func=lambda c: c or "Todas")
+autor = coluna_autor.selectbox("Autor", [""] + filtros["autores"], format_func=lambda a: a or "Todos")
+limite = coluna_tamanho.selectbox("Por página", TAMANHOS_PAGINA)
+
+# Cursores das páginas já vistas (para voltar); mudar o filtro volta para a primeira
+consulta = (categoria, autor, limite)
+if st.session_state.get("lista_consulta") != consulta:
+    st.session_state.lista_consulta = consulta
+    st.session_state.lista_cursores = [None]
+
+cursores = st.session_state.lista_cursores
+artigos, proximo = carregar_pagina(versao, limite, categoria or None, autor or None, cursores[-1])
 
-# Se quiser só os títulos, um embaixo do outro:
-for doc in docs:
-    st.markdown(f"### {doc.metadata['titulo']}")
-    st.caption(f"Categoria: {doc.metadata['categoria']} | Autor: {doc.metadata['autor']} | Data: {doc.metadata['data']}")
+for artigo in artigos:
+    titulo = (artigo["titulo"] or "").replace('$', '\\$')
+    st.markdown(f"### {titulo}")
+    st.caption(f"Categoria: {artigo['categoria'] or ''} | Autor: {artigo['autor'] or ''} | Data: {artigo['data'] or ''}")
     st.divider()
 
+if not artigos:
+    st.info("Nenhuma matéria encontrada.")
+
+coluna_anterior, coluna_pagina, coluna_proxima = st.columns([1, 2, 1])
+if coluna_anterior.button("← Anteriores", disabled=len(cursores) == 1):
+    cursores.pop()
+    st.rerun()
+coluna_pagina.caption(f"Página {len(cursores)}")
+if coluna_proxima.button("Próximas →", disabled=proximo is None):
+    cursores.append(proximo)
+    st.rerun()
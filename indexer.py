@@ -0,0 +1,178 @@
+"""
+Indexador fora do processo do chat.
+
+    python indexer.py                  # fica consumindo a fila de indexação
+    python indexer.py --uma-vez        # processa o que estiver na fila e sai
+    python indexer.py --reconstruir    # reconstrói numa coleção sombra e troca no fim
+
+storage.save enfileira os doc_ids alterados (tabela fila_indexacao) na mesma
+transação da escrita. Um lease na tabela estado garante um único indexador por vez.
+O chat só lê a coleção ativa (rag.VectorstoreAtivo) e percebe sozinho as trocas.
+"""
+import argparse
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+
+import storage
+from rag import (
+    COLECAO, INDICE_LOCAL_DIR, VETOR_BACKEND,
+    abrirVectorstore, chaveHashes, contarVetores, getEmbeddings, indiceAtivo, reloadVetorDB
+)
+
+LEASE_NOME = "indexador"
+LEASE_SEGUNDOS = 60
+INTERVALO_FILA = 10
+LOTE_FILA = 200
+
+
+class Lease:
+    """Lease do indexador, renovado em segundo plano enquanto o trabalho roda"""
+
+    def __init__(self, nome=LEASE_NOME, duracao=LEASE_SEGUNDOS, arquivo_db="artigos.db"):
+        self.nome = nome
+        self.duracao = duracao
+        self.arquivo_db = arquivo_db
+        self.dono = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.perdido = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def adquirir(self):
+        if not storage.adquirir_lease(self.nome, self.dono, self.duracao, self.arquivo_db):
+            return False
+        self._thread = threading.Thread(target=self._renovar, daemon=True)
+        self._thread.start()
+        return True
+
+    def _renovar(self):
+        while not self._parar.wait(self.duracao / 3):
+            try:
+                renovado = storage.adquirir_lease(self.nome, self.dono, self.duracao, self.arquivo_db)
+            except Exception as e:
+                print(f"⚠️ Erro ao renovar o lease: {e}")
+                continue
+            if not renovado:
+                print("⚠️ Lease perdido para outro indexador.")
+                self.perdido.set()
+                return
+
+    def liberar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        storage.liberar_lease(self.nome, self.dono, self.arquivo_db)
+
+
+def publicar(colecao):
+    """Aponta o chat para `colecao` com uma versão nova (os leitores reabrem o índice)"""
+    atual = indiceAtivo()
+    storage.set_estado(f"indice_ativo_{VETOR_BACKEND}", {"colecao": colecao, "versao": atual["versao"] + 1})
+
+
+def remover_colecoes(manter, vectorstore):
+    """Apaga as coleções antigas do corpus (e os hashes delas), menos as de `manter`"""
+    if VETOR_BACKEND == "local":
+        nomes = os.listdir(INDICE_LOCAL_DIR) if os.path.isdir(INDICE_LOCAL_DIR) else []
+    else:
+        nomes = [colecao.name for colecao in vectorstore._client.list_collections()]
+
+    conn = storage.conectar()
+    for nome in nomes:
+        if not nome.startswith(COLECAO) or nome in manter:
+            continue
+        if VETOR_BACKEND == "local":
+            shutil.rmtree(os.path.join(INDICE_LOCAL_DIR, nome), ignore_errors=True)
+        else:
+            vectorstore._client.delete_collection(nome)
+        with conn:
+            conn.execute("DELETE FROM artigos_chunks WHERE colecao = ?", (chaveHashes(nome),))
+        print(f"🗑️ Coleção antiga removida: {nome}")
+    conn.close()
+
+
+def reconstruir(embeddings, lease):
+    """
+    Indexa o corpus inteiro numa coleção nova e só então troca a ativa.
+    O chat continua na coleção anterior durante toda a reconstrução.
+    """
+    anterior = indiceAtivo()["colecao"]
+    nova = f"{COLECAO}_{time.strftime('%Y%m%d%H%M%S')}"
+    inicio = time.time()
+    print(f"🏗️ Reconstruindo o índice em {nova}...")
+
+    vectorstore = reloadVetorDB(abrirVectorstore(embeddings, nova), colecao=nova)
+    if lease.perdido.is_set():
+        print("⚠️ Reconstrução descartada: lease perdido.")
+        return None
+
+    publicar(nova)
+    # O que entrou na fila antes do início já está na coleção nova
+    storage.limpar_fila(inicio)
+    print(f"✅ Coleção ativa: {nova} ({contarVetores(vectorstore)} vetores)")
+
+    # A anterior fica até a próxima reconstrução (leitores ainda podem estar nela)
+    remover_colecoes({nova, anterior}, vectorstore)
+    return vectorstore
+
+
+def processar_fila(embeddings, lease, vectorstore=None, lote=LOTE_FILA):
+    """
+    Indexa os doc_ids da fila na coleção ativa, em lotes. Retorna quantos processou.
+    Publica uma versão só no fim da passada: cada versão nova faz os leitores
+    reabrirem o índice, então uma fila grande não vira uma reabertura por lote.
+    """
+    total = 0
+    colecao = indiceAtivo()["colecao"]
+    try:
+        while not lease.perdido.is_set():
+            itens = storage.proximos_da_fila(lote)
+            if not itens:
+                break
+
+            if vectorstore is None:
+                vectorstore = abrirVectorstore(embeddings, colecao)
+            reloadVetorDB(vectorstore, doc_ids=[doc_id for doc_id, _ in itens], colecao=colecao)
+            storage.remover_da_fila(itens)
+            total += len(itens)
+    finally:
+        # O que já saiu da fila está nos vetores, mesmo se um lote depois falhar
+        if total:
+            publicar(colecao)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uma-vez", action="store_true", help="processa a fila e sai")
+    parser.add_argument("--reconstruir", action="store_true", help="reconstrói o índice numa coleção sombra")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_FILA, help="segundos entre leituras da fila")
+    args = parser.parse_args()
+
+    lease = Lease()
+    if not lease.adquirir():
+        print("⏳ Outro indexador já está rodando.")
+        return
+
+    try:
+        embeddings = getEmbeddings()
+        vectorstore = abrirVectorstore(embeddings)
+        if args.reconstruir or contarVetores(vectorstore) == 0:
+            vectorstore = reconstruir(embeddings, lease) or vectorstore
+
+        while not lease.perdido.is_set():
+            processados = processar_fila(embeddings, lease, vectorstore)
+            if processados:
+                print(f"📥 {processados} artigos indexados da fila.")
+            if args.uma_vez:
+                break
+            time.sleep(args.intervalo)
+    finally:
+        lease.liberar()
+
+
+if __name__ == "__main__":
+    main()
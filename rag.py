@@ -2,128 +2,396 @@ import streamlit as st
 # LangChain
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import RunnableMap, RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnableMap, RunnablePassthrough
 from langchain_community.vectorstores import Chroma
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
 from operator import itemgetter
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 
+import asyncio
+import logging
 import time
+import threading
 from datetime import datetime
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-OPENAI_API_KEY = st.secrets["openai"]["api_key"]
-if not OPENAI_API_KEY:
-    raise ValueError("A variável OPENAI_API_KEY não foi encontrada no .env!")
+CHROMA_DIR = "./chroma_db"
+COLECAO = "artigos_demo"
+
+# Backend dos vetores: "chroma" ou "local" (core/helpers/indiceLocal.py: numpy
+# mapeado em memória, float16/int8, pré-filtro por data e IVF acima de INDICE_LOCAL_LIMIAR_IVF)
+VETOR_BACKEND = "chroma"
+INDICE_LOCAL_DIR = "./indice_local"
+INDICE_LOCAL_QUANTIZACAO = "float16"
+INDICE_LOCAL_LIMIAR_IVF = 20000
+
+# Indexação fora do processo do chat (indexer.py consome a fila gravada por storage.save).
+# Índice vazio na subida dispara `indexer.py --uma-vez` em segundo plano; o chat
+# percebe a troca de coleção/vetores novos em até INDICE_VERIFICAR_SEGUNDOS
+INDEXADOR_AUTOMATICO = True
+INDICE_VERIFICAR_SEGUNDOS = 5
+EMBEDDINGS_CACHE_DB = "embeddings_cache.db"
+CHUNK_MAX_TOKENS = 256
+CHUNK_MIN_TOKENS = 48
+CONTEXTO_MAX_TOKENS = 3000
+CONTEXTO_VIZINHOS = 1
+
+# Agrupa os tokens do stream para renderizar suave sem atrasar a resposta
+# (0 = repassa cada token assim que chega)
+STREAM_INTERVALO_MS = 50
+STREAM_MAX_CHARS = 0
+
+# Histórico: sessões ociosas saem da memória; HISTORICO_DB = None desliga a persistência
+HISTORICO_TTL_OCIOSO = 3600
+HISTORICO_MAX_SESSOES = 2000
+HISTORICO_MAX_TOKENS = 1500
+HISTORICO_DB = "chat_historico.db"
+
+# Cache de respostas: pergunta normalizada + filtro de datas + artigos recuperados
+# (CACHE_LIMIAR_SIMILARIDADE = None aceita só a mesma pergunta normalizada)
+CACHE_RESPOSTAS = True
+CACHE_LIMIAR_SIMILARIDADE = 0.95
+CACHE_TTL = 6 * 3600
+CACHE_MAX_ENTRADAS = 5000
+
+# Pool de conexões HTTP com a OpenAI, compartilhado por todas as requisições
+OPENAI_MAX_CONEXOES = 100
+OPENAI_TIMEOUT = 60
+
+# Rastreamento por resposta (core/helpers/tracing.py): "json" = uma linha JSON por
+# resposta no logger neo.rastros; "prometheus" = p50/p95/p99 por etapa, em /metrics
+# na API ou em METRICAS_PORTA no app Streamlit (None = sem endpoint próprio)
+TRACING_SINKS = ["prometheus", "json"]
+TRACING_HISTORICO = 2000
+METRICAS_PORTA = None
+LOG_NIVEL = "INFO"
+
+from core.helpers.streamHelper import MetricasStream, coalescer
+from core.helpers.tracing import Rastro, configurar_sinks, coletor, etapa, marcar, rastro_atual, servir_metricas
+metricas_stream = MetricasStream()
+
+logger = logging.getLogger(__name__)
+
+
+def configurarLogging(nivel=None):
+    """Log do app no nível LOG_NIVEL; bibliotecas (httpx, chromadb...) só de WARNING para cima"""
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    for nome in ("rag", "api", "indexer", "storage", "core", "neo"):
+        logging.getLogger(nome).setLevel(nivel or LOG_NIVEL)
+
+def getApiKey():
+    # Variável de ambiente (API, scripts) ou secrets do Streamlit
+    chave = os.environ.get("OPENAI_API_KEY")
+    if not chave:
+        try:
+            chave = st.secrets["openai"]["api_key"]
+        except Exception:
+            chave = None
+    if not chave:
+        raise ValueError("A variável OPENAI_API_KEY não foi encontrada (.env ou .streamlit/secrets.toml)!")
+    return chave
+
+
+def clientesHttp():
+    # Um cliente síncrono (Streamlit) e um assíncrono (API), cada um com seu pool
+    import httpx
+    limites = httpx.Limits(max_connections=OPENAI_MAX_CONEXOES, max_keepalive_connections=OPENAI_MAX_CONEXOES)
+    return {
+        "http_client": httpx.Client(limits=limites, timeout=OPENAI_TIMEOUT),
+        "http_async_client": httpx.AsyncClient(limits=limites, timeout=OPENAI_TIMEOUT),
+    }
+
+
+def getEmbeddings():
+    # Mesmo cache para indexação e para as perguntas
+    from core.helpers.embeddingCache import CachedEmbeddings
+    return CachedEmbeddings(
+        OpenAIEmbeddings(api_key=getApiKey(), **clientesHttp()),
+        arquivo_db=EMBEDDINGS_CACHE_DB
+    )
 
-def load_documents_from_sql():
+def load_documents_from_sql(doc_ids=None):
 
-    import sqlite3
-    conn = sqlite3.connect('artigos.db')
+    from storage import conectar
+    conn = conectar('artigos.db')
     cursor = conn.cursor()
     
-    cursor.execute("SELECT titulo, categoria, autor, data, link, conteudo, doc_id FROM artigos")
-    rows = cursor.fetchall()
+    if doc_ids is None:
+        cursor.execute("SELECT titulo, categoria, autor, data, link, conteudo, doc_id FROM artigos")
+        rows = cursor.fetchall()
+    else:
+        doc_ids = list(doc_ids)
+        rows = []
+        for i in range(0, len(doc_ids), 500):
+            parte = doc_ids[i:i + 500]
+            marcadores = ",".join("?" * len(parte))
+            cursor.execute(
+                f"SELECT titulo, categoria, autor, data, link, conteudo, doc_id FROM artigos WHERE doc_id IN ({marcadores})",
+                parte
+            )
+            rows.extend(cursor.fetchall())
     
     documents = []
     for row in rows:
-        titulo, autor, categoria, data, link, conteudo, doc_id = row
+        titulo, categoria, autor, data, link, conteudo, doc_id = row
 
         titulo = titulo.replace('$', '\\$')
-        conteudo = conteudo.replace('$', '\\$')
+        conteudo = conteudo or ""
 
         from langchain_core.documents import Document
-        
+        from core.helpers.chatHelper import data_para_int
+
+        # page_content = só o corpo; título, data etc. vão uma vez, nos metadados.
+        # O corpo também não é repetido nos metadados: cada chunk guarda os offsets
+        # dentro de `conteudo`, e o texto completo é lido do SQLite quando preciso
         doc = Document(
-            page_content=f"""
-                Título: {titulo}
-                Categoria: {categoria}
-                Autor: {autor}
-                Data: {data}
-                Link: {link}
-
-                Conteúdo:
-                {conteudo}
-            """,
+            page_content=conteudo,
             metadata={
                 "titulo": titulo,
                 "autor": autor,
                 "categoria": categoria,
                 "data": data,
+                "data_int": data_para_int(data),
                 "link": link,
                 "doc_id": doc_id,
-                "doc_type": "artigo",
-                "conteudo": conteudo
+                "doc_type": "artigo"
             }
         )
 
-
         documents.append(doc)
     
     conn.close()
     return documents
 
 
-def reloadVetorDB():
+def indiceAtivo():
+    """Coleção que o chat consulta e sua versão; o indexador (indexer.py) troca/incrementa"""
+    from storage import get_estado
+    return get_estado(f"indice_ativo_{VETOR_BACKEND}", {"colecao": COLECAO, "versao": 0})
 
-    documents = load_documents_from_sql()
-    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=100,
-        separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
+
+def abrirVectorstore(embeddings, colecao=None):
+    """Vectorstore do backend configurado em VETOR_BACKEND (coleção ativa por padrão)"""
+    if colecao is None:
+        colecao = indiceAtivo()["colecao"]
+    if VETOR_BACKEND == "local":
+        from core.helpers.indiceLocal import IndiceLocal
+        return IndiceLocal(
+            os.path.join(INDICE_LOCAL_DIR, colecao),
+            embeddings,
+            quantizacao=INDICE_LOCAL_QUANTIZACAO,
+            limiar_ivf=INDICE_LOCAL_LIMIAR_IVF
+        )
+    return Chroma(
+        persist_directory=CHROMA_DIR,
+        embedding_function=embeddings,
+        collection_name=colecao
     )
-    
-    chunks = text_splitter.split_documents(documents)
-
-    for chunk in chunks:
-        chunk.metadata.update({
-            "doc_type": "artigo",
-            "titulo": chunk.metadata.get("titulo", ""),
-            "categoria": chunk.metadata.get("categoria", ""),
-            "data": chunk.metadata.get("data", ""),
-            "autor": chunk.metadata.get("autor", "")
-        })
-
-    embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
-
-    # Recria o Chroma
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        collection_name="artigos_demo",
-        embedding=embeddings,
-        persist_directory="./chroma_db"
+
+
+def soltarSistemaChroma(vectorstore):
+    """
+    Tira do cache do chromadb o System por trás de `vectorstore`, para o próximo
+    abrirVectorstore criar outro. O Chroma mantém o índice HNSW em memória por
+    processo: só um System novo enxerga o que o indexador gravou em outro processo.
+    O antigo continua atendendo quem já tem o vectorstore; retorna-o para ser parado
+    (System.stop) depois. No backend local não há nada a soltar.
+    """
+    if VETOR_BACKEND != "chroma" or vectorstore is None:
+        return None
+    from chromadb.api.shared_system_client import SharedSystemClient
+    return SharedSystemClient._identifier_to_system.pop(vectorstore._client._identifier, None)
+
+
+def chaveHashes(colecao):
+    # Hashes dos chunks separados por backend: trocar de backend reindexa do zero
+    return colecao if VETOR_BACKEND == "chroma" else f"{colecao}_local"
+
+
+def contarVetores(vectorstore):
+    if hasattr(vectorstore, "count"):
+        return vectorstore.count()
+    return vectorstore._collection.count()
+
+
+class VectorstoreAtivo:
+    """
+    Vectorstore da coleção ativa, que o indexador atualiza e troca em outro processo.
+    O estado é conferido no máximo a cada `intervalo` segundos, numa thread: a
+    requisição que encontra o estado vencido dispara a conferência e segue com o
+    vectorstore atual, sem esperar a reabertura. A busca nunca espera indexação: sem
+    índice (vazio ou com erro) ela devolve vazio e o lexical segue.
+    """
+
+    def __init__(self, embeddings, intervalo=INDICE_VERIFICAR_SEGUNDOS):
+        self.embeddings = embeddings
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._ativo = None
+        self._verificado_em = None
+        self._verificando = False
+        # System do Chroma substituído: buscas em andamento ainda podem usá-lo,
+        # então é parado só na conferência seguinte
+        self._aposentado = None
+
+    def atual(self):
+        if self._verificado_em is None:
+            # Primeira abertura (na subida do engine): síncrona
+            with self._lock:
+                if self._verificado_em is None:
+                    self._verificar()
+        elif time.monotonic() - self._verificado_em >= self.intervalo and not self._verificando:
+            with self._lock:
+                if not self._verificando:
+                    self._verificando = True
+                    threading.Thread(target=self._verificar, daemon=True).start()
+        ativo = self._ativo
+        return ativo[1] if ativo else None
+
+    def _verificar(self):
+        try:
+            self._verificado_em = time.monotonic()
+            self._parar_aposentado()
+
+            estado = indiceAtivo()
+            if self._ativo is not None and estado == self._ativo[0]:
+                return
+
+            sistema = soltarSistemaChroma(self._ativo[1] if self._ativo else None)
+            try:
+                vectorstore = abrirVectorstore(self.embeddings, estado["colecao"])
+            except Exception:
+                if sistema is not None:
+                    # Segue no System anterior (e com ele no cache) até a próxima tentativa
+                    from chromadb.api.shared_system_client import SharedSystemClient
+                    SharedSystemClient._identifier_to_system.setdefault(self._ativo[1]._client._identifier, sistema)
+                raise
+            self._ativo = (estado, vectorstore)
+            self._aposentado = sistema
+        except Exception as e:
+            logger.warning("Índice vetorial indisponível: %s", e)
+        finally:
+            self._verificando = False
+
+    def _parar_aposentado(self):
+        sistema, self._aposentado = self._aposentado, None
+        if sistema is not None:
+            try:
+                sistema.stop()
+            except Exception as e:
+                logger.warning("Falha ao parar o System antigo do Chroma: %s", e)
+
+    def count(self):
+        vectorstore = self.atual()
+        return contarVetores(vectorstore) if vectorstore is not None else 0
+
+    def similarity_search_with_relevance_scores(self, *args, **kwargs):
+        vectorstore = self.atual()
+        if vectorstore is None:
+            return []
+        return vectorstore.similarity_search_with_relevance_scores(*args, **kwargs)
+
+    def __getattr__(self, nome):
+        return getattr(self.atual(), nome)
+
+
+def dispararIndexador():
+    """Roda `indexer.py --uma-vez` em outro processo (o lease impede dois ao mesmo tempo)"""
+    import subprocess
+    caminho = os.path.join(os.path.dirname(os.path.abspath(__file__)), "indexer.py")
+    subprocess.Popen([sys.executable, caminho, "--uma-vez"], start_new_session=True)
+    logger.info("Índice vetorial vazio: indexador iniciado em segundo plano.")
+
+
+def reloadVetorDB(vectorstore=None, doc_ids=None, embeddings=None, colecao=None):
+    """
+    Sincroniza a coleção com o artigos.db (só os doc_ids pedidos, ou o corpus todo).
+    Roda no indexador (indexer.py), nunca no caminho do chat.
+    """
+    if colecao is None:
+        colecao = indiceAtivo()["colecao"]
+
+    if vectorstore is None:
+        if embeddings is None:
+            embeddings = getEmbeddings()
+        vectorstore = abrirVectorstore(embeddings, colecao)
+
+    # Coleção vazia, ou com vetores mas sem hashes (indexada antes da sincronização
+    # por hash: ids UUID, sem data_int): reindexa o corpus todo do zero
+    from core.helpers.indexSync import sincronizar_chunks, tem_hashes
+    reset = contarVetores(vectorstore) == 0 or not tem_hashes(chaveHashes(colecao))
+    if reset:
+        doc_ids = None
+
+    documents = load_documents_from_sql(doc_ids)
+
+    # Chunks por parágrafo/frase, medidos em tokens
+    from core.helpers.chunker import dividir_documentos
+    chunks = dividir_documentos(documents, max_tokens=CHUNK_MAX_TOKENS, min_tokens=CHUNK_MIN_TOKENS)
+
+    # Sincroniza só o que mudou (hash por chunk salvo em artigos.db)
+    relatorio = sincronizar_chunks(
+        vectorstore,
+        chunks,
+        colecao=chaveHashes(colecao),
+        doc_ids=doc_ids,
+        reset=reset
+    )
+    print(
+        f"Vetores sincronizados: {relatorio['adicionados']} adicionados, "
+        f"{relatorio['atualizados']} atualizados, {relatorio['removidos']} removidos, "
+        f"{relatorio['inalterados']} inalterados."
     )
     
     return vectorstore
 
 
-#@st.cache_resource(show_spinner="Iniciando o Chat...")
-def initRag():
+_engine = None
+_engine_lock = threading.Lock()
 
-    embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
+def getEngine():
+    """
+    Chain e histórico compartilhados por todas as sessões e threads do processo.
+    Vectorstore, clientes HTTP e prompt são carregados uma única vez.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = initRag()
+                if METRICAS_PORTA:
+                    servir_metricas(METRICAS_PORTA)
+    return _engine
 
-    try:
 
-        vectorstore = Chroma(
-            persist_directory="./chroma_db",
-            embedding_function=embeddings,
-            collection_name="artigos_demo"
-        )
-        
-        doc_count = vectorstore._collection.count()
-        
-        if doc_count == 0:
-            vectorstore = reloadVetorDB()
-        
-    except Exception as e:
-        vectorstore = reloadVetorDB()
+def getSessionId():
+    # Só o id (e as mensagens exibidas) ficam na sessão do Streamlit
+    if 'chat_session_id' not in st.session_state:
+        from core.helpers.sessionStore import SessionStore
+        st.session_state.chat_session_id = SessionStore.novo_session_id()
+    return st.session_state.chat_session_id
+
+
+def initRag(llm=None, embeddings=None):
+    """
+    Monta o engine. llm/embeddings podem ser injetados (ex: modelos falsos em testes);
+    por padrão, gpt-4o-mini e OpenAIEmbeddings com cache.
+    """
+
+    configurarLogging()
+    configurar_sinks(TRACING_SINKS, historico=TRACING_HISTORICO)
+
+    if embeddings is None:
+        embeddings = getEmbeddings()
+
+    # Só leitura: quem indexa é o indexer.py, em outro processo
+    vectorstore = VectorstoreAtivo(embeddings)
+    if INDEXADOR_AUTOMATICO and contarVetores(vectorstore) == 0:
+        dispararIndexador()
 
     def getPrompt(caminho="promptContextual.txt"):
         with open(caminho, "r", encoding="utf-8") as f:
@@ -137,70 +405,80 @@ def initRag():
         ("human", "{input}")
     ])
 
-    llm = ChatOpenAI(
-        api_key=OPENAI_API_KEY,
-        temperature=0.1,
-        model="gpt-4o-mini",
-        streaming=True
+    if llm is None:
+        llm = ChatOpenAI(
+            api_key=getApiKey(),
+            temperature=0.1,
+            model="gpt-4o-mini",
+            streaming=True,
+            **clientesHttp()
+        )
+
+    from core.helpers.contextBuilder import ConstrutorContexto, contar_tokens
+    construtor_contexto = ConstrutorContexto(
+        orcamento_tokens=CONTEXTO_MAX_TOKENS,
+        vizinhos=CONTEXTO_VIZINHOS,
+        # Tamanho médio de um chunk em caracteres (~4 por token)
+        tamanho_chunk=CHUNK_MAX_TOKENS * 4
     )
 
     def format_docs(docs):
-        formatted = []        
-        for doc in docs:
-            link = doc.metadata.get('link', '')
-            if any(proibido in link for proibido in ['/brand-stories/', '/apresentado-por-']):
-                continue
-                
-            doc_info = []
-            
-            # Título
-            if doc.metadata.get('titulo'):
-                doc_info.append(f"Título: {doc.metadata['titulo']}")
-            
-            # Conteúdo
-            doc_info.append(f"Conteúdo: {doc.metadata['conteudo']}")
-            
-            # Metadados
-            if doc.metadata.get('categoria'):
-                doc_info.append(f"Categoria: {doc.metadata['categoria']}")
-            if doc.metadata.get('link'):
-                doc_info.append(f"Link: {doc.metadata['link']}")
-            if doc.metadata.get('data'):
-                doc_info.append(f"Data: {doc.metadata['data']}")
-            if doc.metadata.get('autor'):
-                doc_info.append(f"Autor: {doc.metadata['autor']}")
-            
-            formatted.append("\n".join(doc_info))
-        
-        return "\n\n---\n\n".join(formatted)
+        with etapa("format_docs"):
+            docs = [
+                doc for doc in docs
+                if not any(proibido in doc.metadata.get('link', '') for proibido in ['/brand-stories/', '/apresentado-por-'])
+            ]
 
-    if "data_hoje" not in st.session_state:
-        st.session_state.data_hoje = datetime.now().strftime("%Y-%m-%d")
-    
-    data_hoje = st.session_state.data_hoje
+            # Corpo completo lido do SQLite só agora (não fica duplicado nos chunks)
+            from storage import load_conteudos
+            conteudos = load_conteudos([doc.metadata.get('doc_id') for doc in docs])
+
+            return construtor_contexto.montar(docs, conteudos)
 
     from core.helpers.chatHelper import customRetrievel
+    from core.helpers.sessionStore import janela_historico
     retriever_com_filtro = customRetrievel(vectorstore, k=3)
 
+    def buscar_contexto(x):
+        # Quem já recuperou os documentos (ex: para consultar o cache) passa em "docs"
+        docs = x.get("docs")
+        if docs is None:
+            docs = retriever_com_filtro.invoke(x["input"])
+        return format_docs(docs)
+
     retrieval_chain = {
         "input": itemgetter("input"),
-        "history": itemgetter("history"),
-        "data_atual": lambda x: data_hoje
+        "docs": lambda x: x.get("docs"),
+        # Só as últimas mensagens que cabem no orçamento vão para o prompt
+        "history": lambda x: janela_historico(x["history"], HISTORICO_MAX_TOKENS),
+        "data_atual": lambda x: datetime.now().strftime("%Y-%m-%d")
     } | RunnablePassthrough.assign(
-        context=itemgetter("input") | retriever_com_filtro | format_docs
+        context=buscar_contexto
     )
 
-    rag_chain = retrieval_chain | prompt | llm
+    def montar_prompt(x):
+        with etapa("prompt"):
+            mensagens = prompt.invoke(x)
+        # Tokens só contados quando há rastro (a contagem custa ~1 ms)
+        if rastro_atual() is not None:
+            marcar(tokens_prompt=sum(contar_tokens(str(m.content)) for m in mensagens.to_messages()))
+        return mensagens
+
+    rag_chain = retrieval_chain | RunnableLambda(montar_prompt) | llm
+
+    from core.helpers.sessionStore import SessionStore
+    store = SessionStore(
+        ttl_ocioso=HISTORICO_TTL_OCIOSO,
+        max_sessoes=HISTORICO_MAX_SESSOES,
+        arquivo_db=HISTORICO_DB,
+        mensagem_inicial=(
+            "Olá! sou o NEO, o assistente conversacional do portal NeoFeed"
+            "Posso ajudar você a encontrar informações sobre matérias disponíveis no NeoFeed."
+        )
+    )
 
-    store = {}
     def get_session_history(session_id: str) -> BaseChatMessageHistory:
-        if session_id not in store:
-            store[session_id] = ChatMessageHistory()
-            store[session_id].add_ai_message(
-                "Olá! sou o NEO, o assistente conversacional do portal NeoFeed"
-                "Posso ajudar você a encontrar informações sobre matérias disponíveis no NeoFeed."
-            )
-        return store[session_id]
+        return store.get(session_id)
 
     chain_with_history = RunnableWithMessageHistory(
         rag_chain,
@@ -209,51 +487,191 @@ def initRag():
         history_messages_key="history"
     )
 
-    return chain_with_history, get_session_history
-def chatMessage(pergunta):
-    
-    chain = st.session_state.chain
-    get_session_history = st.session_state.get_session_history
+    cache_respostas = None
+    if CACHE_RESPOSTAS:
+        from core.helpers.answerCache import CacheRespostas
+        cache_respostas = CacheRespostas(
+            embeddings=embeddings,
+            limiar_similaridade=CACHE_LIMIAR_SIMILARIDADE,
+            ttl=CACHE_TTL,
+            max_entradas=CACHE_MAX_ENTRADAS
+        )
 
-    if 'chat_session_id' not in st.session_state:
-        st.session_state.chat_session_id = f"session_{int(time.time())}"
-    
-    session_id = st.session_state.chat_session_id
+    return RagEngine(chain_with_history, get_session_history, retriever_com_filtro,
+                     cache_respostas, embeddings=embeddings, vectorstore=vectorstore)
+
+
+class RagEngine:
+    """
+    Chain, histórico, retriever e cache de respostas montados por initRag.
+    Não depende do Streamlit: serve o app (responder) e a API (aresponder).
+    """
+
+    def __init__(self, chain, get_session_history, retriever, cache_respostas=None,
+                 embeddings=None, vectorstore=None):
+        self.chain = chain
+        self.get_session_history = get_session_history
+        self.retriever = retriever
+        self.cache_respostas = cache_respostas
+        self.embeddings = embeddings
+        self.vectorstore = vectorstore
+
+    def _consultar_cache(self, pergunta, docs, historico):
+        """(chave do cache ou None, resposta guardada ou None)"""
+        # Só perguntas sem conversa anterior: uma continuação ("e a outra?") depende do histórico
+        if self.cache_respostas is None or any(m.type == "human" for m in historico.messages):
+            return None, None
+
+        from core.helpers.chatHelper import detectar_filtro_data
+        chave = (pergunta, detectar_filtro_data(pergunta), [doc.metadata.get("doc_id", "") for doc in docs])
+        resposta = self.cache_respostas.buscar(*chave)
+        if resposta is not None:
+            historico.add_user_message(pergunta)
+            historico.add_ai_message(resposta)
+        return chave, resposta
+
+    def _registrar_resposta(self, rastro, partes, inicio_stream=None):
+        from core.helpers.contextBuilder import contar_tokens
+        if inicio_stream is not None:
+            rastro.registrar_etapa("stream", time.perf_counter() - inicio_stream)
+        rastro.marcar(tokens_resposta=contar_tokens("".join(partes)))
+
+    def responder(self, pergunta, session_id):
+        """
+        Texto da resposta em pedaços, na ordem do stream do modelo.
+        Acertos do cache saem de uma vez, sem chamar o modelo.
+        """
+        rastro = Rastro("chat", sessao=session_id)
+        try:
+            with rastro.ativo():
+                with etapa("historico"):
+                    historico = self.get_session_history(session_id)
+                with etapa("recuperacao"):
+                    docs = self.retriever.invoke(pergunta)
+                with etapa("cache_respostas"):
+                    chave, resposta = self._consultar_cache(pergunta, docs, historico)
+
+            rastro.marcar(cache_respostas=resposta is not None)
+            if resposta is not None:
+                rastro.registrar_etapa("primeiro_token", rastro.desde_inicio())
+                self._registrar_resposta(rastro, [resposta])
+                yield resposta
+                return
+
+            # Pergunta e resposta entram no histórico pelo RunnableWithMessageHistory
+            inicio_stream = time.perf_counter()
+            response = self.chain.stream(
+                {"input": pergunta, "docs": docs},
+                config={"configurable": {"session_id": session_id}}
+            )
 
-    history = get_session_history(session_id)
+            partes = []
+            for chunk in rastro.acompanhar(response):
+                texto = getattr(chunk, "content", "")
+                if texto:
+                    if not partes:
+                        rastro.registrar_etapa("primeiro_token", rastro.desde_inicio())
+                    partes.append(texto)
+                    yield texto
+            self._registrar_resposta(rastro, partes, inicio_stream)
+
+            if chave is not None:
+                self.cache_respostas.salvar(*chave, "".join(partes))
+        except GeneratorExit:
+            rastro.marcar(interrompida=True)
+            raise
+        except Exception as e:
+            rastro.marcar(erro=type(e).__name__)
+            raise
+        finally:
+            rastro.finalizar()
+
+    async def aresponder(self, pergunta, session_id):
+        """Versão assíncrona de responder: o modelo é chamado pelo cliente HTTP assíncrono"""
+        from core.helpers.embeddingCache import CachedEmbeddings
+        rastro = Rastro("chat", sessao=session_id)
+        try:
+            # asyncio.to_thread e o executor do LangChain copiam o contexto: as etapas
+            # medidas nas threads entram no rastro
+            with rastro.ativo():
+                if isinstance(self.embeddings, CachedEmbeddings):
+                    # Embedding da pergunta pela API assíncrona; a busca (síncrona) já o encontra no cache
+                    await self.embeddings.aembed_query(pergunta)
+
+                # Busca, SQLite e cache rodam no pool de threads, sem travar o event loop
+                with etapa("historico"):
+                    historico = await asyncio.to_thread(self.get_session_history, session_id)
+                with etapa("recuperacao"):
+                    docs = await self.retriever.ainvoke(pergunta)
+                with etapa("cache_respostas"):
+                    chave, resposta = await asyncio.to_thread(self._consultar_cache, pergunta, docs, historico)
+
+            rastro.marcar(cache_respostas=resposta is not None)
+            if resposta is not None:
+                rastro.registrar_etapa("primeiro_token", rastro.desde_inicio())
+                self._registrar_resposta(rastro, [resposta])
+                yield resposta
+                return
+
+            inicio_stream = time.perf_counter()
+            partes = []
+            async for chunk in rastro.aacompanhar(self.chain.astream(
+                {"input": pergunta, "docs": docs},
+                config={"configurable": {"session_id": session_id}}
+            )):
+                texto = getattr(chunk, "content", "")
+                if texto:
+                    if not partes:
+                        rastro.registrar_etapa("primeiro_token", rastro.desde_inicio())
+                    partes.append(texto)
+                    yield texto
+            self._registrar_resposta(rastro, partes, inicio_stream)
+
+            if chave is not None:
+                await asyncio.to_thread(self.cache_respostas.salvar, *chave, "".join(partes))
+        except GeneratorExit:
+            rastro.marcar(interrompida=True)
+            raise
+        except Exception as e:
+            rastro.marcar(erro=type(e).__name__)
+            raise
+        finally:
+            rastro.finalizar()
+
+    def metricas(self):
+        sink = coletor.prometheus()
+        return {
+            "stream": metricas_stream.resumo(),
+            "etapas": sink.resumo() if sink else None,
+            "cache_respostas": self.cache_respostas.stats() if self.cache_respostas else None,
+        }
+
+
+def textosDoStream(response):
+    for chunk in response:
+        if hasattr(chunk, 'content'):
+            yield chunk.content.replace("$", "\\$")
+
+
+def chatMessage(pergunta, session_id=None):
+    """Resposta em stream para o st.write_stream (session_id fixo: uso fora do Streamlit, ex: teste de carga)"""
     
+    engine = getEngine()
+    session_id = session_id or getSessionId()
+
     try:
 
         if not pergunta.strip():
             yield "Por favor, faça uma pergunta sobre as matérias disponíveis no Neofeed."
             return
         
-        history.add_user_message(pergunta)
         resposta_final = ""
 
-        #retriever = st.session_state.retriever
-        #from core.helpers.chatHelper import buscar_docs
-        
-        # Buscar documentos formatados
-        #contexto = buscar_docs(pergunta, retriever)  # Isso já retorna texto formatado
-        #print(contexto)
-        # Stream com a pergunta original E o contexto
-        response = chain.stream(
-            {
-               "input": pergunta,
-            },
-            config={"configurable": {"session_id": session_id}}
-        )
-        
-        for chunk in response:
-            if hasattr(chunk, 'content'):
-                texto = chunk.content.replace("$", "\\$")
-                resposta_final += texto
-                time.sleep(0.08)
-                yield texto
-
-        if resposta_final.strip():
-            history.add_ai_message(resposta_final)
+        textos = (texto.replace("$", "\\$") for texto in engine.responder(pergunta, session_id))
+
+        for texto in coalescer(textos, STREAM_INTERVALO_MS, STREAM_MAX_CHARS, metricas_stream):
+            resposta_final += texto
+            yield texto
                 
     except Exception as e:
         yield "Desculpe, ocorreu um erro ao processar sua pergunta. Tente novamente."
@@ -261,23 +679,16 @@ def chatMessage(pergunta):
         
 def chatMessages(pergunta):
     
-    chain = st.session_state.chain
-    get_session_history = st.session_state.get_session_history
+    chain = getEngine().chain
+    session_id = getSessionId()
 
-    if 'chat_session_id' not in st.session_state:
-        st.session_state.chat_session_id = f"session_{int(time.time())}"
-    
-    session_id = st.session_state.chat_session_id
-
-    history = get_session_history(session_id)
-    
     try:
 
         if not pergunta.strip():
             yield "Por favor, faça uma pergunta sobre as matérias disponíveis no Neofeed."
             return
         
-        history.add_user_message(pergunta)
+        # Pergunta e resposta entram no histórico pelo RunnableWithMessageHistory
         resposta_final = ""
 
         retriever = st.session_state.retriever
@@ -291,17 +702,9 @@ def chatMessages(pergunta):
             config={"configurable": {"session_id": session_id}}
         )
         
-        for chunk in response:
-            if hasattr(chunk, 'content'):
-                texto = chunk.content.replace("$", "\\$")
-                resposta_final += texto
-                time.sleep(0.08)
-                yield texto
-
-               
-
-        if resposta_final.strip():
-            history.add_ai_message(resposta_final)
+        for texto in coalescer(textosDoStream(response), STREAM_INTERVALO_MS, STREAM_MAX_CHARS, metricas_stream):
+            resposta_final += texto
+            yield texto
                 
     except Exception as e:
         yield "Desculpe, ocorreu um erro ao processar sua pergunta. Tente novamente."
@@ -1,71 +1,554 @@
 import sqlite3
 import pandas as pd
 import os
+import re
+import json
+import threading
+import time
 
-def save(posts, arquivo_db="artigos.db"):
-    conn = sqlite3.connect(arquivo_db)
-    cursor = conn.cursor()
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "do", "da", "dos", "das",
+    "em", "no", "na", "nos", "nas", "por", "para", "pra", "com", "sem", "sobre", "e",
+    "ou", "que", "qual", "quais", "quem", "como", "quando", "onde", "se", "me", "eu",
+    "voce", "você", "ao", "aos", "à", "às", "é", "foi", "ser", "tem", "há", "mais",
+    "materia", "matéria", "materias", "matérias", "noticia", "notícia", "noticias",
+    "notícias", "artigo", "artigos", "fale", "falar", "diga", "saber", "quero"
+}
 
-    try:
-        cursor.execute("ALTER TABLE artigos ADD COLUMN categoria TEXT")
-    except sqlite3.OperationalError:
-        # coluna já existe
-        pass
+COLUNAS_ARTIGO = ["doc_id", "titulo", "conteudo", "categoria", "autor", "data", "link", "modified_gmt"]
+
+# `id` é o rowid explícito: não muda num VACUUM (o índice FTS aponta para ele)
+SCHEMA_ARTIGOS = """(
+    id INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL UNIQUE,
+    titulo TEXT,
+    conteudo TEXT,
+    categoria TEXT,
+    autor TEXT,
+    data TEXT,
+    link TEXT,
+    modified_gmt TEXT,
+    atualizado_em REAL
+)"""
+
+# Consultas quentes de listagem (verificadas por verificar_planos)
+SQL_ULTIMOS_ARTIGOS = (
+    "SELECT doc_id, titulo, categoria, data, link, conteudo, autor "
+    "FROM artigos ORDER BY data DESC LIMIT ?"
+)
+SQL_ULTIMOS_POR_CATEGORIA = (
+    "SELECT doc_id, titulo, categoria, data, link, autor "
+    "FROM artigos WHERE categoria = ? ORDER BY data DESC LIMIT ?"
+)
+
+SQL_ULTIMOS_RESUMO = (
+    "SELECT doc_id, titulo, categoria, data, link, autor "
+    "FROM artigos ORDER BY data DESC LIMIT ?"
+)
+
+# Paginação por chave (data, doc_id): cada página lê só `limite` entradas do índice,
+# em qualquer profundidade do arquivo (sem OFFSET)
+COLUNAS_RESUMO = ["doc_id", "titulo", "categoria", "data", "link", "autor"]
+SQL_CATEGORIAS = "SELECT DISTINCT categoria FROM artigos WHERE categoria IS NOT NULL ORDER BY categoria"
+SQL_AUTORES = "SELECT DISTINCT autor FROM artigos WHERE autor IS NOT NULL ORDER BY autor"
+
+# Versão dos dados (tabela estado), incrementada a cada gravação; chave dos caches de listagem
+CHAVE_VERSAO = "versao_artigos"
+
+
+def sql_pagina(categoria=False, autor=False, cursor=False):
+    """SELECT de uma página, com os filtros pedidos (os valores vão como parâmetros)"""
+    condicoes = []
+    if categoria:
+        condicoes.append("categoria = ?")
+    if autor:
+        condicoes.append("autor = ?")
+    if cursor:
+        condicoes.append("(data, doc_id) < (?, ?)")
+    where = f"WHERE {' AND '.join(condicoes)} " if condicoes else ""
+    return (
+        f"SELECT {', '.join(COLUNAS_RESUMO)} FROM artigos {where}"
+        f"ORDER BY data DESC, doc_id DESC LIMIT ?"
+    )
+
+_migrados = set()
+_migracao_lock = threading.Lock()
+
+
+def migrar(conn, arquivo_db="artigos.db"):
+    """Cria/atualiza o schema. Roda uma vez por banco em cada processo."""
+    if arquivo_db in _migrados:
+        return
+
+    with _migracao_lock:
+        if arquivo_db in _migrados:
+            return
+
+        cursor = conn.cursor()
+
+        # WAL: leitores (Streamlit/RAG) não ficam bloqueados durante as escritas
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS artigos {SCHEMA_ARTIGOS}")
+
+        # Bancos antigos, criados antes dessas colunas
+        existentes = {row[1] for row in cursor.execute("PRAGMA table_info(artigos)")}
+        for coluna in ("categoria", "modified_gmt"):
+            if coluna not in existentes:
+                cursor.execute(f"ALTER TABLE artigos ADD COLUMN {coluna} TEXT")
+        # Quando a linha foi gravada/alterada pela última vez (invalida o cache de respostas)
+        if "atualizado_em" not in existentes:
+            cursor.execute("ALTER TABLE artigos ADD COLUMN atualizado_em REAL")
+
+        # Bancos antigos tinham só o rowid implícito, que um VACUUM pode renumerar e
+        # desalinhar do índice FTS. Recria a tabela com `id` (rowid estável) e o FTS junto
+        if "id" not in existentes:
+            colunas = ", ".join(COLUNAS_ARTIGO + ["atualizado_em"])
+            cursor.executescript(f"""
+                BEGIN;
+                CREATE TABLE artigos_novo {SCHEMA_ARTIGOS};
+                INSERT INTO artigos_novo (id, {colunas}) SELECT rowid, {colunas} FROM artigos;
+                DROP TABLE artigos;
+                ALTER TABLE artigos_novo RENAME TO artigos;
+                DROP TABLE IF EXISTS artigos_fts;
+                COMMIT;
+            """)
+
+        # Índices de listagem: cobrem as colunas exibidas (tudo menos o corpo),
+        # então "últimas matérias" lê só `limite` entradas do índice, sem ordenar a tabela
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artigos_data
+            ON artigos(data, doc_id, titulo, categoria, autor, link)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artigos_categoria_data
+            ON artigos(categoria, data, doc_id, titulo, autor, link)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artigos_autor_data
+            ON artigos(autor, data, doc_id, titulo, categoria, link)
+        """)
+
+        cursor.execute("CREATE TABLE IF NOT EXISTS estado (chave TEXT PRIMARY KEY, valor TEXT)")
+
+        # Fila do indexador (indexer.py): doc_ids gravados e ainda não indexados
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS fila_indexacao (
+                doc_id TEXT PRIMARY KEY,
+                enfileirado_em REAL NOT NULL
+            )
+        """)
+        criar_fts(cursor)
+
+        conn.commit()
+        _migrados.add(arquivo_db)
+
+
+def conectar(arquivo_db="artigos.db"):
+    """Conexão com os pragmas de desempenho e o schema garantido"""
+    conn = sqlite3.connect(arquivo_db, timeout=30)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    migrar(conn, arquivo_db)
+    return conn
+
+
+def criar_fts(cursor):
+    """Índice FTS5 (BM25) sobre titulo/conteudo/autor/categoria, mantido por triggers"""
+    existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='artigos_fts'"
+    ).fetchone()
 
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS artigos (
-            doc_id TEXT PRIMARY KEY,
-            titulo TEXT,
-            conteudo TEXT,
-            categoria TEXT,
-            autor TEXT,
-            data TEXT,
-            link TEXT
+        CREATE VIRTUAL TABLE IF NOT EXISTS artigos_fts USING fts5(
+            titulo, conteudo, autor, categoria,
+            content='artigos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
         )
     """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS artigos_fts_ai AFTER INSERT ON artigos BEGIN
+            INSERT INTO artigos_fts(rowid, titulo, conteudo, autor, categoria)
+            VALUES (new.id, new.titulo, new.conteudo, new.autor, new.categoria);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS artigos_fts_ad AFTER DELETE ON artigos BEGIN
+            INSERT INTO artigos_fts(artigos_fts, rowid, titulo, conteudo, autor, categoria)
+            VALUES ('delete', old.id, old.titulo, old.conteudo, old.autor, old.categoria);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS artigos_fts_au AFTER UPDATE ON artigos BEGIN
+            INSERT INTO artigos_fts(artigos_fts, rowid, titulo, conteudo, autor, categoria)
+            VALUES ('delete', old.id, old.titulo, old.conteudo, old.autor, old.categoria);
+            INSERT INTO artigos_fts(rowid, titulo, conteudo, autor, categoria)
+            VALUES (new.id, new.titulo, new.conteudo, new.autor, new.categoria);
+        END
+    """)
+
+    if not existe:
+        # Primeira vez: indexa o que já está na tabela
+        cursor.execute("INSERT INTO artigos_fts(artigos_fts) VALUES ('rebuild')")
+
+
+def consulta_fts(texto):
+    """Transforma a pergunta em uma consulta FTS5 (termos entre aspas, unidos por OR)"""
+    termos = []
+    for termo in re.findall(r"\w+", texto.lower()):
+        if len(termo) < 2 or termo in STOPWORDS or termo in termos:
+            continue
+        termos.append(termo)
+    return " OR ".join(f'"{termo}"' for termo in termos)
+
+
+def buscar_fts(texto, limite=10, data_inicio=None, data_fim=None, arquivo_db="artigos.db"):
+    """
+    Busca lexical (BM25) nos artigos. Retorna dicts com os campos do artigo
+    e o `score` (maior = melhor), na ordem de relevância.
+    """
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return []
+
+    conn = conectar(arquivo_db)
+    cursor = conn.cursor()
+
+    sql = """
+        SELECT a.doc_id, a.titulo, a.conteudo, a.categoria, a.autor, a.data, a.link,
+               bm25(artigos_fts, 10.0, 1.0, 5.0, 2.0) AS score
+        FROM artigos_fts
+        JOIN artigos a ON a.id = artigos_fts.rowid
+        WHERE artigos_fts MATCH ?
+    """
+    params = [consulta]
+    if data_inicio:
+        sql += " AND a.data >= ?"
+        params.append(data_inicio)
+    if data_fim:
+        sql += " AND a.data <= ?"
+        params.append(data_fim)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limite)
+
+    colunas = ["doc_id", "titulo", "conteudo", "categoria", "autor", "data", "link", "score"]
+    rows = cursor.execute(sql, params).fetchall()
+    conn.close()
 
+    resultados = []
+    for row in rows:
+        item = dict(zip(colunas, row))
+        # bm25() do SQLite é negativo (menor = melhor)
+        item["score"] = -item["score"]
+        resultados.append(item)
+    return resultados
+
+
+def save(posts, arquivo_db="artigos.db", lote=1000):
+    """
+    Grava os posts em lotes (uma transação por lote, com executemany).
+    Linhas idênticas às já salvas não são reescritas.
+    Retorna os doc_ids que foram inseridos ou alterados.
+    """
+    # Se o mesmo doc_id vier repetido, vale o último
+    por_id = {}
     for post in posts:
-        cursor.execute("""
-            INSERT INTO artigos (doc_id, titulo, conteudo, categoria, autor, data, link)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(doc_id) DO UPDATE SET
-                titulo=excluded.titulo,
-                conteudo=excluded.conteudo,
-                categoria=excluded.categoria,
-                autor=excluded.autor,
-                data=excluded.data,
-                link=excluded.link
-        """, (
-            post["doc_id"],
-            post["titulo"],
-            post["conteudo"],
-            post["categoria"],
-            post["autor"],
-            post["data"],
-            post["link"],
-        ))
+        por_id[post["doc_id"]] = tuple(post.get(coluna) for coluna in COLUNAS_ARTIGO)
+    linhas = list(por_id.values())
+
+    conn = conectar(arquivo_db)
+    cursor = conn.cursor()
+
+    alterados = []
+    for i in range(0, len(linhas), lote):
+        parte = linhas[i:i + lote]
+        marcadores = ",".join("?" * len(parte))
+        salvas = {
+            row[0]: row
+            for row in cursor.execute(
+                f"SELECT {', '.join(COLUNAS_ARTIGO)} FROM artigos WHERE doc_id IN ({marcadores})",
+                [linha[0] for linha in parte]
+            )
+        }
+
+        mudaram = []
+        for linha in parte:
+            salva = salvas.get(linha[0])
+            # modified_gmt ausente no post mantém o valor salvo
+            if linha[-1] is None and salva is not None:
+                linha = linha[:-1] + (salva[-1],)
+            if linha != salva:
+                mudaram.append(linha)
+
+        if not mudaram:
+            continue
+
+        agora = time.time()
+        with conn:
+            cursor.executemany("""
+                INSERT INTO artigos (doc_id, titulo, conteudo, categoria, autor, data, link, modified_gmt, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(doc_id) DO UPDATE SET
+                    titulo=excluded.titulo,
+                    conteudo=excluded.conteudo,
+                    categoria=excluded.categoria,
+                    autor=excluded.autor,
+                    data=excluded.data,
+                    link=excluded.link,
+                    modified_gmt=excluded.modified_gmt,
+                    atualizado_em=excluded.atualizado_em
+            """, [linha + (agora,) for linha in mudaram])
+            incrementar_versao(cursor)
+            enfileirar(cursor, [linha[0] for linha in mudaram], agora)
+        alterados.extend(linha[0] for linha in mudaram)
+
+    conn.close()
+    print(f"✅ Banco atualizado com {len(alterados)} matérias (novos ou atualizados), {len(linhas) - len(alterados)} sem alteração.")
+    return alterados
+
+
+def incrementar_versao(cursor):
+    """Nova versão dos dados (chamado na mesma transação da escrita)"""
+    cursor.execute(
+        "INSERT INTO estado (chave, valor) VALUES (?, '1') "
+        "ON CONFLICT(chave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1",
+        (CHAVE_VERSAO,)
+    )
+
+
+def enfileirar(cursor, doc_ids, momento=None):
+    """Põe os doc_ids na fila do indexador (chamado na mesma transação da escrita)"""
+    momento = time.time() if momento is None else momento
+    cursor.executemany(
+        "INSERT INTO fila_indexacao (doc_id, enfileirado_em) VALUES (?, ?) "
+        "ON CONFLICT(doc_id) DO UPDATE SET enfileirado_em = excluded.enfileirado_em",
+        [(doc_id, momento) for doc_id in doc_ids]
+    )
 
+
+def proximos_da_fila(limite=200, arquivo_db="artigos.db"):
+    """[(doc_id, enfileirado_em)] mais antigos da fila"""
+    conn = conectar(arquivo_db)
+    itens = conn.execute(
+        "SELECT doc_id, enfileirado_em FROM fila_indexacao ORDER BY enfileirado_em LIMIT ?", (limite,)
+    ).fetchall()
+    conn.close()
+    return itens
+
+
+def remover_da_fila(itens, arquivo_db="artigos.db"):
+    """
+    Tira da fila os itens indexados. Um doc_id reenfileirado enquanto era indexado
+    (enfileirado_em diferente) continua na fila.
+    """
+    conn = conectar(arquivo_db)
+    with conn:
+        conn.executemany("DELETE FROM fila_indexacao WHERE doc_id = ? AND enfileirado_em = ?", itens)
+    conn.close()
+
+
+def limpar_fila(ate, arquivo_db="artigos.db"):
+    """Tira da fila o que foi enfileirado até `ate` (coberto por uma reconstrução completa)"""
+    conn = conectar(arquivo_db)
+    with conn:
+        conn.execute("DELETE FROM fila_indexacao WHERE enfileirado_em <= ?", (ate,))
+    conn.close()
+
+
+def tamanho_fila(arquivo_db="artigos.db"):
+    conn = conectar(arquivo_db)
+    total = conn.execute("SELECT COUNT(*) FROM fila_indexacao").fetchone()[0]
+    conn.close()
+    return total
+
+
+def adquirir_lease(nome, dono, duracao=60, arquivo_db="artigos.db"):
+    """
+    Lease exclusivo na tabela estado (ex: um único indexador). Adquire se estiver
+    livre ou vencido, renova se já for de `dono`. Retorna True se `dono` ficou com ele.
+    """
+    chave = f"lease:{nome}"
+    conn = conectar(arquivo_db)
+    conn.isolation_level = None
+    try:
+        # IMMEDIATE: a leitura e a escrita do lease acontecem sem outro escritor no meio
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT valor FROM estado WHERE chave = ?", (chave,)).fetchone()
+        atual = json.loads(row[0]) if row else None
+        agora = time.time()
+        if atual and atual["dono"] != dono and atual["expira"] > agora:
+            conn.execute("ROLLBACK")
+            return False
+        conn.execute(
+            "INSERT INTO estado (chave, valor) VALUES (?, ?) "
+            "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+            (chave, json.dumps({"dono": dono, "expira": agora + duracao}))
+        )
+        conn.execute("COMMIT")
+        return True
+    finally:
+        conn.close()
+
+
+def liberar_lease(nome, dono, arquivo_db="artigos.db"):
+    conn = conectar(arquivo_db)
+    with conn:
+        conn.execute(
+            "DELETE FROM estado WHERE chave = ? AND json_extract(valor, '$.dono') = ?",
+            (f"lease:{nome}", dono)
+        )
+    conn.close()
+
+
+def versao_artigos(arquivo_db="artigos.db"):
+    """Versão atual dos dados: muda sempre que save/clean_db alteram a tabela"""
+    return int(get_estado(CHAVE_VERSAO, 0, arquivo_db))
+
+
+def ultima_atualizacao(doc_ids, arquivo_db="artigos.db"):
+    """Momento (time.time) da última gravação de qualquer um dos artigos, ou None"""
+    doc_ids = [doc_id for doc_id in dict.fromkeys(doc_ids) if doc_id]
+    if not doc_ids:
+        return None
+
+    conn = conectar(arquivo_db)
+    ultima = None
+    for i in range(0, len(doc_ids), 500):
+        parte = doc_ids[i:i + 500]
+        marcadores = ",".join("?" * len(parte))
+        valor = conn.execute(
+            f"SELECT MAX(atualizado_em) FROM artigos WHERE doc_id IN ({marcadores})", parte
+        ).fetchone()[0]
+        if valor is not None and (ultima is None or valor > ultima):
+            ultima = valor
+    conn.close()
+    return ultima
+
+
+def load_modificados(doc_ids, arquivo_db="artigos.db"):
+    """Retorna {doc_id: modified_gmt} dos artigos que já estão no banco"""
+    doc_ids = list(dict.fromkeys(doc_ids))
+    if not doc_ids or not os.path.exists(arquivo_db):
+        return {}
+
+    conn = conectar(arquivo_db)
+    modificados = {}
+    for i in range(0, len(doc_ids), 500):
+        parte = doc_ids[i:i + 500]
+        marcadores = ",".join("?" * len(parte))
+        rows = conn.execute(
+            f"SELECT doc_id, modified_gmt FROM artigos WHERE doc_id IN ({marcadores})", parte
+        )
+        modificados.update(dict(rows))
+    conn.close()
+    return modificados
+
+
+def get_estado(chave, padrao=None, arquivo_db="artigos.db"):
+    """Lê um valor (JSON) da tabela de estado/checkpoints"""
+    conn = conectar(arquivo_db)
+    row = conn.execute("SELECT valor FROM estado WHERE chave = ?", (chave,)).fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else padrao
+
+
+def set_estado(chave, valor, arquivo_db="artigos.db"):
+    conn = conectar(arquivo_db)
+    conn.execute(
+        "INSERT INTO estado (chave, valor) VALUES (?, ?) "
+        "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+        (chave, json.dumps(valor))
+    )
     conn.commit()
     conn.close()
-    print(f"✅ Banco atualizado com {len(posts)} matérias (novos ou atualizados).")
 
 
 def load_posts(arquivo_db="artigos.db"):
-    conn = sqlite3.connect(arquivo_db)
+    conn = conectar(arquivo_db)
     df = pd.read_sql("SELECT * FROM artigos", conn)
     conn.close()
     return df
 
 
+def listar_artigos(limite=20, categoria=None, arquivo_db="artigos.db"):
+    """Últimas matérias sem o corpo (só as colunas cobertas pelos índices de listagem)"""
+    conn = conectar(arquivo_db)
+    if categoria:
+        rows = conn.execute(SQL_ULTIMOS_POR_CATEGORIA, (categoria, limite)).fetchall()
+    else:
+        rows = conn.execute(SQL_ULTIMOS_RESUMO, (limite,)).fetchall()
+    conn.close()
+
+    colunas = ["doc_id", "titulo", "categoria", "data", "link", "autor"]
+    return [dict(zip(colunas, row)) for row in rows]
+
+
+def listar_pagina(limite=20, categoria=None, autor=None, apos=None, arquivo_db="artigos.db"):
+    """
+    Uma página da listagem (sem o corpo), da mais recente para a mais antiga.
+
+    - apos: cursor (data, doc_id) devolvido pela página anterior (None = primeira página)
+    Retorna (artigos, cursor da próxima página ou None se esta for a última).
+    """
+    params = []
+    if categoria:
+        params.append(categoria)
+    if autor:
+        params.append(autor)
+    if apos:
+        params.extend(apos)
+    # Uma linha a mais diz se existe próxima página
+    params.append(limite + 1)
+
+    conn = conectar(arquivo_db)
+    rows = conn.execute(sql_pagina(bool(categoria), bool(autor), bool(apos)), params).fetchall()
+    conn.close()
+
+    artigos = [dict(zip(COLUNAS_RESUMO, row)) for row in rows[:limite]]
+    proximo = None
+    if len(rows) > limite:
+        proximo = (artigos[-1]["data"], artigos[-1]["doc_id"])
+    return artigos, proximo
+
+
+def listar_filtros(arquivo_db="artigos.db"):
+    """Categorias e autores distintos (lidos só dos índices)"""
+    conn = conectar(arquivo_db)
+    categorias = [row[0] for row in conn.execute(SQL_CATEGORIAS)]
+    autores = [row[0] for row in conn.execute(SQL_AUTORES)]
+    conn.close()
+    return {"categorias": categorias, "autores": autores}
+
+
+def load_conteudos(doc_ids, arquivo_db="artigos.db"):
+    """Retorna {doc_id: conteudo} para os artigos pedidos"""
+    doc_ids = list(dict.fromkeys(d for d in doc_ids if d))
+    if not doc_ids:
+        return {}
+
+    conn = conectar(arquivo_db)
+    conteudos = {}
+    for i in range(0, len(doc_ids), 500):
+        parte = doc_ids[i:i + 500]
+        marcadores = ",".join("?" * len(parte))
+        rows = conn.execute(
+            f"SELECT doc_id, conteudo FROM artigos WHERE doc_id IN ({marcadores})", parte
+        )
+        conteudos.update({doc_id: conteudo or "" for doc_id, conteudo in rows})
+    conn.close()
+    return conteudos
+
+
 def load_posts_simplify(arquivo_db="artigos.db", limite=10):
 
     if not os.path.exists(arquivo_db):
         print(f"Banco {arquivo_db} não encontrado.")
         return
 
-    conn = sqlite3.connect(arquivo_db)
-    query = f"SELECT doc_id, titulo, categoria, data, link, conteudo, autor FROM artigos ORDER BY data DESC LIMIT {limite}"
-    df = pd.read_sql(query, conn)
+    conn = conectar(arquivo_db)
+    df = pd.read_sql(SQL_ULTIMOS_ARTIGOS, conn, params=(int(limite),))
     conn.close()
 
     if df.empty:
@@ -84,29 +567,55 @@ def load_posts_simplify(arquivo_db="artigos.db", limite=10):
     return df  # opcional, pra usar em outras funções
 
 
+def verificar_planos(consultas=None, arquivo_db="artigos.db"):
+    """
+    Roda EXPLAIN QUERY PLAN nas consultas quentes e retorna as que regrediram
+    para varredura completa da tabela ou ordenação em B-tree temporária.
+    Lista vazia = todas usando índice.
+    """
+    if consultas is None:
+        consultas = {
+            "ultimos_artigos": (SQL_ULTIMOS_ARTIGOS, (10,)),
+            "ultimos_por_categoria": (SQL_ULTIMOS_POR_CATEGORIA, ("negocios", 10)),
+            "ultimos_resumo": (SQL_ULTIMOS_RESUMO, (10,)),
+            "pagina": (sql_pagina(cursor=True), ("2025-11-20", "artigo-1", 21)),
+            "pagina_por_categoria": (sql_pagina(categoria=True, cursor=True), ("negocios", "2025-11-20", "artigo-1", 21)),
+            "pagina_por_autor": (sql_pagina(autor=True, cursor=True), ("Redação", "2025-11-20", "artigo-1", 21)),
+            "categorias": (SQL_CATEGORIAS, ()),
+            "autores": (SQL_AUTORES, ()),
+        }
+
+    conn = conectar(arquivo_db)
+    problemas = []
+    for nome, (sql, params) in consultas.items():
+        plano = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        for passo in plano:
+            varredura = passo.startswith("SCAN") and "INDEX" not in passo
+            if varredura or "TEMP B-TREE" in passo:
+                problemas.append((nome, passo))
+    conn.close()
+    return problemas
+
+
 def clean_db(arquivo_db="artigos.db"):
    
     if not os.path.exists(arquivo_db):
         print(f"Banco {arquivo_db} não encontrado.")
         return
 
-    conn = sqlite3.connect(arquivo_db)
+    # conectar() garante que a tabela exista
+    conn = conectar(arquivo_db)
     cursor = conn.cursor()
 
-    # Garante que a tabela exista
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS artigos (
-            doc_id TEXT PRIMARY KEY,
-            titulo TEXT,
-            conteudo TEXT,
-            categoria TEXT,
-            autor TEXT,
-            data TEXT,
-            link TEXT
-        )
-    """)
-
+    # O indexador tira os vetores dos artigos apagados
+    # ("WHERE true": sem ele o SQLite não distingue o ON CONFLICT de um JOIN)
+    cursor.execute(
+        "INSERT INTO fila_indexacao (doc_id, enfileirado_em) SELECT doc_id, ? FROM artigos WHERE true "
+        "ON CONFLICT(doc_id) DO UPDATE SET enfileirado_em = excluded.enfileirado_em",
+        (time.time(),)
+    )
     cursor.execute("DELETE FROM artigos")
+    incrementar_versao(cursor)
     conn.commit()
     conn.close()
 
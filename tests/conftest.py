@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import storage  # noqa: E402
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Cópia migrada do artigos.db (conectar() migra o schema: nunca no arquivo versionado)"""
+    arquivo_db = str(tmp_path / "artigos.db")
+    shutil.copy(os.path.join(RAIZ, "artigos.db"), arquivo_db)
+    storage.conectar(arquivo_db).close()
+    return arquivo_db
+
+
+class WordPressFalso:
+    """
+    /wp-json/wp/v2/posts em memória, com a paginação da API real (X-WP-TotalPages,
+    400 rest_post_invalid_page_number), modified_after, include e orderby.
+    `falhas[pagina] = n` faz as próximas n requisições dessa página darem 503
+    (`falhas["include"]`: as que baixam posts por `include`);
+    `validadores` liga ETag/Last-Modified (304 quando o cliente manda o mesmo).
+    """
+
+    def __init__(self):
+        self.posts = {}
+        self.falhas = {}
+        self.validadores = False
+        self.requisicoes = []
+        self._lock = threading.Lock()
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}/wp-json/wp/v2/posts"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def publicar(self, post_id, modified, titulo=None, conteudo=None, modified_gmt=None):
+        # A data de publicação não muda quando o post é editado
+        publicado = self.posts.get(post_id, {}).get("date", modified)
+        self.posts[post_id] = {
+            "id": post_id,
+            "date": publicado,
+            "modified": modified,
+            "modified_gmt": modified if modified_gmt is None else modified_gmt,
+            "title": {"rendered": titulo or f"Post {post_id}"},
+            "content": {"rendered": f"<p>{conteudo or f'Conteúdo do post {post_id}.'}</p>"},
+            "link": f"https://neofeed.com.br/negocios/post-{post_id}/",
+            "yoast_head_json": {"author": "Redação"},
+        }
+
+    def _listar(self, params):
+        posts = list(self.posts.values())
+        if "modified_after" in params:
+            posts = [p for p in posts if p["modified"] > params["modified_after"]]
+        if "include" in params:
+            incluidos = {int(i) for i in params["include"].split(",")}
+            posts = [p for p in posts if p["id"] in incluidos]
+        posts.sort(key=lambda p: p[params.get("orderby", "id")], reverse=params.get("order") == "desc")
+        return posts
+
+    def _handler(self):
+        wp = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                partes = urlsplit(self.path)
+                params = dict(parse_qsl(partes.query))
+                pagina = int(params.get("page", 1))
+                with wp._lock:
+                    wp.requisicoes.append({**params, "_headers": dict(self.headers)})
+                    chave = "include" if "include" in params else pagina
+                    falhar = wp.falhas.get(chave, 0)
+                    if falhar:
+                        wp.falhas[chave] = falhar - 1
+                    posts = wp._listar(params)
+
+                if falhar:
+                    self._responder(503, b"{}")
+                    return
+
+                por_pagina = int(params.get("per_page", 10))
+                total_paginas = max(1, -(-len(posts) // por_pagina))
+                if pagina > total_paginas:
+                    self._responder(400, json.dumps({"code": "rest_post_invalid_page_number"}).encode())
+                    return
+
+                cabecalhos = {"X-WP-Total": str(len(posts)), "X-WP-TotalPages": str(total_paginas)}
+                corpo = json.dumps(posts[(pagina - 1) * por_pagina:pagina * por_pagina]).encode()
+                if wp.validadores:
+                    etag = '"' + hashlib.md5(corpo + partes.query.encode()).hexdigest() + '"'
+                    cabecalhos["ETag"] = etag
+                    cabecalhos["Last-Modified"] = "Mon, 15 Dec 2025 18:00:00 GMT"
+                    if self.headers.get("If-None-Match") == etag:
+                        self._responder(304, b"", cabecalhos)
+                        return
+                self._responder(200, corpo, cabecalhos)
+
+            def _responder(self, status, corpo, cabecalhos=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                if status != 304:
+                    self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(corpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        return Handler
+
+    def paginas_pedidas(self, desde=0):
+        return sorted(int(r.get("page", 1)) for r in self.requisicoes[desde:])
+
+    def fechar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+@pytest.fixture
+def wp():
+    servidor = WordPressFalso()
+    yield servidor
+    servidor.fechar()
+
+
+@pytest.fixture
+def engine(banco, tmp_path, monkeypatch):
+    """
+    Engine do chat sobre a cópia do banco, com LLM falso (FakeListChatModel) e o
+    embedder offline: índice local, sem indexador, histórico e cache de respostas.
+    """
+    from langchain_core.language_models import FakeListChatModel
+
+    import rag
+    from core.helpers.embeddingCache import EmbeddingsLocal
+
+    for arquivo in ("prompt.txt", "promptContextual.txt"):
+        shutil.copy(os.path.join(RAIZ, arquivo), tmp_path / arquivo)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rag, "VETOR_BACKEND", "local")
+    monkeypatch.setattr(rag, "INDICE_LOCAL_DIR", str(tmp_path / "indice_local"))
+    monkeypatch.setattr(rag, "INDEXADOR_AUTOMATICO", False)
+    monkeypatch.setattr(rag, "HISTORICO_DB", None)
+    monkeypatch.setattr(rag, "CACHE_RESPOSTAS", False)
+    monkeypatch.setattr(rag, "STREAM_INTERVALO_MS", 0)
+
+    llm = FakeListChatModel(responses=["A Petz e a Cobasi concluíram a fusão."])
+    return rag.initRag(llm=llm, embeddings=EmbeddingsLocal())
@@ -0,0 +1,84 @@
+import storage
+from core.helpers import answerCache
+from core.helpers.answerCache import CacheRespostas
+from core.helpers.embeddingCache import EmbeddingsLocal
+
+FILTRO = {"data_int": {"$gte": 20251201}}
+
+
+def doc_ids_do_banco(banco, quantidade=2):
+    conn = storage.conectar(banco)
+    doc_ids = [doc_id for (doc_id,) in conn.execute("SELECT doc_id FROM artigos ORDER BY doc_id LIMIT ?", (quantidade,))]
+    conn.close()
+    return doc_ids
+
+
+def test_mesma_pergunta_normalizada_e_escopo(banco):
+    cache = CacheRespostas(arquivo_db=banco)
+    doc_ids = doc_ids_do_banco(banco)
+    cache.salvar("Quem comprou a Semrush?", FILTRO, doc_ids, "A Adobe.")
+
+    assert cache.buscar("quem comprou a   semrush", FILTRO, list(reversed(doc_ids))) == "A Adobe."
+    # Outro filtro de datas ou outros artigos recuperados: outra entrada
+    assert cache.buscar("Quem comprou a Semrush?", None, doc_ids) is None
+    assert cache.buscar("Quem comprou a Semrush?", FILTRO, doc_ids[:1]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_perguntas_parecidas_acima_do_limiar(banco):
+    # Com o EmbeddingsLocal: "... afinal" ~0.89, "quem foi que ..." ~0.82, "quanto custou ..." 0.5
+    cache = CacheRespostas(embeddings=EmbeddingsLocal(), limiar_similaridade=0.85, arquivo_db=banco)
+    doc_ids = doc_ids_do_banco(banco)
+    cache.salvar("quem comprou a Semrush", FILTRO, doc_ids, "A Adobe.")
+
+    assert cache.buscar("quem comprou a Semrush afinal", FILTRO, doc_ids) == "A Adobe."
+    assert cache.buscar("quem foi que comprou a Semrush", FILTRO, doc_ids) is None
+    assert cache.buscar("quanto custou a Semrush", FILTRO, doc_ids) is None
+    # Parecida, mas com outros artigos: não acerta
+    assert cache.buscar("quem comprou a Semrush afinal", FILTRO, doc_ids[:1]) is None
+    assert cache.stats()["hits_similares"] == 1
+
+
+def test_artigo_regravado_invalida_a_entrada(banco):
+    cache = CacheRespostas(arquivo_db=banco)
+    doc_ids = doc_ids_do_banco(banco)
+    cache.salvar("pergunta", FILTRO, doc_ids, "resposta")
+    assert cache.buscar("pergunta", FILTRO, doc_ids) == "resposta"
+
+    conn = storage.conectar(banco)
+    artigo = dict(zip(storage.COLUNAS_ARTIGO, conn.execute(
+        f"SELECT {', '.join(storage.COLUNAS_ARTIGO)} FROM artigos WHERE doc_id = ?", (doc_ids[1],)
+    ).fetchone()))
+    conn.close()
+
+    # Regravar igual não muda atualizado_em; mudar o texto invalida
+    storage.save([artigo], arquivo_db=banco)
+    assert cache.buscar("pergunta", FILTRO, doc_ids) == "resposta"
+    storage.save([{**artigo, "conteudo": artigo["conteudo"] + " Atualização."}], arquivo_db=banco)
+    assert cache.buscar("pergunta", FILTRO, doc_ids) is None
+    assert cache.stats()["expirados"] == 1 and cache.stats()["entradas"] == 0
+
+
+def test_ttl_conta_desde_o_ultimo_uso(banco, monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(answerCache.time, "time", lambda: agora[0])
+    cache = CacheRespostas(ttl=10, arquivo_db=banco)
+    doc_ids = doc_ids_do_banco(banco)
+    cache.salvar("pergunta", FILTRO, doc_ids, "resposta")
+
+    for instante in (1008.0, 1016.0, 1024.0):
+        agora[0] = instante
+        assert cache.buscar("pergunta", FILTRO, doc_ids) == "resposta"
+    agora[0] = 1035.0
+    assert cache.buscar("pergunta", FILTRO, doc_ids) is None
+
+
+def test_lru(banco):
+    cache = CacheRespostas(max_entradas=2, arquivo_db=banco)
+    doc_ids = doc_ids_do_banco(banco)
+    for pergunta in ("um", "dois"):
+        cache.salvar(pergunta, FILTRO, doc_ids, pergunta)
+    cache.buscar("um", FILTRO, doc_ids)
+    cache.salvar("três", FILTRO, doc_ids, "três")
+    assert cache.buscar("dois", FILTRO, doc_ids) is None
+    assert cache.buscar("um", FILTRO, doc_ids) == "um"
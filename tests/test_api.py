@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from api import criar_app
+
+
+def eventos_sse(texto):
+    eventos = []
+    for bloco in texto.strip().split("\n\n"):
+        linhas = dict(linha.split(": ", 1) for linha in bloco.splitlines())
+        eventos.append((linhas["event"], json.loads(linhas["data"])))
+    return eventos
+
+
+def test_health_artigos_e_chat(engine):
+    with TestClient(criar_app(engine=engine)) as cliente:
+        saude = cliente.get("/health").json()
+        assert saude["status"] == "ok"
+        assert saude["chats_ativos"] == 0
+        assert saude["vetores"] == 0
+
+        artigos = cliente.get("/artigos", params={"limite": 3}).json()
+        assert len(artigos) == 3
+        assert {"doc_id", "titulo", "data", "link"} <= set(artigos[0])
+        assert "conteudo" not in artigos[0]
+        assert cliente.get("/artigos", params={"limite": 0}).status_code == 422
+
+        assert cliente.post("/chat", json={"pergunta": "  "}).status_code == 400
+
+        resposta = cliente.post("/chat", json={"pergunta": "a fusão Petz e Cobasi", "session_id": "s1"})
+        assert resposta.status_code == 200
+        assert resposta.headers["content-type"].startswith("text/event-stream")
+        eventos = eventos_sse(resposta.text)
+        assert eventos[0] == ("sessao", {"session_id": "s1"})
+        assert eventos[-1] == ("fim", {})
+        texto = "".join(dados["texto"] for evento, dados in eventos if evento == "texto")
+        assert texto == "A Petz e a Cobasi concluíram a fusão."
+
+        assert cliente.get("/health").json()["chats_ativos"] == 0
+
+
+class EngineTravado:
+    """Engine que só responde quando `soltar` é setado"""
+
+    vectorstore = None
+
+    def __init__(self):
+        self.soltar = asyncio.Event()
+
+    async def aresponder(self, pergunta, session_id):
+        await self.soltar.wait()
+        yield "ok"
+
+    def metricas(self):
+        return {}
+
+
+def test_limite_de_chats_simultaneos(banco, tmp_path, monkeypatch):
+    # /health lê a fila de indexação do artigos.db do diretório atual
+    monkeypatch.chdir(tmp_path)
+
+    async def cenario():
+        engine = EngineTravado()
+        transporte = httpx.ASGITransport(app=criar_app(engine=engine, max_chats=2))
+        async with httpx.AsyncClient(transport=transporte, base_url="http://api") as cliente:
+            tarefas = [
+                asyncio.create_task(cliente.post("/chat", json={"pergunta": f"pergunta {i}"}))
+                for i in range(6)
+            ]
+            # Chegam juntas: só max_chats passam, as outras recebem 503 sem esperar
+            for _ in range(200):
+                if sum(tarefa.done() for tarefa in tarefas) == 4:
+                    break
+                await asyncio.sleep(0.01)
+            recusadas = [tarefa.result().status_code for tarefa in tarefas if tarefa.done()]
+            engine.soltar.set()
+            respostas = await asyncio.gather(*tarefas)
+
+            assert recusadas == [503] * 4
+            assert sorted(r.status_code for r in respostas) == [200, 200, 503, 503, 503, 503]
+            assert (await cliente.get("/health")).json()["chats_ativos"] == 0
+
+    asyncio.run(cenario())
@@ -0,0 +1,63 @@
+from core.helpers.chunker import dividir_texto
+from core.helpers.contextBuilder import contar_tokens
+
+FRASE = "A fusão entre as duas redes foi aprovada pelo conselho na semana passada."
+
+
+def tokens(texto, intervalos):
+    return [contar_tokens(texto[inicio:fim]) for inicio, fim in intervalos]
+
+
+def test_junta_paragrafos_inteiros():
+    paragrafo = " ".join([FRASE] * 3)
+    texto = "\n\n".join([paragrafo] * 3)
+    inicios = [texto.index(paragrafo, i * (len(paragrafo) + 2)) for i in range(3)]
+    limite = contar_tokens(paragrafo) * 2 + 1
+
+    # Cabem dois parágrafos por chunk: o corte é na linha em branco
+    assert dividir_texto(texto, limite, 0) == [
+        (inicios[0], inicios[1] + len(paragrafo)),
+        (inicios[2], len(texto)),
+    ]
+    assert dividir_texto(texto, contar_tokens(paragrafo) * 3, 0) == [(0, len(texto))]
+
+
+def test_paragrafo_grande_divide_nas_frases():
+    frases = [f"{FRASE[:-1]} número {i}." for i in range(8)]
+    texto = " ".join(frases)
+    limite = contar_tokens(" ".join(frases[:3]))
+
+    intervalos = dividir_texto(texto, limite, 0)
+    assert len(intervalos) > 1
+    assert all(t <= limite for t in tokens(texto, intervalos))
+    inicios_frase = {texto.index(frase) for frase in frases}
+    for inicio, fim in intervalos:
+        assert inicio in inicios_frase and texto[fim - 1] == "."
+    # Nada se perde: os intervalos cobrem o texto todo, só sem os espaços entre eles
+    assert " ".join(texto[inicio:fim] for inicio, fim in intervalos) == texto
+
+
+def test_frase_maior_que_o_limite_corta_no_espaco():
+    texto = " ".join(f"palavra{i}" for i in range(200))
+    limite = 20
+
+    intervalos = dividir_texto(texto, limite, 0)
+    assert len(intervalos) > 1
+    assert all(t <= limite for t in tokens(texto, intervalos))
+    for inicio, fim in intervalos:
+        assert inicio == 0 or texto[inicio - 1] == " "
+        assert fim == len(texto) or texto[fim] == " "
+    assert " ".join(texto[inicio:fim] for inicio, fim in intervalos) == texto
+
+
+def test_resto_pequeno_junta_ao_chunk_anterior():
+    paragrafo = " ".join([FRASE] * 3)
+    texto = f"{paragrafo}\n\n{paragrafo}\n\nFim."
+    limite = contar_tokens(paragrafo) * 2 + 1
+
+    # Sem min_tokens o "Fim." vira um chunk sozinho
+    separado = dividir_texto(texto, limite, 0)
+    assert separado[-1] == (len(texto) - len("Fim."), len(texto))
+
+    juntado = dividir_texto(texto, limite, min_tokens=10)
+    assert juntado == separado[:-2] + [(separado[-2][0], len(texto))]
@@ -0,0 +1,75 @@
+from langchain_core.documents import Document
+
+from core.helpers.contextBuilder import ConstrutorContexto, contar_tokens
+
+CORPO = " ".join(f"Parte {i} do artigo sobre a fusão entre Petz e Cobasi." for i in range(100))
+
+
+def chunk(doc_id, inicio, fim, link=None, **meta):
+    return Document(page_content=CORPO[inicio:fim], metadata={
+        "doc_id": doc_id, "titulo": f"Artigo {doc_id}", "link": link or f"https://exemplo.com/{doc_id}",
+        "data": "2025-03-10", "inicio": inicio, "fim": fim, **meta,
+    })
+
+
+def test_agrupa_chunks_do_mesmo_artigo_na_ordem_de_relevancia():
+    construtor = ConstrutorContexto(orcamento_tokens=10000, vizinhos=0)
+    docs = [
+        chunk("b", 0, 200),
+        chunk("a", 1000, 1200),
+        chunk("b", 2000, 2200),
+        # Mesmo link de "a" com outro doc_id: repetido
+        chunk("c", 0, 200, link="https://exemplo.com/a"),
+    ]
+    contexto = construtor.montar(docs, {"a": CORPO, "b": CORPO})
+
+    blocos = contexto.split("\n\n---\n\n")
+    assert [bloco.splitlines()[0] for bloco in blocos] == ["Título: Artigo b", "Título: Artigo a"]
+    # Os dois trechos de "b" num bloco só, com o corte marcado
+    assert " [...] " in blocos[0] and blocos[0].count("Título:") == 1
+    assert CORPO[1000:1200].strip() in blocos[1]
+    assert "Artigo c" not in contexto
+
+
+def test_respeita_o_orcamento():
+    docs = [chunk(doc_id, 0, 1500) for doc_id in "abcdef"]
+    conteudos = {doc_id: CORPO for doc_id in "abcdef"}
+    orcamento = contar_tokens(CORPO[:1500]) * 3
+
+    construtor = ConstrutorContexto(orcamento_tokens=orcamento, vizinhos=1, minimo_tokens=20)
+    contexto = construtor.montar(docs, conteudos)
+    registro = construtor.ultimo_registro()
+
+    assert registro["tokens"] <= orcamento
+    assert registro["artigos"] + registro["descartados"] == 6
+    assert 0 < registro["descartados"] < 6
+    # O último que coube foi truncado
+    assert contexto.rstrip().splitlines()[-1].startswith("Data:")
+    assert "[...]" in contexto.split("\n\n---\n\n")[-1]
+
+
+def test_sobra_minima_descarta_o_artigo():
+    docs = [chunk("a", 0, 1500), chunk("b", 0, 1500)]
+    conteudos = {"a": CORPO, "b": CORPO}
+    orcamento = contar_tokens(ConstrutorContexto()._bloco({"meta": docs[0].metadata}, CORPO[:1500])) + 30
+
+    construtor = ConstrutorContexto(orcamento_tokens=orcamento, vizinhos=0, minimo_tokens=80)
+    contexto = construtor.montar(docs, conteudos)
+    assert "Artigo b" not in contexto
+    assert construtor.ultimo_registro()["descartados"] == 1
+
+
+def test_expande_para_os_vizinhos_com_o_que_sobra():
+    docs = [chunk("a", 2000, 2200)]
+    largo = ConstrutorContexto(orcamento_tokens=10000, vizinhos=2, tamanho_chunk=300).montar(docs, {"a": CORPO})
+    justo = ConstrutorContexto(orcamento_tokens=10000, vizinhos=0, tamanho_chunk=300).montar(docs, {"a": CORPO})
+
+    assert CORPO[1500:2700].strip() in largo
+    assert CORPO[1500:2700].strip() not in justo
+    assert len(largo) > len(justo)
+
+
+def test_sem_corpo_usa_o_texto_do_chunk():
+    doc = Document(page_content="Trecho solto do artigo.", metadata={"doc_id": "x", "titulo": "Solto"})
+    contexto = ConstrutorContexto(orcamento_tokens=1000).montar([doc], {})
+    assert contexto == "Título: Solto\nConteúdo: Trecho solto do artigo."
@@ -0,0 +1,91 @@
+import sqlite3
+
+from core.helpers.embeddingCache import CachedEmbeddings, EmbeddingsLocal
+
+
+class EmbedderContado(EmbeddingsLocal):
+    """EmbeddingsLocal que conta os textos enviados à "API\""""
+
+    def __init__(self, model="modelo-a"):
+        super().__init__(dimensao=8)
+        self.model = model
+        self.textos = []
+
+    def embed_documents(self, texts):
+        self.textos += list(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.textos.append(text)
+        return super().embed_query(text)
+
+
+def chaves_no_banco(arquivo_db):
+    conn = sqlite3.connect(arquivo_db)
+    total = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    conn.close()
+    return total
+
+
+def test_acertos_e_faltas(tmp_path):
+    embedder = EmbedderContado()
+    cache = CachedEmbeddings(embedder, arquivo_db=str(tmp_path / "cache.db"))
+
+    primeiro = cache.embed_documents(["a", "b", "a"])
+    assert embedder.textos == ["a", "b"]
+    assert cache.embed_documents(["b", "a", "c"])[:2] == [primeiro[1], primeiro[0]]
+    assert embedder.textos == ["a", "b", "c"]
+
+    # Consulta e documento com o mesmo texto são chaves diferentes
+    cache.embed_query("a")
+    cache.embed_query("a")
+    assert embedder.textos == ["a", "b", "c", "a"]
+    stats = cache.stats()
+    # O "a" repetido no primeiro pedido conta como acerto
+    assert (stats["hits"], stats["misses"], stats["entradas"]) == (4, 4, 4)
+
+
+def test_chave_separada_por_modelo(tmp_path):
+    arquivo_db = str(tmp_path / "cache.db")
+    a, b = EmbedderContado("modelo-a"), EmbedderContado("modelo-b")
+    CachedEmbeddings(a, arquivo_db=arquivo_db).embed_documents(["texto"])
+    CachedEmbeddings(b, arquivo_db=arquivo_db).embed_documents(["texto"])
+    CachedEmbeddings(EmbedderContado("modelo-a"), arquivo_db=arquivo_db).embed_documents(["texto"])
+    assert (a.textos, b.textos) == (["texto"], ["texto"])
+    assert chaves_no_banco(arquivo_db) == 2
+
+
+def test_despejo_lru_com_acessos_em_lote(tmp_path):
+    arquivo_db = str(tmp_path / "cache.db")
+    embedder = EmbedderContado()
+    cache = CachedEmbeddings(embedder, arquivo_db=arquivo_db, max_entradas=3)
+    for texto in ("a", "b", "c"):
+        cache.embed_documents([texto])
+
+    # O acerto não escreve no banco: o acesso fica na memória até a próxima gravação
+    mudancas = cache._conn.total_changes
+    cache.embed_documents(["a"])
+    assert cache._conn.total_changes == mudancas
+
+    # "d" entra e o menos usado recentemente ("b") sai; "a" foi lido depois de "b"
+    cache.embed_documents(["d"])
+    embedder.textos.clear()
+    cache.embed_documents(["a", "c", "d"])
+    assert embedder.textos == []
+    cache.embed_documents(["b"])
+    assert embedder.textos == ["b"]
+    assert chaves_no_banco(arquivo_db) == 3
+
+
+def test_limite_vale_com_dois_processos_no_mesmo_banco(tmp_path):
+    # Dois CachedEmbeddings no mesmo arquivo, como o chat e o indexador
+    arquivo_db = str(tmp_path / "cache.db")
+    chat = CachedEmbeddings(EmbedderContado(), arquivo_db=arquivo_db, max_entradas=5)
+    indexador = CachedEmbeddings(EmbedderContado(), arquivo_db=arquivo_db, max_entradas=5)
+
+    indexador.embed_documents([f"doc {i}" for i in range(4)])
+    chat.embed_documents(["x", "y"])
+    assert chaves_no_banco(arquivo_db) == 5
+    indexador.embed_documents(["doc 9"])
+    assert chaves_no_banco(arquivo_db) == 5
+    assert chat.stats()["entradas"] == 5
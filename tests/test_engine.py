@@ -0,0 +1,41 @@
+import threading
+import time
+
+import rag
+
+
+def test_engine_criado_uma_vez_por_processo(monkeypatch):
+    criados = []
+
+    def init_lento():
+        time.sleep(0.05)
+        criados.append(object())
+        return criados[-1]
+
+    monkeypatch.setattr(rag, "_engine", None)
+    monkeypatch.setattr(rag, "initRag", init_lento)
+    monkeypatch.setattr(rag, "METRICAS_PORTA", 0)
+
+    engines = []
+    threads = [threading.Thread(target=lambda: engines.append(rag.getEngine())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(criados) == 1
+    assert all(engine is criados[0] for engine in engines)
+
+
+def test_sessoes_compartilham_o_engine_mas_nao_o_historico(engine, monkeypatch):
+    monkeypatch.setattr(rag, "_engine", engine)
+
+    resposta = "".join(rag.chatMessage("Como ficou a fusão da Petz?", session_id="s1"))
+    assert resposta == "A Petz e a Cobasi concluíram a fusão."
+    "".join(rag.chatMessage("E a Cobasi?", session_id="s2"))
+
+    perguntas = {
+        session_id: [m.content for m in engine.get_session_history(session_id).messages if m.type == "human"]
+        for session_id in ("s1", "s2")
+    }
+    assert perguntas == {"s1": ["Como ficou a fusão da Petz?"], "s2": ["E a Cobasi?"]}
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+# Referência: a extração anterior, com o BeautifulSoup (fora do requirements.txt)
+pytest.importorskip("bs4")
+
+from benchmarks.bench_html import CASOS_DE_BORDA, corpus, extrair_bs4, paridade
+from core.helpers.extratorHtml import _lxml_disponivel, extrair_texto
+from getRequests import limpar_caracteres_agressivo
+
+# Posts no formato do content.rendered do WordPress: os dois backends têm de
+# devolver o mesmo texto que a extração anterior (BeautifulSoup)
+POSTS = [
+    "<p>A <strong>Petz</strong> e a <a href=\"https://neofeed.com.br/x\">Cobasi</a> concluíram a fusão.</p>\n"
+    "<h2>O que muda</h2>\n<p>As lojas mantêm as marcas &#8211; por enquanto.</p>\n",
+    "<ul><li>Receita de R$ 1,2 bilhão</li><li>Ebitda de R$ 300 milhões</li></ul>"
+    "<figure class=\"wp-block-image\"><img src=\"x.jpg\" alt=\"\"/><figcaption>Foto: divulgação</figcaption></figure>",
+    "<!-- wp:paragraph --><p>&#8220;Vamos crescer&#8221;, disse o CEO &amp; fundador.&nbsp;Ponto.</p>"
+    "<script>window.dataLayer = window.dataLayer || []; dataLayer.push({'a': '<p>'});</script>"
+    "<style>.x{display:none}</style><p>Segundo parágrafo.</p>",
+    "<blockquote><p>Citação com <em>ênfase <b>aninhada</b></em></p></blockquote>\n\n<p>Fim.</p>",
+]
+
+BACKENDS = [
+    "html.parser",
+    pytest.param("lxml", marks=pytest.mark.skipif(not _lxml_disponivel(), reason="lxml não instalado")),
+]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("html", POSTS)
+def test_paridade_com_beautifulsoup(backend, html):
+    antes = extrair_bs4(html)
+    assert extrair_texto(html, backend=backend) == antes
+
+    com_paragrafos = limpar_caracteres_agressivo(
+        extrair_texto(html, paragrafos=True, backend=backend), preservar_paragrafos=True
+    )
+    assert " ".join(com_paragrafos.split()) == limpar_caracteres_agressivo(antes)
+
+
+def test_paridade_html_parser_no_corpus(banco):
+    # Casos de borda (entidades, comentários, HTML malformado) e os artigos do banco
+    # em HTML de post: o html.parser reproduz o BeautifulSoup em todos
+    documentos = corpus(banco, random.Random(7))
+    assert len(documentos) > len(CASOS_DE_BORDA)
+    assert paridade("html.parser", documentos) == (0, 0, 0)
@@ -0,0 +1,44 @@
+import sqlite3
+
+import storage
+
+
+def artigo(doc_id, titulo, conteudo, data="2025-12-01"):
+    return {"doc_id": doc_id, "titulo": titulo, "conteudo": conteudo, "categoria": "negocios",
+            "autor": "Redação", "data": data, "link": f"https://exemplo/{doc_id}"}
+
+
+def integro(arquivo_db):
+    conn = storage.conectar(arquivo_db)
+    conn.execute("INSERT INTO artigos_fts(artigos_fts, rank) VALUES ('integrity-check', 1)")
+    conn.close()
+
+
+def test_migra_banco_antigo_para_id_estavel(banco):
+    conn = sqlite3.connect(banco)
+    colunas = {row[1] for row in conn.execute("PRAGMA table_info(artigos)")}
+    total = conn.execute("SELECT count(*) FROM artigos").fetchone()[0]
+    conn.close()
+
+    assert "id" in colunas
+    assert total > 0
+    integro(banco)
+    resultados = storage.buscar_fts("Banco Master", arquivo_db=banco)
+    assert resultados and all("master" in (r["titulo"] + r["conteudo"]).lower() for r in resultados)
+
+
+def test_fts_sobrevive_a_vacuum(tmp_path):
+    arquivo_db = str(tmp_path / "artigos.db")
+    storage.save([artigo(f"artigo-{i}", f"Título {i}", f"texto comum número{i}") for i in range(50)], arquivo_db)
+    storage.save([artigo("artigo-49", "Ironman no Brasil", "a prova de triatlo")], arquivo_db)
+
+    conn = storage.conectar(arquivo_db)
+    with conn:
+        conn.execute("DELETE FROM artigos WHERE doc_id IN ('artigo-0', 'artigo-1', 'artigo-2', 'artigo-20')")
+    conn.execute("VACUUM")
+    conn.close()
+    storage.save([artigo("artigo-10", "Ironman de novo", "outra prova")], arquivo_db)
+
+    integro(arquivo_db)
+    assert {r["doc_id"] for r in storage.buscar_fts("ironman", arquivo_db=arquivo_db)} == {"artigo-49", "artigo-10"}
+    assert [r["doc_id"] for r in storage.buscar_fts("número30", arquivo_db=arquivo_db)] == ["artigo-30"]
@@ -0,0 +1,74 @@
+from langchain_core.documents import Document
+
+import rag
+import storage
+from core.helpers.embeddingCache import EmbeddingsLocal
+from core.helpers.indexSync import ids_da_colecao, sincronizar_chunks, tem_hashes
+from core.helpers.indiceLocal import IndiceLocal
+
+
+def chunks(textos):
+    """{doc_id: [texto do chunk, ...]} -> lista de Documents na ordem dos chunks"""
+    return [
+        Document(page_content=texto, metadata={"doc_id": doc_id, "data_int": 20251201})
+        for doc_id, partes in textos.items()
+        for texto in partes
+    ]
+
+
+def test_contagens_da_sincronizacao(tmp_path):
+    arquivo_db = str(tmp_path / "artigos.db")
+    indice = IndiceLocal(str(tmp_path / "indice"), EmbeddingsLocal())
+    corpus = {"a": ["um", "dois"], "b": ["três"], "c": ["quatro", "cinco"]}
+
+    relatorio = sincronizar_chunks(indice, chunks(corpus), colecao="x", arquivo_db=arquivo_db, reset=True)
+    assert relatorio == {"adicionados": 5, "atualizados": 0, "removidos": 0, "inalterados": 0}
+    assert tem_hashes("x", arquivo_db)
+
+    # "a" muda o segundo chunk, "b" ganha um chunk, "c" some do corpus
+    corpus = {"a": ["um", "dois editado"], "b": ["três", "três e meio"]}
+    relatorio = sincronizar_chunks(indice, chunks(corpus), colecao="x", arquivo_db=arquivo_db)
+    assert relatorio == {"adicionados": 1, "atualizados": 1, "removidos": 2, "inalterados": 2}
+    assert sorted(ids_da_colecao(indice)) == ["a#0", "a#1", "b#0", "b#1"]
+
+    # Só os doc_ids pedidos: os outros artigos não são removidos
+    relatorio = sincronizar_chunks(indice, chunks({"b": ["três"]}), colecao="x", arquivo_db=arquivo_db, doc_ids=["b"])
+    assert relatorio == {"adicionados": 0, "atualizados": 0, "removidos": 1, "inalterados": 1}
+    assert sorted(ids_da_colecao(indice)) == ["a#0", "a#1", "b#0"]
+    assert indice.count() == 3
+
+
+def test_migra_colecao_legada_do_chroma(banco, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rag, "VETOR_BACKEND", "chroma")
+    monkeypatch.setattr(rag, "CHROMA_DIR", str(tmp_path / "chroma_db"))
+
+    # Coleção de antes dos hashes: ids UUID, um documento por artigo, sem data_int
+    conn = storage.conectar(banco)
+    artigos = conn.execute("SELECT doc_id, titulo, conteudo FROM artigos ORDER BY doc_id LIMIT 5").fetchall()
+    conn.close()
+    vectorstore = rag.abrirVectorstore(EmbeddingsLocal(), "artigos_demo")
+    vectorstore.add_documents([
+        Document(page_content=conteudo, metadata={"doc_id": doc_id, "titulo": titulo})
+        for doc_id, titulo, conteudo in artigos
+    ])
+    assert not tem_hashes("artigos_demo", banco)
+
+    # Mesmo pedindo só um artigo (como o indexador faz com a fila), reconstrói tudo
+    rag.reloadVetorDB(vectorstore, doc_ids=[artigos[0][0]], colecao="artigos_demo")
+
+    salvos = vectorstore.get(include=["metadatas"])
+    assert all("#" in id_ for id_ in salvos["ids"])
+    assert all(metadata.get("data_int") for metadata in salvos["metadatas"])
+    assert len({metadata["doc_id"] for metadata in salvos["metadatas"]}) == storage.conectar(banco).execute(
+        "SELECT count(*) FROM artigos"
+    ).fetchone()[0]
+    assert tem_hashes("artigos_demo", banco)
+
+    # Sem mudanças no banco, a próxima sincronização não embeda nada
+    from core.helpers.chunker import dividir_documentos
+    doc_ids = [artigos[1][0]]
+    atuais = dividir_documentos(rag.load_documents_from_sql(doc_ids), max_tokens=rag.CHUNK_MAX_TOKENS,
+                                min_tokens=rag.CHUNK_MIN_TOKENS)
+    relatorio = sincronizar_chunks(vectorstore, atuais, colecao="artigos_demo", arquivo_db=banco, doc_ids=doc_ids)
+    assert relatorio == {"adicionados": 0, "atualizados": 0, "removidos": 0, "inalterados": len(atuais)}
@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import indexer
+import rag
+import storage
+from core.helpers.embeddingCache import EmbeddingsLocal
+from core.helpers.indexSync import ids_da_colecao
+from indexer import Lease, processar_fila
+
+
+def test_lease_exclusivo(banco):
+    primeiro, segundo = Lease(arquivo_db=banco), Lease(arquivo_db=banco)
+    assert primeiro.adquirir()
+    try:
+        assert not segundo.adquirir()
+    finally:
+        primeiro.liberar()
+    assert segundo.adquirir()
+    segundo.liberar()
+
+
+def test_lease_disputado_fica_com_um_so(banco):
+    largada = threading.Barrier(8)
+    ganhos = []
+
+    def disputar(i):
+        largada.wait()
+        ganhos.append(storage.adquirir_lease("indexador", f"dono{i}", 60, banco))
+
+    threads = [threading.Thread(target=disputar, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(ganhos) == [False] * 7 + [True]
+
+
+def test_lease_vencido_passa_para_outro(banco):
+    # Dono que morreu sem liberar
+    assert storage.adquirir_lease("indexador", "morto", 0.2, banco)
+    lease = Lease(arquivo_db=banco)
+    assert not lease.adquirir()
+    time.sleep(0.3)
+    assert lease.adquirir()
+    lease.liberar()
+
+
+def test_lease_tomado_marca_perdido(banco):
+    lease = Lease(duracao=0.3, arquivo_db=banco)
+    assert lease.adquirir()
+    storage.set_estado("lease:indexador", {"dono": "outro", "expira": time.time() + 60}, banco)
+
+    assert lease.perdido.wait(2)
+    # Liberar não apaga o lease do novo dono
+    lease.liberar()
+    assert not Lease(arquivo_db=banco).adquirir()
+
+
+@pytest.fixture
+def indice(banco, tmp_path, monkeypatch):
+    """Índice local do corpus inteiro, com o artigos.db da cópia no diretório atual"""
+    monkeypatch.chdir(tmp_path)
+    for modulo in (rag, indexer):
+        monkeypatch.setattr(modulo, "VETOR_BACKEND", "local")
+        monkeypatch.setattr(modulo, "INDICE_LOCAL_DIR", str(tmp_path / "indice_local"))
+    embeddings = EmbeddingsLocal()
+    return embeddings, rag.reloadVetorDB(embeddings=embeddings)
+
+
+def enfileirar(arquivo_db, doc_ids):
+    conn = storage.conectar(arquivo_db)
+    with conn:
+        storage.enfileirar(conn.cursor(), doc_ids)
+    conn.close()
+
+
+def test_processar_fila_esvazia_a_fila(banco, indice):
+    embeddings, vectorstore = indice
+    conn = sqlite3.connect(banco)
+    doc_ids = [doc_id for (doc_id,) in conn.execute("SELECT doc_id FROM artigos ORDER BY doc_id LIMIT 10")]
+    editado, apagado = doc_ids[0], doc_ids[1]
+    with conn:
+        conn.execute("UPDATE artigos SET conteudo = ? WHERE doc_id = ?",
+                     ("Texto novo sobre o quiosque flutuante de Xangrilá.", editado))
+        conn.execute("DELETE FROM artigos WHERE doc_id = ?", (apagado,))
+    conn.close()
+    enfileirar(banco, doc_ids)
+    versao = rag.indiceAtivo()["versao"]
+
+    lease = Lease(arquivo_db=banco)
+    assert lease.adquirir()
+    try:
+        assert processar_fila(embeddings, lease, lote=3) == 10
+    finally:
+        lease.liberar()
+
+    assert storage.tamanho_fila(banco) == 0
+    # Uma versão publicada por passada, não por lote
+    assert rag.indiceAtivo()["versao"] == versao + 1
+
+    ids = ids_da_colecao(vectorstore)
+    assert not any(id_.startswith(f"{apagado}#") for id_ in ids)
+    encontrado = vectorstore.similarity_search("quiosque flutuante de Xangrilá", k=1)[0]
+    assert encontrado.metadata["doc_id"] == editado
+
+
+def test_processar_fila_para_sem_o_lease(banco, indice):
+    embeddings, _ = indice
+    conn = sqlite3.connect(banco)
+    (doc_id,) = conn.execute("SELECT doc_id FROM artigos LIMIT 1").fetchone()
+    conn.close()
+    enfileirar(banco, [doc_id])
+    versao = rag.indiceAtivo()["versao"]
+
+    lease = Lease(arquivo_db=banco)
+    lease.perdido.set()
+    assert processar_fila(embeddings, lease) == 0
+    assert storage.tamanho_fila(banco) == 1
+    assert rag.indiceAtivo()["versao"] == versao
@@ -0,0 +1,43 @@
+import threading
+
+from core.helpers.embeddingCache import EmbeddingsLocal
+from core.helpers.indiceLocal import IndiceLocal
+
+
+def test_busca_durante_compactacao_usa_uma_geracao(tmp_path):
+    embeddings = EmbeddingsLocal(dimensao=1024)
+    textos = [f"a{i} b{i} c{i} d{i}" for i in range(400)]
+    indice = IndiceLocal(str(tmp_path / "indice"), embeddings, limiar_ivf=100, sondas=64, max_mortos=10.0)
+    indice.add_texts(textos, [{"data_int": 20250101 + i % 28} for i in range(400)], ids=[str(i) for i in range(400)])
+
+    # Os pares nunca são apagados: cada consulta tem que achar o próprio artigo
+    pares = list(range(0, 400, 2))
+    consultas = embeddings.embed_documents([textos[i] for i in pares])
+    erros = []
+    parar = threading.Event()
+
+    def buscar():
+        try:
+            while not parar.is_set():
+                for i, resultado in zip(pares, indice.buscar_por_vetores(consultas, k=1)):
+                    doc, cosseno = resultado[0]
+                    assert doc.id == str(i) and cosseno > 0.99, (i, doc.id, cosseno)
+        except Exception as erro:
+            erros.append(erro)
+
+    leitores = [threading.Thread(target=buscar) for _ in range(4)]
+    for leitor in leitores:
+        leitor.start()
+    try:
+        # Cada compactação renumera as linhas (e retreina o IVF)
+        for impar in range(1, 400, 2):
+            indice.delete([str(impar)])
+            if impar % 20 == 19:
+                indice.compactar()
+    finally:
+        parar.set()
+        for leitor in leitores:
+            leitor.join()
+
+    assert not erros, erros[0]
+    assert indice.count() == len(pares)
@@ -0,0 +1,112 @@
+import getRequests
+import storage
+
+
+def artigos(arquivo_db):
+    conn = storage.conectar(arquivo_db)
+    linhas = dict(conn.execute("SELECT doc_id, titulo FROM artigos"))
+    conn.close()
+    return linhas
+
+
+def test_ingestao_completa_pagina_retoma_e_avanca_watermark(wp, tmp_path):
+    arquivo_db = str(tmp_path / "artigos.db")
+    for post_id in range(1, 26):
+        wp.publicar(post_id, f"2025-12-01T10:{post_id:02d}:00")
+
+    def ingerir():
+        # Sem retry: a falha da página chega à ingestão na primeira tentativa
+        return getRequests.atualizar_db_completo(
+            url=wp.url, per_page=10, max_workers=2, processos=1, arquivo_db=arquivo_db,
+            session=getRequests.criar_sessao(conexoes=2, tentativas=0)
+        )
+
+    # 25 posts = 3 páginas (X-WP-TotalPages); a página 2 falha uma vez
+    wp.falhas[2] = 1
+    assert ingerir() == 15
+    assert wp.paginas_pedidas() == [1, 2, 3]
+    estado = storage.get_estado("ingestao_wp", arquivo_db=arquivo_db)
+    assert estado["em_andamento"] and estado["pagina"] == 1
+    assert len(artigos(arquivo_db)) == 15
+
+    # Retoma da página seguinte ao checkpoint; a 3 volta, mas não é regravada
+    pedidas = len(wp.requisicoes)
+    assert ingerir() == 10
+    assert wp.paginas_pedidas(pedidas) == [2, 3]
+    estado = storage.get_estado("ingestao_wp", arquivo_db=arquivo_db)
+    assert not estado["em_andamento"]
+    assert estado["watermark"] == "2025-12-01T10:25:00"
+    assert len(artigos(arquivo_db)) == 25
+
+    # Próxima execução: só o que mudou depois do watermark
+    wp.publicar(3, "2025-12-02T09:00:00", titulo="Post 3 editado")
+    wp.publicar(26, "2025-12-02T09:30:00")
+    pedidas = len(wp.requisicoes)
+    assert ingerir() == 2
+    assert [r.get("modified_after") for r in wp.requisicoes[pedidas:]] == ["2025-12-01T10:25:00"]
+    assert storage.get_estado("ingestao_wp", arquivo_db=arquivo_db)["watermark"] == "2025-12-02T09:30:00"
+    salvos = artigos(arquivo_db)
+    assert len(salvos) == 26 and salvos["artigo-3"] == "Post 3 editado"
+
+    # Nada novo: uma requisição, nada gravado, watermark parado
+    assert ingerir() == 0
+    assert storage.get_estado("ingestao_wp", arquivo_db=arquivo_db)["watermark"] == "2025-12-02T09:30:00"
+
+
+def test_delta_condicional_watermark_e_falha_parcial(wp, tmp_path):
+    arquivo_db = str(tmp_path / "artigos.db")
+    wp.validadores = True
+    for post_id in range(1, 6):
+        wp.publicar(post_id, f"2025-12-01T10:0{post_id}:00")
+    reindexados = []
+
+    def delta():
+        pedidas = len(wp.requisicoes)
+        doc_ids = getRequests.sincronizar_delta(
+            url=wp.url, per_page=10, arquivo_db=arquivo_db,
+            session=getRequests.criar_sessao(tentativas=0), reindexar=reindexados.append
+        )
+        listagem = [r for r in wp.requisicoes[pedidas:] if "include" not in r]
+        return doc_ids, listagem
+
+    def watermark():
+        return storage.get_estado("delta_wp", arquivo_db=arquivo_db)["watermark"]
+
+    doc_ids, _ = delta()
+    assert sorted(doc_ids) == [f"artigo-{i}" for i in range(1, 6)]
+    assert watermark() == "2025-12-01T10:05:00"
+
+    # Nada mudou: a listagem com o watermark novo é outra URL, então vai sem
+    # validadores; a seguinte, com os mesmos parâmetros, recebe 304
+    doc_ids, listagem = delta()
+    assert doc_ids == [] and "If-None-Match" not in listagem[0]["_headers"]
+    doc_ids, listagem = delta()
+    assert doc_ids == [] and "If-None-Match" in listagem[0]["_headers"]
+    assert len(reindexados) == 1
+
+    # Falha ao baixar os posts alterados: nada gravado, watermark parado
+    wp.publicar(2, "2025-12-02T08:00:00", titulo="Post 2 editado")
+    wp.falhas["include"] = 1
+    doc_ids, _ = delta()
+    assert doc_ids == [] and watermark() == "2025-12-01T10:05:00"
+    assert artigos(arquivo_db)["artigo-2"] == "Post 2"
+
+    # Falha na segunda página da listagem: idem
+    wp.publicar(3, "2025-12-02T08:30:00")
+    for post_id in range(6, 16):
+        wp.publicar(post_id, f"2025-12-02T09:{post_id:02d}:00")
+    wp.falhas[2] = 1
+    doc_ids, _ = delta()
+    assert doc_ids == [] and watermark() == "2025-12-01T10:05:00"
+
+    # Na próxima, tudo entra; o post 3 (sem modified_gmt novo e conteúdo igual)
+    # é baixado, mas o save() não o altera e ele fica fora da reindexação
+    wp.publicar(3, "2025-12-02T08:30:00", modified_gmt="")
+    doc_ids, listagem = delta()
+    assert sorted(doc_ids) == sorted(["artigo-2"] + [f"artigo-{i}" for i in range(6, 16)])
+    assert reindexados[-1] == doc_ids
+    assert watermark() == "2025-12-02T09:15:00"
+    assert artigos(arquivo_db)["artigo-2"] == "Post 2 editado"
+    # Duas páginas de listagem: nenhum validador guardado
+    assert [r["page"] for r in listagem] == ["1", "2"]
+    assert storage.get_estado("delta_wp", arquivo_db=arquivo_db)["validadores"] is None
@@ -0,0 +1,67 @@
+import sqlite3
+
+import storage
+
+
+def percorrer(limite, arquivo_db, **filtros):
+    """Todas as páginas, seguindo o cursor; [[doc_id, ...] por página]"""
+    paginas, apos = [], None
+    while True:
+        artigos, apos = storage.listar_pagina(limite, apos=apos, arquivo_db=arquivo_db, **filtros)
+        paginas.append([artigo["doc_id"] for artigo in artigos])
+        if apos is None:
+            return paginas
+
+
+def test_paginas_cobrem_tudo_sem_repetir(tmp_path):
+    arquivo_db = str(tmp_path / "artigos.db")
+    # Vários artigos por dia: o doc_id desempata o cursor
+    storage.save([
+        {"doc_id": f"{i:03d}", "titulo": f"Artigo {i}", "conteudo": "corpo", "data": f"2025-12-{1 + i // 4:02d}",
+         "categoria": "negocios" if i % 2 else "tecnologia", "autor": f"Autor {i % 3}", "link": f"https://exemplo/{i}"}
+        for i in range(30)
+    ], arquivo_db)
+    esperado = sorted((f"2025-12-{1 + i // 4:02d}", f"{i:03d}") for i in range(30))[::-1]
+
+    paginas = percorrer(7, arquivo_db)
+    assert [len(pagina) for pagina in paginas] == [7, 7, 7, 7, 2]
+    assert sum(paginas, []) == [doc_id for _, doc_id in esperado]
+
+    # Página exata: a última não aponta para uma página vazia
+    assert [len(pagina) for pagina in percorrer(10, arquivo_db)] == [10, 10, 10]
+
+    negocios = sum(percorrer(4, arquivo_db, categoria="negocios"), [])
+    assert negocios == [doc_id for _, doc_id in esperado if int(doc_id) % 2]
+    filtrados = sum(percorrer(2, arquivo_db, categoria="tecnologia", autor="Autor 0"), [])
+    assert filtrados == [doc_id for _, doc_id in esperado if int(doc_id) % 6 == 0]
+
+    assert storage.listar_filtros(arquivo_db) == {
+        "categorias": ["negocios", "tecnologia"],
+        "autores": ["Autor 0", "Autor 1", "Autor 2"],
+    }
+
+
+def test_pagina_nao_le_o_corpo(banco):
+    artigos, apos = storage.listar_pagina(5, arquivo_db=banco)
+    assert len(artigos) == 5 and apos is not None
+    assert set(artigos[0]) == set(storage.COLUNAS_RESUMO)
+
+    conn = sqlite3.connect(banco)
+    total = conn.execute("SELECT count(*) FROM artigos").fetchone()[0]
+    conn.close()
+    assert len(sum(percorrer(50, banco), [])) == total
+
+
+def test_versao_muda_a_cada_escrita(tmp_path):
+    arquivo_db = str(tmp_path / "artigos.db")
+    artigo = {"doc_id": "a", "titulo": "A", "conteudo": "corpo", "data": "2025-12-01"}
+    storage.save([artigo], arquivo_db)
+    versao = storage.versao_artigos(arquivo_db)
+
+    storage.save([artigo], arquivo_db)
+    assert storage.versao_artigos(arquivo_db) == versao
+    storage.save([{**artigo, "titulo": "A editado"}], arquivo_db)
+    assert storage.versao_artigos(arquivo_db) == versao + 1
+    storage.clean_db(arquivo_db)
+    assert storage.versao_artigos(arquivo_db) == versao + 2
+    assert storage.listar_pagina(arquivo_db=arquivo_db) == ([], None)
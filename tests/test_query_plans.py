@@ -0,0 +1,5 @@
+import storage
+
+
+def test_consultas_quentes_usam_indice(banco):
+    assert storage.verificar_planos(arquivo_db=banco) == []
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from langchain_core.documents import Document
+
+import storage
+from core.helpers.chatHelper import customRetrievel
+
+HOJE = datetime(2025, 3, 12)
+
+
+class VectorstoreFalso:
+    """Devolve (doc, similaridade) fixos e guarda os argumentos de cada busca"""
+
+    def __init__(self, resultados):
+        self.resultados = resultados
+        self.chamadas = []
+
+    def similarity_search_with_relevance_scores(self, pergunta, k=4, filter=None):
+        self.chamadas.append({"pergunta": pergunta, "k": k, "filter": filter})
+        return self.resultados[:k]
+
+
+def doc(doc_id, data_int, link=True):
+    return Document(page_content=f"Trecho de {doc_id}", metadata={
+        "doc_id": doc_id, "data_int": data_int, "link": f"https://exemplo.com/{doc_id}" if link else "",
+    })
+
+
+def lexical(doc_id, score):
+    return {
+        "doc_id": doc_id, "titulo": f"Artigo {doc_id}", "autor": "", "categoria": "", "data": "2025-03-10",
+        "link": f"https://exemplo.com/{doc_id}", "conteudo": f"Corpo de {doc_id} sobre a fusão", "score": score,
+    }
+
+
+def test_filtro_de_datas_vai_para_a_busca():
+    vectorstore = VectorstoreFalso([])
+    retriever = customRetrievel(vectorstore, k=3, fator_candidatos=4, usar_lexico=False, hoje=HOJE)
+
+    retriever.invoke("o que saiu ontem sobre a fusão?")
+    retriever.invoke("uma matéria sobre a fusão")
+    assert vectorstore.chamadas == [
+        {"pergunta": "o que saiu ontem sobre a fusão?", "k": 12, "filter": {"data_int": {"$eq": 20250311}}},
+        # Uma matéria só: menos candidatos
+        {"pergunta": "uma matéria sobre a fusão", "k": 4, "filter": None},
+    ]
+
+
+def test_recencia_desempata_similaridades_proximas():
+    resultados = [(doc("antigo", 20250210), 0.80), (doc("novo", 20250312), 0.78), (doc("sem_link", 20250312, False), 0.99)]
+
+    com_recencia = customRetrievel(VectorstoreFalso(resultados), k=3, usar_lexico=False, hoje=HOJE)
+    sem_recencia = customRetrievel(VectorstoreFalso(resultados), k=3, peso_recencia=0.0, usar_lexico=False, hoje=HOJE)
+
+    assert [d.metadata["doc_id"] for d in com_recencia.invoke("a fusão")] == ["novo", "antigo"]
+    assert [d.metadata["doc_id"] for d in sem_recencia.invoke("a fusão")] == ["antigo", "novo"]
+
+
+def test_rrf_junta_os_rankings(monkeypatch):
+    vetoriais = [(doc("a", 20250312), 0.9), (doc("a", 20250312), 0.85), (doc("b", 20250312), 0.8)]
+    monkeypatch.setattr(storage, "buscar_fts", lambda *args, **kwargs: [lexical("b", 9.0), lexical("c", 8.0)])
+
+    retriever = customRetrievel(VectorstoreFalso(vetoriais), k=3, peso_recencia=0.0, hoje=HOJE)
+    docs = retriever.invoke("como ficou a fusão")
+
+    # "b" está nos dois rankings; os chunks repetidos de "a" contam uma vez
+    assert [d.metadata["doc_id"] for d in docs] == ["b", "a", "c"]
+    # O documento vetorial tem prioridade sobre o recorte do FTS
+    assert docs[0].page_content == "Trecho de b"
+    assert "fusão" in docs[2].page_content
+
+
+def test_lexico_decisivo_pula_a_busca_vetorial(monkeypatch):
+    vectorstore = VectorstoreFalso([(doc("a", 20250312), 0.9)])
+    monkeypatch.setattr(storage, "buscar_fts", lambda *args, **kwargs: [lexical("c", 20.0), lexical("d", 5.0)])
+
+    docs = customRetrievel(vectorstore, k=3, hoje=HOJE).invoke("ações da PETZ3 hoje")
+    assert vectorstore.chamadas == []
+    assert [d.metadata["doc_id"] for d in docs] == ["c", "d"]
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+import storage
+
+
+def artigo(doc_id, conteudo="texto", **campos):
+    return {"doc_id": doc_id, "titulo": f"Título {doc_id}", "conteudo": conteudo, "categoria": "negocios",
+            "autor": "Redação", "data": "2025-12-01", "link": f"https://exemplo/{doc_id}", **campos}
+
+
+def fila(arquivo_db):
+    conn = sqlite3.connect(arquivo_db)
+    doc_ids = sorted(doc_id for (doc_id,) in conn.execute("SELECT doc_id FROM fila_indexacao"))
+    conn.close()
+    return doc_ids
+
+
+def linha(arquivo_db, doc_id):
+    conn = sqlite3.connect(arquivo_db)
+    row = conn.execute("SELECT conteudo, modified_gmt, atualizado_em FROM artigos WHERE doc_id = ?", (doc_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_so_grava_o_que_mudou(tmp_path):
+    arquivo_db = str(tmp_path / "artigos.db")
+    posts = [artigo(f"a{i}", modified_gmt="2025-12-01T10:00:00") for i in range(5)]
+
+    assert storage.save(posts, arquivo_db, lote=2) == ["a0", "a1", "a2", "a3", "a4"]
+    versao = storage.versao_artigos(arquivo_db)
+    gravado_em = linha(arquivo_db, "a0")[2]
+    storage.remover_da_fila(storage.proximos_da_fila(arquivo_db=arquivo_db), arquivo_db)
+
+    # Nada mudou: nenhuma escrita, versão nem fila
+    assert storage.save(posts, arquivo_db, lote=2) == []
+    assert storage.versao_artigos(arquivo_db) == versao
+    assert fila(arquivo_db) == []
+
+    # modified_gmt ausente mantém o salvo; só a3 mudou de fato
+    posts = [{**post, "modified_gmt": None} for post in posts]
+    posts[3]["conteudo"] = "texto editado"
+    assert storage.save(posts, arquivo_db, lote=2) == ["a3"]
+    assert linha(arquivo_db, "a3")[:2] == ("texto editado", "2025-12-01T10:00:00")
+    assert linha(arquivo_db, "a0")[2] == gravado_em
+    assert linha(arquivo_db, "a3")[2] >= gravado_em
+    # Uma versão por lote com mudança
+    assert storage.versao_artigos(arquivo_db) == versao + 1
+    assert fila(arquivo_db) == ["a3"]
+
+
+def test_doc_id_repetido_vale_o_ultimo(tmp_path):
+    arquivo_db = str(tmp_path / "artigos.db")
+    assert storage.save([artigo("a", "primeiro"), artigo("b"), artigo("a", "último")], arquivo_db) == ["a", "b"]
+    assert linha(arquivo_db, "a")[0] == "último"
+
+
+def test_lote_com_erro_nao_grava_pela_metade(tmp_path):
+    arquivo_db = str(tmp_path / "artigos.db")
+    posts = [artigo("a"), artigo("b"), artigo("c"), artigo(None)]
+
+    with pytest.raises(sqlite3.IntegrityError):
+        storage.save(posts, arquivo_db, lote=2)
+
+    # O primeiro lote ficou; o segundo voltou inteiro (artigo, versão e fila)
+    conn = sqlite3.connect(arquivo_db)
+    assert sorted(doc_id for (doc_id,) in conn.execute("SELECT doc_id FROM artigos")) == ["a", "b"]
+    conn.close()
+    assert storage.versao_artigos(arquivo_db) == 1
+    assert fila(arquivo_db) == ["a", "b"]
@@ -0,0 +1,96 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from core.helpers import sessionStore
+from core.helpers.sessionStore import SessionStore, janela_historico
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_sessao_ociosa_sai_da_memoria(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(sessionStore.time, "monotonic", relogio)
+    store = SessionStore(ttl_ocioso=60)
+
+    store.get("a").add_messages([HumanMessage(content="oi")])
+    relogio.agora += 30
+    store.get("b")
+    relogio.agora += 45
+    # "a" ficou 75 s sem uso; "b" só 45
+    store.get("b")
+    assert len(store) == 1
+    assert store.get("a").messages == []
+
+
+def test_acima_do_limite_sai_a_menos_usada():
+    store = SessionStore(max_sessoes=2)
+    store.get("a").add_messages([HumanMessage(content="a")])
+    store.get("b").add_messages([HumanMessage(content="b")])
+    store.get("a")
+    store.get("c")
+
+    assert len(store) == 2
+    assert [m.content for m in store.get("a").messages] == ["a"]
+    # "b" saiu (sem persistência, a conversa se perde)
+    assert store.get("b").messages == []
+
+
+def test_persistencia_recarrega_a_sessao(tmp_path):
+    arquivo_db = str(tmp_path / "historico.db")
+    store = SessionStore(max_sessoes=1, max_mensagens=3, arquivo_db=arquivo_db, mensagem_inicial="Olá!")
+
+    historico = store.get("a")
+    assert [m.content for m in historico.messages] == ["Olá!"]
+    for i in range(3):
+        historico.add_messages([HumanMessage(content=f"pergunta {i}"), AIMessage(content=f"resposta {i}")])
+    # Em memória, só as últimas max_mensagens
+    assert [m.content for m in historico.messages] == ["resposta 1", "pergunta 2", "resposta 2"]
+
+    store.get("b")
+    assert len(store) == 1
+
+    # Despejada da memória, volta do SQLite (a saudação não é persistida)
+    recarregado = store.get("a")
+    assert recarregado is not historico
+    assert [m.content for m in recarregado.messages] == ["resposta 1", "pergunta 2", "resposta 2"]
+    assert isinstance(recarregado.messages[0], AIMessage)
+
+    # Outro processo lê o mesmo banco
+    outro = SessionStore(arquivo_db=arquivo_db, mensagem_inicial="Olá!")
+    assert [m.content for m in outro.get("b").messages] == ["Olá!"]
+    assert len(outro.get("a").messages) == 6
+
+    recarregado.clear()
+    assert SessionStore(arquivo_db=arquivo_db).get("a").messages == []
+
+
+def test_limpar_persistidos(tmp_path, monkeypatch):
+    store = SessionStore(arquivo_db=str(tmp_path / "historico.db"))
+    store.get("antiga").add_messages([HumanMessage(content="oi")])
+    daqui_40_dias = sessionStore.time.time() + 40 * 86400
+    monkeypatch.setattr(sessionStore.time, "time", lambda: daqui_40_dias)
+    store.get("nova").add_messages([HumanMessage(content="oi")])
+
+    assert store.limpar_persistidos(dias=30) == 1
+    assert SessionStore(arquivo_db=str(tmp_path / "historico.db")).get("antiga").messages == []
+
+
+def test_ids_de_sessao_unicos():
+    assert len({SessionStore.novo_session_id() for _ in range(1000)}) == 1000
+
+
+def test_janela_comeca_numa_pergunta():
+    mensagens = [AIMessage(content="Olá!")]
+    for i in range(20):
+        mensagens += [HumanMessage(content=f"pergunta {i} " * 10), AIMessage(content=f"resposta {i} " * 10)]
+
+    janela = janela_historico(mensagens, max_tokens=200)
+    assert 0 < len(janela) < len(mensagens)
+    assert isinstance(janela[0], HumanMessage)
+    assert janela[-1] is mensagens[-1]
+    assert janela_historico([]) == []
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from core.helpers.streamHelper import MetricasStream, coalescer
+
+PEDACOS = ["A ", "Petz ", "", "e ", "a ", "Cobasi ", "concluíram ", "a ", "fusão", "."]
+
+
+def lento(pedacos, pausas):
+    """Stream que dorme pausas[i] segundos antes do pedaço i"""
+    for pedaco, pausa in zip(pedacos, pausas):
+        time.sleep(pausa)
+        yield pedaco
+
+
+def test_sem_agrupamento_repassa_cada_pedaco():
+    metricas = MetricasStream()
+    assert list(coalescer(iter(PEDACOS), metricas=metricas)) == [p for p in PEDACOS if p]
+    assert metricas.resumo()["respostas"] == 1
+    assert metricas.registros[0]["envios"] == len(PEDACOS) - 1
+
+
+@pytest.mark.parametrize("intervalo_ms, max_chars", [(50, 0), (0, 10), (1000, 12)])
+def test_agrupado_mantem_a_ordem_e_o_primeiro_sai_sozinho(intervalo_ms, max_chars):
+    metricas = MetricasStream()
+    enviados = list(coalescer(iter(PEDACOS), intervalo_ms, max_chars, metricas))
+
+    assert "".join(enviados) == "".join(PEDACOS)
+    assert enviados[0] == PEDACOS[0]
+    assert metricas.registros[0]["caracteres"] == len("".join(PEDACOS))
+    assert metricas.registros[0]["envios"] == len(enviados)
+    if max_chars:
+        # Todos cheios, menos o primeiro e o resto final
+        assert all(len(texto) >= max_chars for texto in enviados[1:-1])
+
+
+def test_max_chars_agrupa():
+    enviados = list(coalescer(iter(["a"] * 30), max_chars=10))
+    assert enviados == ["a", "a" * 10, "a" * 10, "a" * 9]
+
+
+def test_pausa_do_modelo_nao_segura_o_buffer():
+    inicio = time.perf_counter()
+    chegadas = []
+    for texto in coalescer(lento(["um ", "dois ", "três"], [0, 0.01, 0.4]), intervalo_ms=50):
+        chegadas.append((texto, time.perf_counter() - inicio))
+
+    assert [texto for texto, _ in chegadas] == ["um ", "dois ", "três"]
+    # "dois" sai no fim do intervalo, sem esperar o "três"
+    assert chegadas[1][1] < 0.3 <= chegadas[2][1]
+
+
+def test_erro_do_stream_chega_a_quem_consome():
+    def quebra():
+        yield "começo"
+        raise RuntimeError("modelo caiu")
+
+    enviados = []
+    with pytest.raises(RuntimeError, match="modelo caiu"):
+        for texto in coalescer(quebra(), intervalo_ms=50):
+            enviados.append(texto)
+    assert enviados == ["começo"]
+
+
+def test_consumidor_parou_solta_o_stream():
+    lidos = []
+
+    def infinito():
+        while True:
+            lidos.append(1)
+            time.sleep(0.005)
+            yield "x"
+
+    metricas = MetricasStream()
+    stream = coalescer(infinito(), intervalo_ms=20, metricas=metricas)
+    assert next(stream) == "x"
+    stream.close()
+
+    time.sleep(0.05)
+    parado = len(lidos)
+    time.sleep(0.05)
+    assert len(lidos) <= parado + 1
+    assert metricas.resumo()["respostas"] == 1
@@ -0,0 +1,61 @@
+from datetime import date, datetime
+
+import pytest
+
+from core.helpers.chatHelper import detectar_filtro_data, limites_do_filtro
+from core.helpers.detectorTemporalNoticias import DetectorTemporalNoticias
+
+HOJE = datetime(2025, 3, 12, 15, 0)
+
+
+@pytest.mark.parametrize("pergunta, limites", [
+    ("Novidades sobre a Petz", ("2025-03-12", None)),
+    ("o que saiu ontem?", ("2025-03-11", "2025-03-11")),
+    ("notícias da semana passada", ("2025-03-05", None)),
+    ("últimas 24 horas", ("2025-03-11", None)),
+    ("este mês", ("2025-03-01", None)),
+    ("resultados do mês passado", ("2025-02-01", "2025-02-28")),
+    ("a fusão no dia 5", ("2025-03-05", "2025-03-05")),
+    ("publicado em 10/01/24", ("2024-01-10", "2024-01-10")),
+    # Mês sem ano: o mais recente que já começou
+    ("balanço em novembro", ("2024-11-01", "2024-11-30")),
+    ("balanço em março", ("2025-03-01", "2025-03-31")),
+    ("novembro de 2023", ("2023-11-01", "2023-11-30")),
+])
+def test_limites_do_filtro(pergunta, limites):
+    assert limites_do_filtro(detectar_filtro_data(pergunta, HOJE)) == limites
+
+
+def test_formato_do_filtro():
+    assert detectar_filtro_data("o que saiu ontem?", HOJE) == {"data_int": {"$eq": 20250311}}
+    assert detectar_filtro_data("Novidades", HOJE) == {"data_int": {"$gte": 20250312}}
+    assert detectar_filtro_data("mês passado", HOJE) == {
+        "$and": [{"data_int": {"$gte": 20250201}}, {"data_int": {"$lte": 20250228}}]
+    }
+
+
+@pytest.mark.parametrize("pergunta", [
+    "o marco legal do varejo",
+    "entrevista com Marco Stefanini",
+    "quem renovou o contrato",
+    "vendas em 31/02",
+    "",
+])
+def test_sem_filtro(pergunta):
+    assert detectar_filtro_data(pergunta, HOJE) is None
+    assert limites_do_filtro(detectar_filtro_data(pergunta, HOJE)) == (None, None)
+
+
+def test_mes_passado_em_ano_bissexto():
+    assert limites_do_filtro(detectar_filtro_data("mês passado", datetime(2024, 3, 1))) == ("2024-02-01", "2024-02-29")
+    assert limites_do_filtro(detectar_filtro_data("mês passado", datetime(2025, 1, 15))) == ("2024-12-01", "2024-12-31")
+
+
+def test_hoje_atualiza_na_virada_do_dia():
+    detector = DetectorTemporalNoticias()
+    detector.hoje = datetime(2020, 1, 1)
+    assert detector.detectar_intervalo("hoje").inicio == date(2020, 1, 1)
+
+    # Passou da meia-noite: "hoje" é recalculado (e a chave do LRU muda)
+    detector._proxima_virada = 0
+    assert detector.detectar_intervalo("hoje").inicio == date.today()
@@ -0,0 +1,144 @@
+import json
+import logging
+import urllib.error
+import urllib.request
+
+import pytest
+
+from core.helpers import tracing
+from core.helpers.tracing import Rastro, SinkPrometheus, configurar_sinks, contar, etapa, marcar, rastro_atual
+
+
+@pytest.fixture(autouse=True)
+def sinks_originais():
+    sinks = list(tracing.coletor.sinks)
+    yield
+    tracing.coletor.configurar(sinks)
+
+
+def test_sem_rastro_ativo_nao_mede_nada():
+    with etapa("busca") as rastro:
+        assert rastro is None
+    marcar(docs=3)
+    contar("acertos")
+    assert rastro_atual() is None
+
+
+def test_etapas_e_atributos_do_rastro_ativo():
+    rastro = Rastro(pergunta_tokens=7)
+    with rastro.ativo():
+        for _ in range(2):
+            with etapa("busca_vetorial"):
+                pass
+        with etapa("contexto"):
+            marcar(docs=3)
+            contar("cache_embeddings_acertos", 2)
+            contar("cache_embeddings_acertos")
+    assert rastro_atual() is None
+
+    assert set(rastro.etapas) == {"busca_vetorial", "contexto"}
+    assert rastro.atributos == {"pergunta_tokens": 7, "docs": 3, "cache_embeddings_acertos": 3}
+
+
+def test_acompanhar_ativa_o_rastro_so_dentro_do_stream():
+    rastro = Rastro()
+
+    def stream():
+        with etapa("prompt"):
+            pass
+        for pedaco in ("a", "b"):
+            assert rastro_atual() is rastro
+            yield pedaco
+
+    for pedaco in rastro.acompanhar(stream()):
+        # Quem consome não herda o rastro entre um pedaço e outro
+        assert rastro_atual() is None
+    assert "prompt" in rastro.etapas
+
+
+def test_finalizar_emite_uma_vez_mesmo_com_sink_quebrado():
+    class Quebrado:
+        def emitir(self, rastro):
+            raise RuntimeError("sink fora do ar")
+
+    prometheus = SinkPrometheus()
+    tracing.coletor.configurar([Quebrado(), prometheus])
+    rastro = Rastro()
+    rastro.finalizar()
+    rastro.finalizar()
+
+    assert prometheus.rastros == 1
+    assert rastro.duracao is not None
+
+
+def test_sink_json(caplog):
+    configurar_sinks(["json"])
+    rastro = Rastro(docs=2)
+    rastro.registrar_etapa("busca_lexical", 0.0125)
+
+    with caplog.at_level(logging.INFO, logger="neo.rastros"):
+        rastro.finalizar()
+
+    (registro,) = [r for r in caplog.records if r.name == "neo.rastros"]
+    linha = json.loads(registro.getMessage())
+    assert linha["rastro"] == rastro.id
+    assert linha["etapas_ms"] == {"busca_lexical": 12.5}
+    assert linha["docs"] == 2 and linha["duracao_ms"] >= 0
+
+
+def test_sink_prometheus_percentis_e_contadores():
+    sink = SinkPrometheus(historico=100)
+    for i in range(1, 101):
+        rastro = Rastro(acerto_cache=i % 2 == 0, tokens=10, modelo="gpt-4o-mini")
+        rastro.registrar_etapa("busca", i / 1000)
+        rastro.duracao = i / 100
+        sink.emitir(rastro)
+
+    resumo = sink.resumo()
+    assert resumo["rastros"] == 100
+    assert resumo["etapas_ms"]["busca"] == {"n": 100, "p50": 51.0, "p95": 95.0, "p99": 99.0}
+    assert resumo["etapas_ms"]["total"]["n"] == 100
+    # Booleanos contam os True; texto fica de fora
+    assert resumo["contadores"] == {"acerto_cache": 50, "tokens": 1000}
+
+    texto = sink.exposicao()
+    assert 'neo_chat_etapa_segundos{etapa="busca",quantile="0.95"} 0.095000' in texto
+    assert 'neo_chat_etapa_segundos_count{etapa="busca"} 100' in texto
+    assert "neo_chat_respostas_total 100" in texto
+    assert "neo_chat_tokens_total 1000" in texto
+
+
+def test_historico_limitado():
+    sink = SinkPrometheus(historico=10)
+    for i in range(50):
+        rastro = Rastro()
+        rastro.registrar_etapa("busca", float(i))
+        sink.emitir(rastro)
+    # Só as 10 últimas (40 a 49 s)
+    assert sink.resumo()["etapas_ms"]["busca"]["n"] == 10
+    assert sink.resumo()["etapas_ms"]["busca"]["p50"] == 44000.0
+
+
+def test_servir_metricas():
+    (sink,) = configurar_sinks(["prometheus"])
+    rastro = Rastro()
+    rastro.registrar_etapa("busca", 0.01)
+    rastro.finalizar()
+
+    servidor = tracing.servir_metricas(0)
+    try:
+        url = f"http://127.0.0.1:{servidor.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics") as resposta:
+            assert resposta.headers["Content-Type"].startswith("text/plain")
+            assert resposta.read().decode("utf-8") == sink.exposicao()
+        with pytest.raises(urllib.error.HTTPError) as erro:
+            urllib.request.urlopen(f"{url}/outra")
+        assert erro.value.code == 404
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_sink_desconhecido():
+    with pytest.raises(ValueError):
+        configurar_sinks(["statsd"])